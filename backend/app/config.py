@@ -1,4 +1,5 @@
 import os
+from pathlib import Path
 from dotenv import load_dotenv
 
 load_dotenv()  # ✅ loads variables from .env into environment
@@ -8,6 +9,17 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 QDRANT_HOST = os.getenv("QDRANT_HOST", "localhost")
 QDRANT_PORT = int(os.getenv("QDRANT_PORT", 6333))
 
+# Qdrant collection layout and tuning profiles (HNSW, quantization,
+# optimizers, search-time params), applied by app.ingestion.collection_profiles
+COLLECTIONS_CONFIG = Path(os.getenv(
+    "COLLECTIONS_CONFIG", Path(__file__).resolve().parents[1] / "collections.json"
+))
+
+# Vector store behind retrieve(): "qdrant" (server) or "embedded"
+# (memory-mapped matrix per collection under EMBEDDED_DIR, no server)
+VECTOR_STORE = os.getenv("VECTOR_STORE", "qdrant")
+EMBEDDED_DTYPE = os.getenv("EMBEDDED_DTYPE", "float32")   # float32 | float16
+
 COLLECTION_NAME = os.getenv("COLLECTION_NAME", "meher_baba_books")
 
 EMBED_MODEL = os.getenv("EMBED_MODEL", "text-embedding-3-large")
@@ -17,8 +29,161 @@ GEMINI_ENABLED = False
 
 
 
-OLLAMA_URL =  "http://localhost:11434/api/chat"
-OLLAMA_MODEL = "mistral-ctx:latest"
+OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434/api/chat")
+OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "mistral-ctx:latest")
+
+# Sent with every Ollama request, so the model stays loaded between
+# requests instead of being evicted after Ollama's 5 min default ("-1"
+# keeps it forever). Warmup preloads it before /ready turns 200
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+OLLAMA_PRELOAD = os.getenv("OLLAMA_PRELOAD", "true").lower() == "true"
+OLLAMA_PRELOAD_TIMEOUT_SECONDS = float(os.getenv("OLLAMA_PRELOAD_TIMEOUT_SECONDS", 120))
+
+# Per-backend timeouts. Router replies are a few dozen tokens, so the
+# router gives up much sooner than the explainer; streams only need each
+# chunk to arrive within the read timeout
+OLLAMA_CONNECT_TIMEOUT_SECONDS = float(os.getenv("OLLAMA_CONNECT_TIMEOUT_SECONDS", 3))
+OLLAMA_ROUTER_TIMEOUT_SECONDS = float(os.getenv("OLLAMA_ROUTER_TIMEOUT_SECONDS", 30))
+OLLAMA_EXPLAINER_TIMEOUT_SECONDS = float(os.getenv("OLLAMA_EXPLAINER_TIMEOUT_SECONDS", 180))
+OLLAMA_STREAM_READ_TIMEOUT_SECONDS = float(os.getenv("OLLAMA_STREAM_READ_TIMEOUT_SECONDS", 60))
+GEMINI_TIMEOUT_SECONDS = float(os.getenv("GEMINI_TIMEOUT_SECONDS", 30))
+
+# Connection errors, 429 and 5xx are retried with exponential backoff and
+# full jitter; timeouts are not (a retry would double a long wait)
+LLM_RETRIES = int(os.getenv("LLM_RETRIES", 2))
+LLM_RETRY_BASE_SECONDS = float(os.getenv("LLM_RETRY_BASE_SECONDS", 0.2))
+LLM_RETRY_MAX_SECONDS = float(os.getenv("LLM_RETRY_MAX_SECONDS", 2.0))
+
+# Circuit breaker per backend: after BREAKER_FAILURES consecutive failed
+# calls the backend is skipped (straight to the fallback) for
+# BREAKER_RESET_SECONDS, then one probe call decides whether it is back
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", 3))
+LLM_BREAKER_RESET_SECONDS = float(os.getenv("LLM_BREAKER_RESET_SECONDS", 30))
 
     
-GEMINI_MODEL = "models/gemini-2.0-flash"  
\ No newline at end of file
+GEMINI_MODEL = "models/gemini-2.0-flash"  
+
+# Passage index: chunks are split into overlapping passages before embedding
+# (all-MiniLM-L6-v2 truncates at 256 word pieces, roughly 1000 characters)
+PASSAGE_MAX_CHARS = int(os.getenv("PASSAGE_MAX_CHARS", 900))
+PASSAGE_OVERLAP_CHARS = int(os.getenv("PASSAGE_OVERLAP_CHARS", 150))
+
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", 3))
+RETRIEVAL_NEIGHBORS = int(os.getenv("RETRIEVAL_NEIGHBORS", 1))
+
+# Speculative retrieval: embed the raw question and search every book
+# while the router is still running, then keep the routed book's
+# candidates. Hides embed + search behind routing at the cost of one
+# vector search per book instead of one per request. The vector lacks the
+# router's topics/keywords, so OVERFETCH times the usual candidates are
+# fetched for the rescoring to reorder
+SPECULATIVE_RETRIEVAL = os.getenv("SPECULATIVE_RETRIEVAL", "false").lower() == "true"
+SPECULATIVE_OVERFETCH = float(os.getenv("SPECULATIVE_OVERFETCH", 4))
+
+# BM25 lexical index (built at ingest, fused with vector hits via RRF)
+LEXICAL_ENABLED = os.getenv("LEXICAL_ENABLED", "true").lower() == "true"
+BM25_K1 = float(os.getenv("BM25_K1", 1.2))
+BM25_B = float(os.getenv("BM25_B", 0.75))
+RRF_K = int(os.getenv("RRF_K", 60))
+
+# Optional cross-encoder rerank of the fused candidate pool. Scoring must
+# finish within RERANK_BUDGET_MS, otherwise the hybrid order is kept
+RERANK_ENABLED = os.getenv("RERANK_ENABLED", "false").lower() == "true"
+RERANK_MODEL = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", 20))
+RERANK_BUDGET_MS = float(os.getenv("RERANK_BUDGET_MS", 150))
+RERANK_BATCH_SIZE = int(os.getenv("RERANK_BATCH_SIZE", 32))
+RERANK_CACHE_SIZE = int(os.getenv("RERANK_CACHE_SIZE", 20000))
+
+
+# Local sentence-transformer used for passages and queries
+LOCAL_EMBED_MODEL = os.getenv("LOCAL_EMBED_MODEL", "all-MiniLM-L6-v2")
+
+DATA_DIR = Path(os.getenv("DATA_DIR", Path(__file__).resolve().parents[1] / "data"))
+NORMALIZED_DIR = DATA_DIR / "normalized"
+LEXICAL_DIR = DATA_DIR / "lexical"
+EMBEDDED_DIR = Path(os.getenv("EMBEDDED_DIR", DATA_DIR / "vectors"))
+
+# Passage texts live in a compressed docstore (one memory-mapped file per
+# collection), not in vector payloads; the most recently read text blocks
+# are kept decompressed
+DOCSTORE_DIR = Path(os.getenv("DOCSTORE_DIR", DATA_DIR / "docstore"))
+DOCSTORE_CACHE_SIZE = int(os.getenv("DOCSTORE_CACHE_SIZE", 256))
+
+# Sentence spans and embeddings of every chunk (built at ingest), used to
+# quote only the sentences of a hit that are relevant to the question
+SENTENCE_DIR = Path(os.getenv("SENTENCE_DIR", DATA_DIR / "sentences"))
+
+# Explainer prompt budget, in tokens of the explainer model. NUM_CTX must
+# match the num_ctx of the Ollama model (Modelfile); the quotes get
+# CONTEXT_TOKENS, capped so that the fixed prompt plus MAX_TOKENS of
+# answer still fit. With no tokenizer (HF model ID or local path) tokens
+# are estimated from the character count, erring on the high side
+EXPLAINER_NUM_CTX = int(os.getenv("EXPLAINER_NUM_CTX", 4096))
+EXPLAINER_MAX_TOKENS = int(os.getenv("EXPLAINER_MAX_TOKENS", 512))
+EXPLAINER_CONTEXT_TOKENS = int(os.getenv("EXPLAINER_CONTEXT_TOKENS", 1536))
+EXPLAINER_TOKENIZER = os.getenv("EXPLAINER_TOKENIZER", "")
+
+# Embedding backend: "torch" | "onnx" | "onnx-int8" (dynamic int8 quantized
+# ONNX). ONNX variants need `pip install sentence-transformers[onnx]` and are
+# exported once into EMBED_MODEL_DIR.
+EMBED_BACKEND = os.getenv("EMBED_BACKEND", "torch")
+EMBED_QUANTIZATION = os.getenv("EMBED_QUANTIZATION", "avx2")   # arm64 | avx2 | avx512 | avx512_vnni
+EMBED_MODEL_DIR = Path(os.getenv("EMBED_MODEL_DIR", DATA_DIR / "models"))
+
+# "in-process": every API worker loads its own model. "shared": one
+# embedding server process (python -m app.retrieval.embed_server) owns the
+# model and workers send encode requests over its Unix socket
+EMBED_MODE = os.getenv("EMBED_MODE", "in-process")
+EMBED_SOCKET = Path(os.getenv("EMBED_SOCKET", DATA_DIR / "run" / "embed.sock"))
+EMBED_SERVER_TIMEOUT_SECONDS = float(os.getenv("EMBED_SERVER_TIMEOUT_SECONDS", 30))
+
+# Ingestion engine
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", 64))
+INGEST_UPSERT_BATCH_SIZE = int(os.getenv("INGEST_UPSERT_BATCH_SIZE", 256))
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", 1))
+INGEST_MAX_IN_FLIGHT = int(os.getenv("INGEST_MAX_IN_FLIGHT", 2))
+
+# Async pipeline: one pooled HTTP session for all LLM calls, and a dedicated
+# executor so CPU-bound embedding never blocks the event loop
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", 512))
+HTTP_KEEPALIVE_SECONDS = float(os.getenv("HTTP_KEEPALIVE_SECONDS", 60))
+EMBED_EXECUTOR_WORKERS = int(os.getenv("EMBED_EXECUTOR_WORKERS", 2))
+
+# Query embedding LRU (exact text → vector); 0 disables it
+EMBED_CACHE_SIZE = int(os.getenv("EMBED_CACHE_SIZE", 4096))
+
+# Cross-request micro-batching of async embeddings: texts arriving within
+# WINDOW_MS of each other (or until MAX_SIZE are queued) share one forward
+# pass. Callers wait for queue space once QUEUE_SIZE texts are pending
+EMBED_BATCHING = os.getenv("EMBED_BATCHING", "true").lower() == "true"
+EMBED_BATCH_WINDOW_MS = float(os.getenv("EMBED_BATCH_WINDOW_MS", 2))
+EMBED_BATCH_MAX_SIZE = int(os.getenv("EMBED_BATCH_MAX_SIZE", 32))
+EMBED_BATCH_QUEUE_SIZE = int(os.getenv("EMBED_BATCH_QUEUE_SIZE", 1024))
+
+# Router decision cache (on-disk, LRU + TTL)
+ROUTER_CACHE_ENABLED = os.getenv("ROUTER_CACHE_ENABLED", "true").lower() == "true"
+ROUTER_CACHE_PATH = Path(os.getenv("ROUTER_CACHE_PATH", DATA_DIR / "cache" / "router_cache.sqlite3"))
+ROUTER_CACHE_MAX_ENTRIES = int(os.getenv("ROUTER_CACHE_MAX_ENTRIES", 5000))
+ROUTER_CACHE_TTL_SECONDS = float(os.getenv("ROUTER_CACHE_TTL_SECONDS", 7 * 24 * 3600))
+
+# Embedding fast router: decide the book locally, escalate to the LLM
+# router only when the margin between books is below the threshold
+FAST_ROUTER_ENABLED = os.getenv("FAST_ROUTER_ENABLED", "true").lower() == "true"
+FAST_ROUTER_MARGIN = float(os.getenv("FAST_ROUTER_MARGIN", 0.08))
+FAST_ROUTER_TOPIC_MIN = float(os.getenv("FAST_ROUTER_TOPIC_MIN", 0.30))
+
+# Semantic answer cache for near-duplicate questions
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", 0.92))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", 1000))
+
+# Startup warmup: preload the embedding model and ping Qdrant/Ollama in the
+# background; GET /ready reports 503 until every check has passed
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() == "true"
+WARMUP_TIMEOUT_SECONDS = float(os.getenv("WARMUP_TIMEOUT_SECONDS", 5))
+
+# Logging: leveled, one line per event with the request ID; per-candidate
+# retrieval scores and prompt context are only logged at DEBUG
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")   # text | json
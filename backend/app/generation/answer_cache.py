@@ -0,0 +1,153 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.config import ANSWER_CACHE_MAX_ENTRIES, ANSWER_CACHE_THRESHOLD
+from app.ingestion.manifest import manifest_token
+
+
+def source_ids(chunks: Sequence[dict]) -> Tuple[str, ...]:
+    """
+    Identity of the retrieved context: passage IDs (or chunk IDs for
+    chunk-level payloads), order-independent.
+    """
+    return tuple(sorted(
+        str(c.get("passage_id") or c.get("chunk_id")) for c in chunks
+    ))
+
+
+class _Entry:
+    __slots__ = ("slot", "question", "book", "sources", "token", "answer", "created")
+
+    def __init__(self, slot, question, book, sources, token, answer):
+        self.slot = slot
+        self.question = question
+        self.book = book
+        self.sources = sources
+        self.token = token
+        self.answer = answer
+        self.created = time.time()
+
+
+class SemanticAnswerCache:
+    """
+    In-process vector index of answered questions.
+
+    A cached answer is reused only when
+      - the new question is within `threshold` cosine similarity, and
+      - it was generated from the same book and the same retrieved
+        passages, and
+      - that book's collection has not been re-ingested since.
+
+    Vectors live in one preallocated (max_entries, dim) matrix, so a
+    lookup is a single matrix-vector product. Eviction is LRU.
+    """
+
+    def __init__(
+        self,
+        collection_for_book: Dict[str, str],
+        threshold: float = ANSWER_CACHE_THRESHOLD,
+        max_entries: int = ANSWER_CACHE_MAX_ENTRIES,
+    ):
+        self.collection_for_book = collection_for_book
+        self.threshold = threshold
+        self.max_entries = max_entries
+
+        self._matrix: Optional[np.ndarray] = None
+        self._valid = np.zeros(max_entries, dtype=bool)
+        self._entries: "OrderedDict[int, _Entry]" = OrderedDict()   # slot → entry, LRU order
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    # ---------- invalidation ----------
+    def _token(self, book: str) -> str:
+        collection = self.collection_for_book.get(book)
+        return manifest_token(collection) if collection else "none"
+
+    def _drop(self, slot: int):
+        self._entries.pop(slot, None)
+        self._valid[slot] = False
+
+    def invalidate(self, book: Optional[str] = None) -> int:
+        with self._lock:
+            slots = [
+                s for s, e in self._entries.items()
+                if book is None or e.book == book
+            ]
+            for slot in slots:
+                self._drop(slot)
+            self.invalidations += len(slots)
+            return len(slots)
+
+    # ---------- lookup ----------
+    def lookup(self, vector: np.ndarray, book: str, chunks: Sequence[dict]) -> Optional[str]:
+        sources = source_ids(chunks)
+        token = self._token(book)
+
+        with self._lock:
+            if self._matrix is None or not self._entries:
+                self.misses += 1
+                return None
+
+            sims = self._matrix @ vector
+            sims[~self._valid] = -1.0
+
+            candidates = np.flatnonzero(sims >= self.threshold)
+            for slot in candidates[np.argsort(sims[candidates])[::-1]]:
+                entry = self._entries.get(int(slot))
+                # Other books' entries are left alone: `token` is only
+                # meaningful for the book being asked about
+                if entry is None or entry.book != book:
+                    continue
+
+                if entry.token != token:
+                    # Collection re-ingested: everything for this book is stale
+                    self._drop(entry.slot)
+                    self.invalidations += 1
+                    continue
+
+                if entry.sources == sources:
+                    self._entries.move_to_end(entry.slot)
+                    self.hits += 1
+                    return entry.answer
+
+            self.misses += 1
+            return None
+
+    # ---------- store ----------
+    def store(self, vector: np.ndarray, question: str, book: str, chunks: Sequence[dict], answer: str):
+        sources = source_ids(chunks)
+        token = self._token(book)
+
+        with self._lock:
+            if self._matrix is None:
+                self._matrix = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+
+            free = np.flatnonzero(~self._valid)
+            if len(free):
+                slot = int(free[0])
+            else:
+                slot, _ = self._entries.popitem(last=False)   # least recently used
+
+            self._matrix[slot] = vector
+            self._valid[slot] = True
+            self._entries[slot] = _Entry(slot, question, book, sources, token, answer)
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "invalidations": self.invalidations,
+        }
+
@@ -0,0 +1,365 @@
+import asyncio
+import logging
+import math
+import re
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.config import EXPLAINER_TOKENIZER
+from app.retrieval.embedding import EMBED_EXECUTOR, embed_np_async
+from app.retrieval.retriever import BOOK_COLLECTION_MAP
+from app.retrieval.sentences import SentenceIndex, get_sentence_index, split_sentences
+
+logger = logging.getLogger(__name__)
+
+# Characters per token for the estimate used without a tokenizer. Mistral
+# and Llama tokenizers average ~4 on English prose; 3.5 over-counts, so
+# an estimated budget is never overrun
+CHARS_PER_TOKEN = 3.5
+
+# Joins non-contiguous sentences taken from the same passage
+ELLIPSIS = " … "
+
+
+# =================================================
+# TOKEN COUNTING
+# =================================================
+
+class TokenCounter:
+    """
+    Token counts in the explainer model's vocabulary. Uses the Hugging Face
+    tokenizer named by EXPLAINER_TOKENIZER (model ID or local path) when
+    set, otherwise estimates from the character count.
+
+    Loading and counting are blocking: the tokenizer is loaded at warmup,
+    and callers on the event loop count on the embedding executor.
+    """
+
+    def __init__(self, name: str = EXPLAINER_TOKENIZER):
+        self.name = name
+        self._tokenizer = None
+        self._lock = threading.Lock()
+        self._failed = not name
+
+    def _load(self):
+        if self._tokenizer is None and not self._failed:
+            with self._lock:
+                if self._tokenizer is None and not self._failed:
+                    try:
+                        from transformers import AutoTokenizer
+                        self._tokenizer = AutoTokenizer.from_pretrained(self.name)
+                    except Exception as e:
+                        logger.warning("tokenizer unavailable, estimating tokens: %s", e,
+                                       extra={"tokenizer": self.name})
+                        self._failed = True
+        return self._tokenizer
+
+    @property
+    def exact(self) -> bool:
+        return self._load() is not None
+
+    def count(self, text: str) -> int:
+        tokenizer = self._load()
+        if tokenizer is None:
+            return math.ceil(len(text) / CHARS_PER_TOKEN)
+        return len(tokenizer.encode(text, add_special_tokens=False))
+
+    def count_many(self, texts: List[str]) -> List[int]:
+        tokenizer = self._load()
+        if tokenizer is None or not texts:
+            return [math.ceil(len(t) / CHARS_PER_TOKEN) for t in texts]
+        return [len(ids) for ids in tokenizer(texts, add_special_tokens=False)["input_ids"]]
+
+
+token_counter = TokenCounter()
+
+
+# =================================================
+# QUOTE SOURCES
+# =================================================
+
+def quote_source(hit: dict) -> str:
+    """
+    "Life Eternal – Love – Love and Suffering (pp. 12–13)"
+    """
+    parts = [hit.get("book")]
+    for key in ("chapter", "topic", "sub_topic"):
+        value = hit.get(key)
+        if value and value not in parts:
+            parts.append(value)
+
+    source = " – ".join(str(p) for p in parts if p) or "Unknown source"
+    if hit.get("page_range"):
+        source += f" (pp. {hit['page_range']})"
+    return source
+
+
+def _quote_block(source: str, speaker: str, text: str) -> str:
+    return f"QUOTE SOURCE: {source}\nSPEAKER: {speaker}\nTEXT:\n{text}"
+
+
+def _normalized(text: str) -> str:
+    return re.sub(r"\W+", " ", text.lower()).strip()
+
+
+# =================================================
+# CONTEXT BUILDER
+# =================================================
+
+class PromptContext:
+    def __init__(self, text: str, tokens: int, quotes: List[dict], stats: Dict):
+        self.text = text
+        self.tokens = tokens
+        self.quotes = quotes
+        self.stats = stats
+
+
+class _Unit:
+    """
+    One sentence of a hit: [start, end) in chunk coordinates.
+    """
+    __slots__ = ("hit", "start", "end", "text", "score", "tokens", "row")
+
+    def __init__(self, hit: int, start: int, end: int, text: str, score: float, row: Optional[int] = None):
+        self.hit = hit
+        self.start = start
+        self.end = end
+        self.text = text
+        self.score = score
+        self.tokens = 0
+        self.row = row   # sentence index row, None when split on the fly
+
+
+def _rank(unit: _Unit) -> Tuple[bool, float]:
+    # Cosine scores and reading-order scores are not comparable: indexed
+    # sentences rank above on-the-fly ones, each group by its own score
+    return unit.row is not None, unit.score
+
+
+class ContextBuilder:
+    """
+    Packs the retrieved quotes into a token budget.
+
+    Every hit is cut into sentences (spans precomputed at ingest, see
+    app.retrieval.sentences) and each sentence is scored by cosine
+    similarity to the question. The best sentence of every hit goes in
+    first, in rank order, so each retrieved passage is represented; the
+    remaining budget goes to the best sentences overall. Overlapping spans
+    (neighbour windows of the same chunk) and repeated wording are taken
+    once. Selected sentences are put back in text order and contiguous
+    runs are quoted as one exact slice of the source text.
+
+    Hits from a collection without a sentence index are split on the fly
+    and keep their reading order (earlier sentences first); their
+    sentences are ranked after the cosine-scored ones, never mixed in.
+    """
+
+    def __init__(self, counter: TokenCounter = token_counter):
+        self.counter = counter
+
+    async def build(
+        self,
+        hits: List[dict],
+        question: str,
+        budget: int,
+        question_vector: Optional[np.ndarray] = None,
+    ) -> PromptContext:
+        """
+        Sentence index reads and token counting run on the embedding
+        executor, off the event loop.
+        """
+        t0 = time.perf_counter()
+        loop = asyncio.get_running_loop()
+
+        units, indexes = await loop.run_in_executor(EMBED_EXECUTOR, self._units, hits)
+        if indexes and question_vector is None:
+            question_vector = await embed_np_async(question)
+
+        return await loop.run_in_executor(
+            EMBED_EXECUTOR, self._pack, t0, hits, units, indexes, question_vector, budget
+        )
+
+    def _pack(
+        self,
+        t0: float,
+        hits: List[dict],
+        units: List["_Unit"],
+        indexes: Dict[str, SentenceIndex],
+        question_vector: Optional[np.ndarray],
+        budget: int,
+    ) -> PromptContext:
+        if indexes:
+            self._score(units, hits, indexes, question_vector)
+
+        chosen = self._select(units, hits, budget)
+        quotes = self._assemble(chosen, hits)
+        text = "\n\n".join(q["block"] for q in quotes)
+        tokens = self.counter.count(text) if text else 0
+
+        # Per-sentence counts can undercount the joined text by a few
+        # tokens; drop the weakest sentences until the whole fits
+        while tokens > budget and chosen:
+            chosen.remove(min(chosen, key=_rank))
+            quotes = self._assemble(chosen, hits)
+            text = "\n\n".join(q["block"] for q in quotes)
+            tokens = self.counter.count(text) if text else 0
+
+        stats = {
+            "hits": len(hits),
+            "sentences": len(units),
+            "selected": len(chosen),
+            "quotes": len(quotes),
+            "tokens": tokens,
+            "budget": budget,
+            "source_chars": sum(len(h.get("text", "")) for h in hits),
+            "chars": len(text),
+            "exact_tokens": self.counter.exact,
+            "sentence_index": bool(indexes),
+            "ms": round((time.perf_counter() - t0) * 1000, 1),
+        }
+        return PromptContext(text, tokens, quotes, stats)
+
+    # ---------- sentences ----------
+    def _units(self, hits: List[dict]) -> Tuple[List[_Unit], Dict[str, SentenceIndex]]:
+        """
+        Units plus the sentence index each scored collection was read
+        from; _score uses the same objects, so a rebuild in between
+        cannot misalign rows.
+        """
+        units: List[_Unit] = []
+        fetched: Dict[str, Optional[SentenceIndex]] = {}
+        indexes: Dict[str, SentenceIndex] = {}
+
+        for i, hit in enumerate(hits):
+            text = hit["text"]
+            base = hit.get("char_start") or 0
+            collection = BOOK_COLLECTION_MAP.get(hit.get("book"), "")
+
+            # Index spans are chunk offsets, usable only when the hit text
+            # is the exact [char_start, char_end) slice of its chunk
+            index = None
+            if hit.get("char_end") == base + len(text):
+                if collection not in fetched:
+                    fetched[collection] = get_sentence_index(collection)
+                index = fetched[collection]
+            rows = index.rows(hit.get("chunk_id"), base, base + len(text)) if index else []
+
+            if len(rows):
+                indexes[collection] = index
+                for row in rows:
+                    start, end = int(index.starts[row]), int(index.ends[row])
+                    units.append(_Unit(i, start, end, text[start - base:end - base], 0.0, int(row)))
+            else:
+                spans = split_sentences(text)
+                # Reading order: hit rank first, then position in the hit
+                for j, (a, b) in enumerate(spans):
+                    units.append(_Unit(i, base + a, base + b, text[a:b], -i - j / (len(spans) + 1)))
+
+        return units, indexes
+
+    def _score(self, units: List[_Unit], hits: List[dict], indexes: Dict[str, SentenceIndex], question_vector: np.ndarray):
+        by_collection: Dict[str, List[_Unit]] = {}
+        for unit in units:
+            if unit.row is not None:
+                collection = BOOK_COLLECTION_MAP.get(hits[unit.hit].get("book"), "")
+                by_collection.setdefault(collection, []).append(unit)
+
+        q = np.asarray(question_vector, dtype=np.float32)
+        for collection, group in by_collection.items():
+            index = indexes[collection]
+            rows = np.fromiter((u.row for u in group), dtype=np.int64, count=len(group))
+            sims = index.vectors[rows].astype(np.float32) @ q
+            for unit, sim in zip(group, sims.tolist()):
+                unit.score = sim
+
+    # ---------- packing ----------
+    def _select(self, units: List[_Unit], hits: List[dict], budget: int) -> List[_Unit]:
+        if not units:
+            return []
+
+        for unit, tokens in zip(units, self.counter.count_many([u.text for u in units])):
+            unit.tokens = tokens + 1   # separator
+
+        headers = {
+            i: self.counter.count(_quote_block(quote_source(hit), hit.get("speaker", ""), "")) + 2
+            for i, hit in enumerate(hits)
+        }
+
+        best_per_hit: Dict[int, _Unit] = {}
+        for unit in units:
+            if unit.hit not in best_per_hit or unit.score > best_per_hit[unit.hit].score:
+                best_per_hit[unit.hit] = unit
+
+        order = [best_per_hit[i] for i in sorted(best_per_hit)]
+        order += sorted(
+            (u for u in units if best_per_hit[u.hit] is not u),
+            key=_rank,
+            reverse=True
+        )
+
+        chosen: List[_Unit] = []
+        spans: Dict[str, List[Tuple[int, int]]] = {}
+        seen_text = set()
+        open_hits = set()
+        used = 0
+
+        for unit in order:
+            chunk_id = hits[unit.hit].get("chunk_id")
+            if any(unit.start < end and start < unit.end for start, end in spans.get(chunk_id, [])):
+                continue
+
+            key = _normalized(unit.text)
+            if key in seen_text:
+                continue
+
+            cost = unit.tokens + (0 if unit.hit in open_hits else headers[unit.hit])
+            if used + cost > budget:
+                continue
+
+            chosen.append(unit)
+            spans.setdefault(chunk_id, []).append((unit.start, unit.end))
+            seen_text.add(key)
+            open_hits.add(unit.hit)
+            used += cost
+
+        return chosen
+
+    @staticmethod
+    def _assemble(chosen: List[_Unit], hits: List[dict]) -> List[dict]:
+        by_hit: Dict[int, List[_Unit]] = {}
+        for unit in chosen:
+            by_hit.setdefault(unit.hit, []).append(unit)
+
+        quotes = []
+        for i in sorted(by_hit):
+            hit = hits[i]
+            text = hit["text"]
+            base = hit.get("char_start") or 0
+
+            # Contiguous sentences (only whitespace between them in the
+            # source) become one exact slice
+            runs: List[List[int]] = []
+            for unit in sorted(by_hit[i], key=lambda u: u.start):
+                if runs and not text[runs[-1][1] - base:unit.start - base].strip():
+                    runs[-1][1] = unit.end
+                else:
+                    runs.append([unit.start, unit.end])
+
+            quote = ELLIPSIS.join(text[a - base:b - base] for a, b in runs)
+            source = quote_source(hit)
+            quotes.append({
+                "passage_id": hit.get("passage_id"),
+                "chunk_id": hit.get("chunk_id"),
+                "source": source,
+                "spans": runs,
+                "text": quote,
+                "block": _quote_block(source, hit.get("speaker", ""), quote),
+            })
+
+        return quotes
+
+
+context_builder = ContextBuilder()
@@ -1,122 +1,216 @@
-from typing import List
-import requests
-import os
-from google import genai
+from typing import AsyncIterator, List, Optional
+import asyncio
+import logging
+import time
 
 from app.config import (
     LOCAL_LLM_ENABLED,
     GEMINI_ENABLED,
-    OLLAMA_URL,
-    OLLAMA_MODEL,
-    GEMINI_MODEL,
+    OLLAMA_EXPLAINER_TIMEOUT_SECONDS,
+    EXPLAINER_NUM_CTX,
+    EXPLAINER_MAX_TOKENS,
+    EXPLAINER_CONTEXT_TOKENS,
+)
+from app.generation.context import context_builder, token_counter
+from app.llm import gemini
+from app.llm.ollama import ollama
+from app.retrieval.embedding import EMBED_EXECUTOR
+from app.metrics import FALLBACKS, observe_ollama, observe_stage
+
+logger = logging.getLogger(__name__)
+
+EXPLAINER_SYSTEM_MESSAGE = (
+    "You are a strict spiritual text explainer.\n"
+    "Use ONLY the provided quotes.\n"
+    "Do NOT add new ideas."
+)
+
+FALLBACK_ANSWER = (
+    "Meher Baba has not spoken directly on this question "
+    "in the available authoritative texts."
 )
 
 
-def generate(context_chunks: List[dict], question: str) -> str:
+def select_quotes(context_chunks: List[dict]) -> List[dict]:
     """
-    Generate answer STRICTLY based on Meher Baba's words.
-    Local Ollama first. Gemini optional fallback.
+    Quote gate: only Meher Baba's own words go into the prompt.
     """
-
-    # --------------------------------------------------
-    # 1️⃣ Quote Gate
-    # --------------------------------------------------
     baba_quotes = [
         c for c in context_chunks
         if c.get("speaker") == "Meher Baba" and c.get("text")
     ]
-    # print(f"🔍 Found {len(baba_quotes)} relevant Baba quotes in context.")
-    
-    # --------------------------------------------------
-    # 2️⃣ Build Context
-    # --------------------------------------------------
-    context_text = "\n\n".join(
-        f"QUOTE SOURCE: {c.get('source', 'Unknown source')}\n"
-        f"SPEAKER: {c.get('speaker')}\n"
-        f"TEXT:\n{c.get('text')}"
-        for c in baba_quotes[:6]
-    )
-    print(context_text)
-    prompt = f""" You are NOT allowed to invent explanations.
+    return baba_quotes[:6]
+
+
+def build_prompt(context_text: str, question: str) -> str:
+    return f""" You are NOT allowed to invent explanations.
       RULES (STRICT):
-        - Use ONLY Meher Baba’s words from the context 
-        - Quote Baba clearly - Do NOT add philosophy 
-        - Do NOT add new ideas 
-        - Do NOT explain beyond the quotes 
-        - After quoting, give a VERY SIMPLE human explanation 
-        - Relate it gently to the user's problem 
+        - Use ONLY Meher Baba’s words from the context
+        - Quote Baba clearly - Do NOT add philosophy
+        - Do NOT add new ideas
+        - Do NOT explain beyond the quotes
+        - After quoting, give a VERY SIMPLE human explanation
+        - Relate it gently to the user's problem
         - If something is not in context, say exactly: "Meher Baba has not spoken directly on this."
         FORMAT (STRICT): 1) Baba's Words (quoted) 2) Simple Meaning (1–2 lines) 3) How this helps the person CONTEXT (AUTHORITATIVE):
-        {context_text} 
+        {context_text}
         USER QUESTION: {question} """
+
+
+def context_budget(question: str) -> int:
+    """
+    Tokens left for quotes: the model window minus the answer reserve and
+    everything else in the prompt, capped at EXPLAINER_CONTEXT_TOKENS.
+    """
+    fixed = token_counter.count(EXPLAINER_SYSTEM_MESSAGE + build_prompt("", question))
+    return max(0, min(EXPLAINER_CONTEXT_TOKENS, EXPLAINER_NUM_CTX - EXPLAINER_MAX_TOKENS - fixed))
+
+
+async def prepare_prompt(context_chunks: List[dict], question: str, timings: Optional[dict] = None) -> str:
+    """
+    Prompt with the most relevant sentences of Baba's quotes, packed into
+    the token budget (see app.generation.context).
+    """
+    t0 = time.perf_counter()
+    loop = asyncio.get_running_loop()
+    budget = await loop.run_in_executor(EMBED_EXECUTOR, context_budget, question)
+    context = await context_builder.build(select_quotes(context_chunks), question, budget)
+    observe_stage("context", time.perf_counter() - t0)
+
+    if timings is not None:
+        timings["context_ms"] = context.stats["ms"]
+        timings["context_tokens"] = context.tokens
+        timings["context_quotes"] = len(context.quotes)
+
+    logger.debug("explainer context", extra={"context": context.text, **context.stats})
+    return build_prompt(context.text, question)
+
+
+def _record_prompt_eval(timings: Optional[dict], data: dict):
+    """
+    Prompt size and prompt evaluation time as reported by Ollama.
+    """
+    if timings is None:
+        return
+    if data.get("prompt_eval_count") is not None:
+        timings["prompt_tokens"] = data["prompt_eval_count"]
+    if data.get("prompt_eval_duration") is not None:
+        timings["prompt_eval_ms"] = round(data["prompt_eval_duration"] / 1e6, 1)
+
+
+def _messages(prompt: str) -> List[dict]:
+    return [
+        {"role": "system", "content": EXPLAINER_SYSTEM_MESSAGE},
+        {"role": "user", "content": prompt},
+    ]
+
+
+# Keeps the answer inside the reserve the context budget assumes
+OLLAMA_OPTIONS = {"options": {"num_predict": EXPLAINER_MAX_TOKENS}, "temperature": 0.2}
+
+
+async def _generate_gemini(prompt: str) -> str:
+    if LOCAL_LLM_ENABLED:
+        FALLBACKS.labels("explainer_gemini").inc()
+    return await gemini.generate_text(prompt)
+
+
+async def generate(context_chunks: List[dict], question: str, timings: Optional[dict] = None) -> str:
+    """
+    Generate answer STRICTLY based on Meher Baba's words.
+    Local Ollama first. Gemini optional fallback.
+    """
+    prompt = await prepare_prompt(context_chunks, question, timings)
+
     if LOCAL_LLM_ENABLED:
-      try:
-        print("🟢 Using LOCAL Ollama explainer")
-
-        payload = {
-            "model": OLLAMA_MODEL,
-            "messages": [
-                {
-                    "role": "system",
-                    "content": (
-                        "You are a strict spiritual text explainer.\n"
-                        "Use ONLY the provided quotes.\n"
-                        "Do NOT add new ideas."
-                    ),
-                },
-                {"role": "user", "content": prompt},
-            ],
-            "temperature": 0.2,
-            "stream": False 
-        }
-
-        r = requests.post(
-            OLLAMA_URL,     # should be http://localhost:11434/api/chat
-            json=payload,
-            timeout=(5, 180)   # ✅ IMPORTANT UPGRADE
-        )
-
-        r.raise_for_status()
-
-        data = r.json()
-
-        if "message" not in data:
-            raise RuntimeError(f"Unexpected Ollama response: {data}")
-
-        return data["message"]["content"].strip()   # ✅ FIXED
-
-      except Exception as local_err:
-        print("⚠️ Ollama explainer failed:", local_err)
-
-        if not GEMINI_ENABLED:
-            return (
-                "Meher Baba has not spoken directly on this question "
-                "in the available authoritative texts."
+        try:
+            t0 = time.perf_counter()
+            data = await ollama.chat(
+                _messages(prompt),
+                timeout_seconds=OLLAMA_EXPLAINER_TIMEOUT_SECONDS,
+                **OLLAMA_OPTIONS
             )
 
+            observe_stage("explainer_llm", time.perf_counter() - t0)
+            observe_ollama("explainer", data)
+            _record_prompt_eval(timings, data)
+            return data["message"]["content"].strip()
+
+        except Exception as local_err:
+            logger.warning("Ollama explainer failed: %s", local_err)
+
     # --------------------------------------------------
-    # 4️⃣ GEMINI FALLBACK (OPTIONAL)
+    # GEMINI FALLBACK (OPTIONAL)
     # --------------------------------------------------
-    else:
+    if GEMINI_ENABLED:
         try:
-            print("🟡 Using Gemini fallback")
+            return await _generate_gemini(prompt)
 
-            gclient = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
+        except Exception as gemini_err:
+            logger.error("Gemini explainer failed: %s", gemini_err)
 
-            response = gclient.models.generate_content(
-                model=GEMINI_MODEL,
-                contents=prompt
-            )
+    # --------------------------------------------------
+    # FINAL SAFE FALLBACK
+    # --------------------------------------------------
+    FALLBACKS.labels("explainer_fallback_answer").inc()
+    return FALLBACK_ANSWER
+
+
+async def generate_stream(
+    context_chunks: List[dict],
+    question: str,
+    timings: Optional[dict] = None
+) -> AsyncIterator[str]:
+    """
+    Streaming variant of generate(): yields answer text as Ollama produces it.
+    Falls back exactly like generate() when the stream cannot be started;
+    once tokens have been sent, a broken stream just ends.
 
-            return (response.text or "").strip()
+    timings["answer_complete"] is True only when the whole answer was sent
+    (Ollama reported done, or the Gemini fallback answered), so callers
+    never cache an answer cut off mid-stream.
+    """
+    prompt = await prepare_prompt(context_chunks, question, timings)
+
+    if LOCAL_LLM_ENABLED:
+        sent_any = False
+        try:
+            t0 = time.perf_counter()
+            async for data in ollama.chat_stream(
+                _messages(prompt),
+                timeout_seconds=OLLAMA_EXPLAINER_TIMEOUT_SECONDS,
+                **OLLAMA_OPTIONS
+            ):
+                token = data.get("message", {}).get("content", "")
+                if token:
+                    sent_any = True
+                    yield token
+
+                if data.get("done"):
+                    observe_ollama("explainer", data)
+                    _record_prompt_eval(timings, data)
+                    if timings is not None:
+                        timings["answer_complete"] = True
+
+            observe_stage("explainer_llm", time.perf_counter() - t0)
+            return
+
+        except Exception as local_err:
+            logger.warning("Ollama explainer stream failed: %s", local_err)
+
+            if sent_any:
+                return
+
+    if GEMINI_ENABLED:
+        try:
+            answer = await _generate_gemini(prompt)
+            if timings is not None:
+                timings["answer_complete"] = True
+            yield answer
+            return
 
         except Exception as gemini_err:
-            print("❌ Gemini explainer failed:", gemini_err)
+            logger.error("Gemini explainer failed: %s", gemini_err)
 
-    # --------------------------------------------------
-    # 5️⃣ FINAL SAFE FALLBACK
-    # --------------------------------------------------
-    return (
-        "Meher Baba has not spoken directly on this question "
-        "in the available authoritative texts."
-    )
+    FALLBACKS.labels("explainer_fallback_answer").inc()
+    yield FALLBACK_ANSWER
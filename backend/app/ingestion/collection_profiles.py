@@ -0,0 +1,389 @@
+import argparse
+import json
+import time
+import urllib.request
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.config import COLLECTIONS_CONFIG, QDRANT_HOST, QDRANT_PORT
+
+
+# =============================
+# CONFIG
+# =============================
+# collections.json names a tuning profile per collection. A profile holds
+# the Qdrant settings that matter at this size: on-disk vs in-RAM vectors,
+# HNSW graph, optimizer thresholds (segment count, when to index / mmap),
+# scalar quantization, and the search-time params used by retrieve().
+
+@lru_cache(maxsize=1)
+def load_collections_config() -> Dict:
+    with open(COLLECTIONS_CONFIG, "r", encoding="utf-8") as f:
+        config = json.load(f)
+
+    for name, entry in config["collections"].items():
+        if entry["profile"] not in config["profiles"]:
+            raise ValueError(f"{COLLECTIONS_CONFIG}: unknown profile {entry['profile']!r} for {name}")
+    return config
+
+
+def collection_profile(collection_name: str, profile_name: Optional[str] = None) -> Dict:
+    config = load_collections_config()
+    name = profile_name or config["collections"].get(collection_name, {}).get("profile")
+    if name not in config["profiles"]:
+        raise ValueError(f"No profile {name!r} for {collection_name}, expected one of {list(config['profiles'])}")
+    return {"name": name, **config["profiles"][name]}
+
+
+@lru_cache(maxsize=None)
+def search_params(collection_name: str):
+    """
+    SearchParams of the collection's profile (hnsw_ef, exact, quantization
+    rescore/oversampling), or None for Qdrant's defaults.
+    """
+    from qdrant_client.models import SearchParams
+
+    if collection_name not in load_collections_config()["collections"]:
+        return None
+    search = collection_profile(collection_name).get("search")
+    return SearchParams(**search) if search else None
+
+
+# =============================
+# QDRANT PARAMS
+# =============================
+def _quantization(profile: Dict):
+    from qdrant_client.models import Disabled, ScalarQuantization, ScalarQuantizationConfig
+
+    q = profile.get("quantization")
+    if not q:
+        return Disabled.DISABLED
+    return ScalarQuantization(scalar=ScalarQuantizationConfig(**q))
+
+
+def create_params(profile: Dict) -> Dict:
+    from qdrant_client.models import Disabled, HnswConfigDiff, OptimizersConfigDiff, VectorParams
+
+    config = load_collections_config()
+    quantization = _quantization(profile)
+    return {
+        "vectors_config": VectorParams(
+            size=config["vector_size"],
+            distance=config["distance"],
+            on_disk=profile["vectors"].get("on_disk", False)
+        ),
+        "hnsw_config": HnswConfigDiff(**profile["hnsw_config"]),
+        "optimizers_config": OptimizersConfigDiff(**profile["optimizers_config"]),
+        "quantization_config": None if quantization is Disabled.DISABLED else quantization,
+        "on_disk_payload": True,
+    }
+
+
+def update_params(profile: Dict) -> Dict:
+    from qdrant_client.models import HnswConfigDiff, OptimizersConfigDiff, VectorParamsDiff
+
+    return {
+        # "" is the unnamed (default) vector
+        "vectors_config": {"": VectorParamsDiff(on_disk=profile["vectors"].get("on_disk", False))},
+        "hnsw_config": HnswConfigDiff(**profile["hnsw_config"]),
+        "optimizers_config": OptimizersConfigDiff(**profile["optimizers_config"]),
+        "quantization_config": _quantization(profile),
+    }
+
+
+# =============================
+# APPLY / COMPACT
+# =============================
+def ensure_collection(qdrant, collection_name: str, profile_name: Optional[str] = None, recreate: bool = False) -> str:
+    """
+    Create the collection with its profile, or bring an existing one in
+    line with it (Qdrant rebuilds segments/indexes in the background).
+    """
+    profile = collection_profile(collection_name, profile_name)
+    exists = qdrant.collection_exists(collection_name)
+
+    if exists and not recreate:
+        qdrant.update_collection(collection_name=collection_name, **update_params(profile))
+        print(f"🔧 {collection_name}: applied profile {profile['name']!r}")
+        return "updated"
+
+    if exists:
+        qdrant.delete_collection(collection_name)
+    qdrant.create_collection(collection_name=collection_name, **create_params(profile))
+    print(f"✅ {collection_name}: created with profile {profile['name']!r}")
+    return "recreated" if exists else "created"
+
+
+def wait_until_optimized(qdrant, collection_name: str, timeout: float = 300.0, poll: float = 0.5):
+    from qdrant_client.models import CollectionStatus
+
+    deadline = time.monotonic() + timeout
+    while True:
+        info = qdrant.get_collection(collection_name)
+        if info.status == CollectionStatus.GREEN or time.monotonic() > deadline:
+            return info
+        time.sleep(poll)
+
+
+def compact(qdrant, collection_name: str, profile_name: Optional[str] = None, timeout: float = 300.0) -> Dict:
+    """
+    Merge segments and build the index now rather than at the next
+    optimizer tick. Re-sending the profile's optimizer config wakes the
+    optimizers; with default_segment_number = 1 the merge optimizer folds
+    the small segments left by incremental upserts into one.
+    """
+    from qdrant_client.models import OptimizersConfigDiff
+
+    profile = collection_profile(collection_name, profile_name)
+    before = qdrant.get_collection(collection_name).segments_count
+
+    t0 = time.perf_counter()
+    qdrant.update_collection(
+        collection_name=collection_name,
+        optimizers_config=OptimizersConfigDiff(**profile["optimizers_config"])
+    )
+    info = wait_until_optimized(qdrant, collection_name, timeout)
+
+    result = {
+        "collection": collection_name,
+        "segments_before": before,
+        "segments_after": info.segments_count,
+        "status": str(getattr(info.status, "value", info.status)),
+        "seconds": round(time.perf_counter() - t0, 2),
+    }
+    print(f"🧹 {collection_name}: {before} → {info.segments_count} segments "
+          f"({result['status']}, {result['seconds']} s)")
+    return result
+
+
+# =============================
+# MEASURE
+# =============================
+def estimate_ram(points: int, profile: Dict) -> Dict[str, int]:
+    """
+    Bytes the profile keeps resident for `points` vectors: float32
+    vectors unless on disk, the int8 copy when always_ram, and the HNSW
+    level-0 links (2·m ids per point) once indexed.
+    """
+    dim = load_collections_config()["vector_size"]
+    quantization = profile.get("quantization") or {}
+    hnsw = profile["hnsw_config"]
+    indexed = profile["optimizers_config"].get("indexing_threshold", 20000) != 0
+
+    ram = {
+        "vectors": 0 if profile["vectors"].get("on_disk") else points * dim * 4,
+        "quantized": points * dim if quantization.get("always_ram") else 0,
+        "hnsw": points * 2 * hnsw.get("m", 16) * 4 if indexed and not hnsw.get("on_disk") else 0,
+    }
+    ram["total"] = sum(ram.values())
+    return ram
+
+
+def qdrant_resident_bytes(host: str = QDRANT_HOST, port: int = QDRANT_PORT) -> Optional[int]:
+    """
+    Process RSS from Qdrant's /metrics (whole server, all collections).
+    """
+    try:
+        with urllib.request.urlopen(f"http://{host}:{port}/metrics", timeout=5) as r:
+            for line in r.read().decode("utf-8").splitlines():
+                if line.startswith("memory_resident_bytes"):
+                    return int(float(line.split()[-1]))
+    except OSError:
+        return None
+    return None
+
+
+def sample_queries(qdrant, collection_name: str, n: int, noise: float, seed: int) -> np.ndarray:
+    """
+    Stored vectors plus Gaussian noise, normalized: realistic neighbours
+    without needing the embedding model.
+    """
+    points, _ = qdrant.scroll(collection_name=collection_name, limit=max(n, 1) * 4, with_vectors=True)
+    vectors = np.asarray([p.vector for p in points], dtype=np.float32)
+    if not len(vectors):
+        return vectors
+
+    rng = np.random.default_rng(seed)
+    queries = vectors[rng.integers(0, len(vectors), size=n)]
+    queries = queries + rng.normal(0, noise, size=queries.shape)
+    return (queries / np.linalg.norm(queries, axis=1, keepdims=True)).astype(np.float32)
+
+
+def measure_queries(qdrant, collection_name: str, queries: np.ndarray, limit: int, params) -> Dict:
+    """
+    Latency of query_points() with the profile's search params, and
+    recall@limit against exact search.
+    """
+    from qdrant_client.models import SearchParams
+
+    latencies: List[float] = []
+    recalls: List[float] = []
+    for q in queries:
+        t0 = time.perf_counter()
+        hits = qdrant.query_points(collection_name=collection_name, query=q.tolist(),
+                                   limit=limit, search_params=params).points
+        latencies.append(time.perf_counter() - t0)
+
+        exact = qdrant.query_points(collection_name=collection_name, query=q.tolist(),
+                                    limit=limit, search_params=SearchParams(exact=True)).points
+        if exact:
+            recalls.append(len({h.id for h in hits} & {h.id for h in exact}) / len(exact))
+
+    def pct(q):
+        return round(float(np.percentile(latencies, q)) * 1000, 3) if latencies else None
+
+    return {
+        "p50_ms": pct(50),
+        "p95_ms": pct(95),
+        "p99_ms": pct(99),
+        "recall": round(float(np.mean(recalls)), 4) if recalls else None,
+    }
+
+
+def report_collection(qdrant, collection_name: str, args, profile_name: Optional[str] = None) -> Dict:
+    from qdrant_client.models import SearchParams
+
+    profile = collection_profile(collection_name, profile_name)
+    info = qdrant.get_collection(collection_name)
+    points = info.points_count or 0
+
+    queries = sample_queries(qdrant, collection_name, args.queries, args.noise, args.seed)
+    params = SearchParams(**profile["search"]) if profile.get("search") else None
+
+    # Warm up (opens mmaps, loads the graph)
+    for q in queries[:5]:
+        qdrant.query_points(collection_name=collection_name, query=q.tolist(), limit=args.limit, search_params=params)
+
+    return {
+        "collection": collection_name,
+        "profile": profile["name"],
+        "points": points,
+        "indexed_vectors": info.indexed_vectors_count,
+        "segments": info.segments_count,
+        "status": str(getattr(info.status, "value", info.status)),
+        "ram_estimate_mb": {k: round(v / 1e6, 3) for k, v in estimate_ram(points, profile).items()},
+        **measure_queries(qdrant, collection_name, queries, args.limit, params),
+    }
+
+
+def print_rows(rows: List[Dict]):
+    print(f"\n{'collection':>40} {'profile':>12} {'points':>7} {'segs':>5} {'indexed':>8} "
+          f"{'RAM MB':>8} {'p50 ms':>8} {'p95 ms':>8} {'recall':>7}")
+    for r in rows:
+        print(f"{r['collection']:>40} {r['profile']:>12} {r['points']:>7} {r['segments']:>5} "
+              f"{r['indexed_vectors']:>8} {r['ram_estimate_mb']['total']:>8} "
+              f"{r['p50_ms']:>8} {r['p95_ms']:>8} {r['recall']:>7}")
+
+
+# =============================
+# SWEEP
+# =============================
+def copy_collection(qdrant, source: str, target: str, batch: int = 256) -> int:
+    from qdrant_client.models import PointStruct
+
+    copied = 0
+    offset = None
+    while True:
+        points, offset = qdrant.scroll(collection_name=source, limit=batch, offset=offset,
+                                       with_payload=True, with_vectors=True)
+        if points:
+            qdrant.upsert(collection_name=target, wait=True, points=[
+                PointStruct(id=p.id, vector=p.vector, payload=p.payload) for p in points
+            ])
+            copied += len(points)
+        if offset is None:
+            return copied
+
+
+def sweep(qdrant, collection_name: str, profiles: List[str], args) -> List[Dict]:
+    """
+    Copy the collection once per profile into a scratch collection,
+    compact it, and measure it. Scratch collections are dropped afterwards
+    unless --keep.
+    """
+    rows = []
+    for profile_name in profiles:
+        scratch = f"{collection_name}__{profile_name}"
+        ensure_collection(qdrant, scratch, profile_name, recreate=True)
+        copied = copy_collection(qdrant, collection_name, scratch)
+        print(f"📦 {scratch}: {copied} points copied")
+        compact(qdrant, scratch, profile_name, args.timeout)
+
+        row = report_collection(qdrant, scratch, args, profile_name)
+        row["resident_mb"] = _resident_mb(args)
+        rows.append(row)
+
+        if not args.keep:
+            qdrant.delete_collection(scratch)
+    return rows
+
+
+def _resident_mb(args) -> Optional[float]:
+    rss = qdrant_resident_bytes(args.host, args.port)
+    return round(rss / 1e6, 1) if rss is not None else None
+
+
+# =============================
+# CLI
+# =============================
+def main():
+    config = load_collections_config()
+
+    parser = argparse.ArgumentParser(description=(
+        f"Create, tune, compact and measure the Qdrant collections from {COLLECTIONS_CONFIG.name}"
+    ))
+    parser.add_argument("command", choices=["apply", "compact", "report", "sweep"])
+    parser.add_argument("--collections", nargs="+", default=list(config["collections"]))
+    parser.add_argument("--profile", help="apply/report: override the configured profile")
+    parser.add_argument("--profiles", nargs="+", default=list(config["profiles"]),
+                        help="sweep: profiles to compare")
+    parser.add_argument("--recreate", action="store_true",
+                        help="apply: drop and recreate (re-run ingestion afterwards)")
+    parser.add_argument("--keep", action="store_true", help="sweep: keep the scratch collections")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=9, help="Points per query (retrieve() asks for top_k * 3)")
+    parser.add_argument("--noise", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=300.0, help="Seconds to wait for optimization")
+    parser.add_argument("--host", default=QDRANT_HOST)
+    parser.add_argument("--port", type=int, default=QDRANT_PORT)
+    parser.add_argument("--out", help="report/sweep: write the rows as JSON")
+    args = parser.parse_args()
+
+    from qdrant_client import QdrantClient
+
+    qdrant = QdrantClient(host=args.host, port=args.port)
+    rows: List[Dict] = []
+
+    if args.command == "apply":
+        for name in args.collections:
+            ensure_collection(qdrant, name, args.profile, args.recreate)
+        if args.recreate:
+            print("⚠️ Collections are empty now; re-run ingestion")
+        return
+
+    if args.command == "compact":
+        for name in args.collections:
+            compact(qdrant, name, timeout=args.timeout)
+        return
+
+    if args.command == "report":
+        rows = [report_collection(qdrant, name, args, args.profile) for name in args.collections]
+        print_rows(rows)
+        print(f"\n🧠 Qdrant resident memory: {_resident_mb(args)} MB (whole server)")
+
+    if args.command == "sweep":
+        for name in args.collections:
+            rows.extend(sweep(qdrant, name, args.profiles, args))
+        print_rows(rows)
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+        print(f"💾 Wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+import hashlib
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from app.config import EMBEDDED_DTYPE, INGEST_BATCH_SIZE
+from app.ingestion.manifest import (
+    chunk_hash,
+    load_manifest,
+    save_manifest,
+    settings_fingerprint,
+    vector_fingerprint,
+)
+from app.ingestion.passages import build_passages, vector_payload
+from app.retrieval.docstore import build_docstore, docstore_path
+from app.retrieval.lexical import build_lexical_index
+from app.retrieval.sentences import build_sentence_index, sentence_index_path
+from app.retrieval.stores import load_embedded_table, write_embedded_collection
+
+
+def passage_hash(text: str) -> str:
+    """
+    Vector identity: the passage text under the current model/passage
+    settings. Equal hash → the stored vector can be reused as is, even
+    when only the payload layout changed.
+    """
+    raw = vector_fingerprint() + "\n" + text
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def build_embedded_collection(
+    collection_name: str,
+    chunks: List[Dict],
+    embedder,
+    batch_size: int = INGEST_BATCH_SIZE,
+    dtype: str = EMBEDDED_DTYPE,
+) -> Dict:
+    """
+    (Re)build the embedded vector store for one collection from the
+    normalized chunks. Vectors of passages whose text did not change are
+    copied from the previous build; only the rest are encoded.
+    Also rebuilds the docstore, the BM25 and sentence indexes and records
+    the manifest, so caches keyed on the collection contents are invalidated.
+    """
+    started = time.perf_counter()
+
+    unique: Dict[str, Dict] = {}
+    for chunk in chunks:
+        if chunk.get("id") and chunk.get("text"):
+            unique.setdefault(chunk["id"], chunk)
+
+    payloads = [p for chunk in unique.values() for p in build_passages(chunk)]
+    hashes = [passage_hash(p["text"]) for p in payloads]
+
+    previous = load_embedded_table(collection_name)
+    old_rows = {}
+    old_vectors = None
+    if previous is not None:
+        rows, old_vectors = previous
+        old_rows = {(r["passage_id"], r.get("text_hash")): i for i, r in enumerate(rows)}
+
+    reuse = [old_rows.get((p["passage_id"], h)) for p, h in zip(payloads, hashes)]
+    to_encode = [i for i, row in enumerate(reuse) if row is None]
+
+    dim = embedder.get_sentence_embedding_dimension()
+    vectors = np.zeros((len(payloads), dim), dtype=np.float32)
+
+    reused = [(i, row) for i, row in enumerate(reuse) if row is not None]
+    if reused:
+        targets, rows = zip(*reused)
+        vectors[list(targets)] = old_vectors[list(rows)]
+
+    t0 = time.perf_counter()
+    for start in range(0, len(to_encode), batch_size):
+        batch = to_encode[start:start + batch_size]
+        vectors[batch] = embedder.encode(
+            [payloads[i]["text"] for i in batch],
+            batch_size=batch_size,
+            normalize_embeddings=True,
+            convert_to_numpy=True,
+            show_progress_bar=False
+        )
+    embed_seconds = time.perf_counter() - t0
+
+    removed = len(old_rows) - len(reused)
+    manifest = load_manifest(collection_name)
+
+    # Edits that leave the embedded text as is (topic, chapter, speaker…)
+    # reuse every vector but still change payloads, so compare whole
+    # chunks against the manifest as sync does
+    chunk_hashes = {cid: chunk_hash(chunk) for cid, chunk in unique.items()}
+    known = manifest.get("chunks", {})
+    edited = [cid for cid, digest in chunk_hashes.items() if known.get(cid, {}).get("hash") != digest]
+
+    changed = bool(
+        to_encode or removed or previous is None or edited
+        or set(known) != set(chunk_hashes)
+        or manifest.get("settings") != settings_fingerprint()
+        or not docstore_path(collection_name).exists()
+    )
+
+    if changed:
+        # Texts first, so no new row points at a chunk the docstore lacks
+        build_docstore(collection_name, unique.values())
+        write_embedded_collection(
+            collection_name, vectors, [vector_payload(p) for p in payloads], hashes, dtype=dtype
+        )
+
+        counts: Dict[str, int] = {}
+        for p in payloads:
+            counts[p["chunk_id"]] = counts.get(p["chunk_id"], 0) + 1
+
+        manifest["chunks"] = {
+            cid: {"hash": chunk_hashes[cid], "passages": counts.get(cid, 0)}
+            for cid in unique
+        }
+        save_manifest(manifest)
+        build_lexical_index(collection_name, unique.values())
+
+    if changed or not sentence_index_path(collection_name).exists():
+        build_sentence_index(collection_name, unique.values(), embedder, batch_size=batch_size)
+
+    return {
+        "collection": collection_name,
+        "store": "embedded",
+        "dtype": dtype,
+        "passages": len(payloads),
+        "encoded": len(to_encode),
+        "reused": len(reused),
+        "removed": removed,
+        "edited_chunks": len(edited),
+        "written": changed,
+        "embed_seconds": round(embed_seconds, 2),
+        "seconds": round(time.perf_counter() - started, 2),
+    }
@@ -0,0 +1,359 @@
+import argparse
+import json
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Deque, Dict, Iterable, Iterator, List, Optional
+
+from qdrant_client import QdrantClient
+from qdrant_client.models import PayloadSchemaType, PointStruct
+
+from app.config import (
+    QDRANT_HOST,
+    QDRANT_PORT,
+    VECTOR_STORE,
+    EMBED_BACKEND,
+    INGEST_BATCH_SIZE,
+    INGEST_UPSERT_BATCH_SIZE,
+    INGEST_WORKERS,
+    INGEST_MAX_IN_FLIGHT,
+)
+from app.ingestion.passages import build_passages, vector_payload
+
+
+# =============================
+# POINT IDS
+# =============================
+# Fixed namespace: the same passage always maps to the same Qdrant point,
+# so re-running ingestion overwrites points instead of duplicating them.
+POINT_NAMESPACE = uuid.UUID("5d7c1f0e-3b8a-5c4e-9f21-6a0d4e8b7c13")
+
+
+def point_id(passage_id: str) -> str:
+    return str(uuid.uuid5(POINT_NAMESPACE, passage_id))
+
+
+# =============================
+# LOADING
+# =============================
+def load_chunks(path: str) -> List[Dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    if not isinstance(data, list):
+        raise ValueError("Normalized file must contain a list")
+
+    return data
+
+
+def iter_passages(chunks: Iterable[Dict], stats: "IngestStats") -> Iterator[Dict]:
+    """
+    Stream passages chunk by chunk; nothing beyond the current chunk's
+    passages is materialized.
+    """
+    for chunk in chunks:
+        if not chunk.get("id") or not chunk.get("text"):
+            print(f"⚠️ Skipping chunk without id/text: {str(chunk.get('text', ''))[:60]!r}")
+            stats.skipped += 1
+            continue
+
+        passages = build_passages(chunk)
+
+        stats.chunks += 1
+        stats.bytes += len(chunk["text"].encode("utf-8"))
+        stats.chunk_passages[chunk["id"]] = len(passages)
+
+        yield from passages
+
+
+def _batched(items: Iterable[Dict], size: int) -> Iterator[List[Dict]]:
+    batch: List[Dict] = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# =============================
+# THROUGHPUT
+# =============================
+class IngestStats:
+    def __init__(self):
+        self.chunks = 0
+        self.passages = 0
+        self.skipped = 0
+        self.bytes = 0
+        self.batches = 0
+        self.chunk_passages: Dict[str, int] = {}
+        self.embed_seconds = 0.0
+        self.upsert_seconds = 0.0
+        self.lock = threading.Lock()
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+
+    @property
+    def elapsed(self) -> float:
+        end = self.finished or time.perf_counter()
+        return max(end - self.started, 1e-9)
+
+    def as_dict(self) -> Dict:
+        return {
+            "chunks": self.chunks,
+            "passages": self.passages,
+            "skipped": self.skipped,
+            "batches": self.batches,
+            "megabytes": round(self.bytes / 1e6, 3),
+            "seconds": round(self.elapsed, 3),
+            "embed_seconds": round(self.embed_seconds, 3),
+            "upsert_seconds": round(self.upsert_seconds, 3),
+            "chunks_per_s": round(self.chunks / self.elapsed, 2),
+            "passages_per_s": round(self.passages / self.elapsed, 2),
+            "mb_per_s": round(self.bytes / 1e6 / self.elapsed, 3),
+        }
+
+    def report(self):
+        d = self.as_dict()
+        print("\n📈 Ingestion throughput")
+        print(f"   chunks:    {d['chunks']} ({d['skipped']} skipped)")
+        print(f"   passages:  {d['passages']} in {d['batches']} batches")
+        print(f"   text:      {d['megabytes']} MB")
+        print(f"   wall time: {d['seconds']} s "
+              f"(embed {d['embed_seconds']} s, upsert {d['upsert_seconds']} s)")
+        print(f"   rate:      {d['chunks_per_s']} chunks/s | "
+              f"{d['passages_per_s']} passages/s | {d['mb_per_s']} MB/s")
+
+
+# =============================
+# ENGINE
+# =============================
+class IngestionEngine:
+    """
+    Streams chunks → passages → batched embeddings → bounded upserts.
+
+    Embedding of batch N+1 overlaps with the upsert of batch N; at most
+    `max_in_flight` upserts are pending, which bounds peak memory to a few
+    batches regardless of corpus size.
+    """
+
+    def __init__(
+        self,
+        qdrant: QdrantClient,
+        embedder,
+        collection_name: str,
+        batch_size: int = INGEST_BATCH_SIZE,
+        upsert_batch_size: int = INGEST_UPSERT_BATCH_SIZE,
+        workers: int = INGEST_WORKERS,
+        max_in_flight: int = INGEST_MAX_IN_FLIGHT,
+    ):
+        self.qdrant = qdrant
+        self.embedder = embedder
+        self.collection_name = collection_name
+        self.batch_size = batch_size
+        self.upsert_batch_size = upsert_batch_size
+        self.workers = workers
+        self.max_in_flight = max(1, max_in_flight)
+        self._pool = None
+
+    # ---------- embedding ----------
+    def _encode(self, texts: List[str]):
+        if self._pool is not None:
+            return self.embedder.encode_multi_process(
+                texts,
+                self._pool,
+                batch_size=self.batch_size,
+                normalize_embeddings=True
+            )
+
+        return self.embedder.encode(
+            texts,
+            batch_size=self.batch_size,
+            normalize_embeddings=True,
+            convert_to_numpy=True,
+            show_progress_bar=False
+        )
+
+    # ---------- upsert ----------
+    def _upsert(self, points: List[PointStruct], stats: IngestStats):
+        t0 = time.perf_counter()
+        self.qdrant.upsert(
+            collection_name=self.collection_name,
+            points=points,
+            wait=True
+        )
+        with stats.lock:
+            stats.upsert_seconds += time.perf_counter() - t0
+
+    def create_passage_indexes(self):
+        # Neighbour expansion filters on these fields at query time
+        self.qdrant.create_payload_index(
+            collection_name=self.collection_name,
+            field_name="chunk_id",
+            field_schema=PayloadSchemaType.KEYWORD
+        )
+        self.qdrant.create_payload_index(
+            collection_name=self.collection_name,
+            field_name="passage_index",
+            field_schema=PayloadSchemaType.INTEGER
+        )
+
+    def ingest(self, chunks: Iterable[Dict]) -> IngestStats:
+        stats = IngestStats()
+        pending: Deque[Future] = deque()
+
+        self.create_passage_indexes()
+
+        if self.workers > 1:
+            self._pool = self.embedder.start_multi_process_pool(
+                ["cpu"] * self.workers
+            )
+
+        try:
+            with ThreadPoolExecutor(
+                max_workers=self.max_in_flight,
+                thread_name_prefix="qdrant-upsert"
+            ) as executor:
+                for batch in _batched(iter_passages(chunks, stats), self.upsert_batch_size):
+                    t0 = time.perf_counter()
+                    vectors = self._encode([p["text"] for p in batch])
+                    stats.embed_seconds += time.perf_counter() - t0
+
+                    points = [
+                        PointStruct(
+                            id=point_id(p["passage_id"]),
+                            vector=vector.tolist(),
+                            payload=vector_payload(p)
+                        )
+                        for p, vector in zip(batch, vectors)
+                    ]
+
+                    # Backpressure: wait for the oldest upsert before queueing more
+                    while len(pending) >= self.max_in_flight:
+                        pending.popleft().result()
+
+                    pending.append(executor.submit(self._upsert, points, stats))
+
+                    stats.passages += len(points)
+                    stats.batches += 1
+                    print(
+                        f"➡️  batch {stats.batches}: {stats.passages} passages "
+                        f"from {stats.chunks} chunks"
+                    )
+
+                while pending:
+                    pending.popleft().result()
+
+        finally:
+            if self._pool is not None:
+                self.embedder.stop_multi_process_pool(self._pool)
+                self._pool = None
+
+        stats.finished = time.perf_counter()
+        return stats
+
+
+# =============================
+# VERIFY
+# =============================
+def verify_count(qdrant: QdrantClient, collection_name: str):
+    info = qdrant.get_collection(collection_name)
+    print(f"📊 Stored vectors: {info.points_count}")
+    print(f"📈 Indexed vectors: {info.indexed_vectors_count}")
+    print(f"🧩 Segments: {info.segments_count}")
+
+
+# =============================
+# CLI
+# =============================
+def build_arg_parser(description: str) -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--input", help="Normalized chunk file (JSON list)")
+    parser.add_argument("--batch-size", type=int, default=INGEST_BATCH_SIZE,
+                        help="Texts per encode forward pass")
+    parser.add_argument("--upsert-batch-size", type=int, default=INGEST_UPSERT_BATCH_SIZE,
+                        help="Points per Qdrant upsert request")
+    parser.add_argument("--workers", type=int, default=INGEST_WORKERS,
+                        help="Encoding processes (1 = in-process)")
+    parser.add_argument("--max-in-flight", type=int, default=INGEST_MAX_IN_FLIGHT,
+                        help="Upsert requests allowed to run concurrently")
+    parser.add_argument("--sync", action="store_true",
+                        help="Only embed new/changed chunks and delete removed ones")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="With --sync: print the plan without touching Qdrant")
+    parser.add_argument("--lexical-only", action="store_true",
+                        help="Only rebuild the BM25 index (no model, no Qdrant)")
+    return parser
+
+
+def main(book: str, collection_name: str, input_file: str):
+    args = build_arg_parser(f"Ingest {book} into {collection_name}").parse_args()
+
+    print(f"\n🚀 Starting {book} ingestion")
+
+    if args.lexical_only:
+        from app.retrieval.lexical import build_lexical_index
+
+        build_lexical_index(collection_name, load_chunks(args.input or input_file))
+        return
+
+    from app.retrieval.embedding import load_sentence_transformer
+
+    print(f"🧠 Loading local embedding model ({EMBED_BACKEND} backend)...")
+    embedder = load_sentence_transformer()
+
+    # Embedded store: no Qdrant at all; the build is always incremental
+    if VECTOR_STORE == "embedded":
+        from app.ingestion.embedded import build_embedded_collection
+        from app.ingestion.sync import print_sync_report
+
+        chunks = load_chunks(args.input or input_file)
+        print(f"📥 Loaded {len(chunks)} chunks")
+
+        report = build_embedded_collection(collection_name, chunks, embedder, batch_size=args.batch_size)
+        print_sync_report(report)
+        print(f"\n🎉 DONE — {book} ingestion complete")
+        return
+
+    print("🗄️ Connecting to Qdrant...")
+    qdrant = QdrantClient(host=QDRANT_HOST, port=QDRANT_PORT)
+
+    from app.ingestion.collection_profiles import compact, ensure_collection
+
+    # Create the collection, or re-apply its tuning profile from collections.json
+    if not args.dry_run:
+        ensure_collection(qdrant, collection_name)
+
+    chunks = load_chunks(args.input or input_file)
+    print(f"📥 Loaded {len(chunks)} chunks")
+
+    engine = IngestionEngine(
+        qdrant,
+        embedder,
+        collection_name,
+        batch_size=args.batch_size,
+        upsert_batch_size=args.upsert_batch_size,
+        workers=args.workers,
+        max_in_flight=args.max_in_flight,
+    )
+
+    # Full ingestion is a forced sync, so the manifest always matches Qdrant
+    from app.ingestion.sync import print_sync_report, sync_chunks
+
+    report = sync_chunks(
+        engine,
+        chunks,
+        dry_run=args.dry_run,
+        force=not args.sync
+    )
+    print_sync_report(report)
+
+    if not args.dry_run:
+        # Incremental upserts leave small segments behind; merge them now
+        compact(qdrant, collection_name)
+        verify_count(qdrant, collection_name)
+
+    print(f"\n🎉 DONE — {book} ingestion complete")
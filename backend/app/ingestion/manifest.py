@@ -0,0 +1,114 @@
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict
+
+from app.config import (
+    DATA_DIR,
+    EMBED_BACKEND,
+    EMBED_QUANTIZATION,
+    LOCAL_EMBED_MODEL,
+    PASSAGE_MAX_CHARS,
+    PASSAGE_OVERLAP_CHARS,
+)
+from app.ingestion.passages import PAYLOAD_VERSION
+
+# =============================
+# LOCATION
+# =============================
+MANIFEST_DIR = DATA_DIR / "manifests"
+
+
+def manifest_path(collection_name: str) -> Path:
+    return MANIFEST_DIR / f"{collection_name}.json"
+
+
+def manifest_token(collection_name: str) -> str:
+    """
+    Cheap change detector for the collection contents (one stat call).
+    Changes whenever ingestion or sync rewrites the manifest.
+    """
+    try:
+        st = manifest_path(collection_name).stat()
+    except FileNotFoundError:
+        return "none"
+    return f"{st.st_mtime_ns}:{st.st_size}"
+
+
+# =============================
+# HASHING
+# =============================
+def vector_fingerprint() -> str:
+    """
+    Anything that changes the stored vectors for an unchanged passage text.
+    """
+    settings = {
+        "model": LOCAL_EMBED_MODEL,
+        "passage_max_chars": PASSAGE_MAX_CHARS,
+        "passage_overlap_chars": PASSAGE_OVERLAP_CHARS,
+    }
+    # Only non-default backends are part of the fingerprint, so manifests
+    # written before backends were configurable stay valid
+    if EMBED_BACKEND != "torch":
+        settings["backend"] = EMBED_BACKEND
+    if EMBED_BACKEND == "onnx-int8":
+        settings["quantization"] = EMBED_QUANTIZATION
+    raw = json.dumps(settings, sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def settings_fingerprint() -> str:
+    """
+    Anything that changes the stored vectors or passages for an unchanged
+    chunk. A different fingerprint marks every chunk as changed.
+    """
+    raw = json.dumps({"vectors": vector_fingerprint(), "payload_version": PAYLOAD_VERSION}, sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def chunk_hash(chunk: Dict) -> str:
+    raw = json.dumps(chunk, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+# =============================
+# LOAD / SAVE
+# =============================
+def empty_manifest(collection_name: str) -> Dict:
+    return {
+        "collection": collection_name,
+        "settings": settings_fingerprint(),
+        "version": 0,
+        "updated_at": None,
+        "chunks": {}
+    }
+
+
+def load_manifest(collection_name: str) -> Dict:
+    path = manifest_path(collection_name)
+    if not path.exists():
+        return empty_manifest(collection_name)
+
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(manifest: Dict):
+    """
+    Write atomically and bump the version, so readers (e.g. caches keyed on
+    the collection contents) never see a half-written file.
+    """
+    path = manifest_path(manifest["collection"])
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    manifest["version"] = manifest.get("version", 0) + 1
+    manifest["updated_at"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+    manifest["settings"] = settings_fingerprint()
+
+    tmp = path.with_suffix(".json.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+
+    os.replace(tmp, path)
@@ -0,0 +1,183 @@
+import re
+from typing import Dict, List, Tuple
+
+from app.config import PASSAGE_MAX_CHARS, PASSAGE_OVERLAP_CHARS
+from app.retrieval.lexical import term_set
+
+# Bumped whenever payload fields change, so existing indexes are rebuilt
+# (part of the settings fingerprint). 2: lex_terms / topic_labels / topic_terms
+# 3: text moved to the docstore
+PAYLOAD_VERSION = 3
+
+
+# =============================
+# BOUNDARY DETECTION
+# =============================
+# Preferred split points, strongest first. Each pattern marks the position
+# *after* which a passage may end.
+_BOUNDARY_PATTERNS = [
+    re.compile(r"\n\s*\n"),               # paragraph break
+    re.compile(r"[.!?][\"”’')\]]*\s"),    # sentence end
+    re.compile(r"\n"),                    # line break (PDF line wrap)
+    re.compile(r"\s"),                    # any whitespace
+]
+
+
+def _find_break(text: str, start: int, end: int) -> int:
+    """
+    Best position in text[start:end] to end a passage.
+    Only the second half of the window is searched so passages never
+    collapse to a few characters.
+    """
+    window_start = start + (end - start) // 2
+
+    for pattern in _BOUNDARY_PATTERNS:
+        last = None
+        for m in pattern.finditer(text, window_start, end):
+            last = m.end()
+        if last is not None:
+            return last
+
+    return end
+
+
+def _skip_space(text: str, pos: int, end: int) -> int:
+    while pos < end and text[pos].isspace():
+        pos += 1
+    return pos
+
+
+def _trim_span(text: str, start: int, end: int) -> Tuple[int, int]:
+    start = _skip_space(text, start, end)
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return start, end
+
+
+# =============================
+# SPLITTING
+# =============================
+def split_passages(
+    text: str,
+    max_chars: int = PASSAGE_MAX_CHARS,
+    overlap_chars: int = PASSAGE_OVERLAP_CHARS,
+) -> List[Tuple[int, int]]:
+    """
+    Split text into size-bounded, overlapping (start, end) character spans.
+    Every span is an exact slice of the parent text, so neighbouring
+    passages can be stitched back together without duplicating the overlap.
+    """
+    if overlap_chars >= max_chars:
+        raise ValueError("overlap_chars must be smaller than max_chars")
+
+    spans: List[Tuple[int, int]] = []
+    length = len(text)
+    start = _skip_space(text, 0, length)
+
+    while start < length:
+        end = min(start + max_chars, length)
+        if end < length:
+            end = _find_break(text, start, end)
+
+        span = _trim_span(text, start, end)
+        if span[1] > span[0]:
+            spans.append(span)
+
+        if end >= length:
+            break
+
+        # Step back for overlap, then move forward to a word boundary
+        next_start = max(end - overlap_chars, start + 1)
+        while next_start < end and not text[next_start - 1].isspace():
+            next_start += 1
+        start = _skip_space(text, next_start, length)
+
+    return spans
+
+
+# =============================
+# TOPIC LABELS
+# =============================
+# Life Eternal chunks carry `topic`; God Speaks only has `chapter` and
+# `sub_topic`. Both are folded into one list of canonical labels.
+_GENERIC_LABELS = {"complete chapter", "supplement", "introduction", "unknown"}
+_PART_PREFIX = re.compile(r"^part\s+\d+(\s*[–-]\s*|$)")
+_ARTICLE = re.compile(r"^(the|a|an)\s+")
+
+
+def canonical_label(label: str) -> str:
+    """
+    "Part 8 – Beyond the Beyond State of God" → "beyond the beyond state of god"
+    "The  Kingdom  Of Worms"                  → "kingdom of worms"
+    """
+    label = " ".join(label.lower().split())
+    label = _PART_PREFIX.sub("", label)
+    return _ARTICLE.sub("", label)
+
+
+def topic_labels(chunk: Dict) -> List[str]:
+    labels: List[str] = []
+    for field in ("topic", "sub_topic", "chapter"):
+        value = chunk.get(field)
+        if not isinstance(value, str):
+            continue
+        # "Fourth Achievement – The Dark Night of the Soul" also yields both halves
+        for piece in [value, *value.split(" – ")]:
+            label = canonical_label(piece)
+            if label and label not in _GENERIC_LABELS and label not in labels:
+                labels.append(label)
+    return labels
+
+
+# =============================
+# PASSAGE PAYLOADS
+# =============================
+def build_passages(
+    chunk: Dict,
+    max_chars: int = PASSAGE_MAX_CHARS,
+    overlap_chars: int = PASSAGE_OVERLAP_CHARS,
+) -> List[Dict]:
+    """
+    Turn one normalized chunk (the parent) into passage payloads (children).
+    Each passage carries the parent metadata plus its position in the chunk,
+    canonical topic labels, and the distinct terms of its text.
+    """
+    text = chunk["text"]
+    spans = split_passages(text, max_chars, overlap_chars)
+    labels = topic_labels(chunk)
+    label_terms = term_set(" ".join(labels))
+
+    passages = []
+    for idx, (start, end) in enumerate(spans):
+        passages.append({
+            "passage_id": f"{chunk['id']}::p{idx:04d}",
+            "chunk_id": chunk["id"],
+            "passage_index": idx,
+            "passage_count": len(spans),
+            "char_start": start,
+            "char_end": end,
+            "book": chunk["book"],
+            "part": chunk.get("part"),
+            "chapter": chunk.get("chapter"),
+            "topic": chunk.get("topic"),
+            "sub_topic": chunk.get("sub_topic"),
+            "chunk_type": chunk.get("chunk_type"),
+            "page_range": chunk.get("page_range"),
+            "text": text[start:end],
+            "speaker": "Meher Baba",  # 🔑 IMPORTANT for ranking
+            # Precomputed for metadata boosting (see retriever.rescore)
+            "topic_labels": labels,
+            "topic_terms": label_terms,
+            "lex_terms": term_set(text[start:end]),
+        })
+
+    return passages
+
+
+def vector_payload(passage: Dict) -> Dict:
+    """
+    What the vector and BM25 indexes store for a passage: everything but
+    the text, which is read back from the docstore (app.retrieval.docstore)
+    for the few passages a query actually uses.
+    """
+    return {key: value for key, value in passage.items() if key != "text"}
@@ -0,0 +1,209 @@
+import time
+from typing import Dict, List
+
+from qdrant_client.models import (
+    FieldCondition,
+    Filter,
+    FilterSelector,
+    MatchAny,
+    MatchValue,
+    Range,
+)
+
+from app.ingestion.engine import IngestionEngine, IngestStats
+from app.ingestion.manifest import (
+    chunk_hash,
+    load_manifest,
+    save_manifest,
+    settings_fingerprint,
+)
+from app.retrieval.docstore import build_docstore, docstore_path
+from app.retrieval.lexical import build_lexical_index, lexical_index_path
+from app.retrieval.sentences import build_sentence_index, sentence_index_path
+
+
+# =============================
+# PLAN
+# =============================
+class SyncPlan:
+    def __init__(self):
+        self.new: List[str] = []
+        self.changed: List[str] = []
+        self.removed: List[str] = []
+        self.unchanged: List[str] = []
+        self.duplicates: List[str] = []
+        self.hashes: Dict[str, str] = {}
+        self.chunks: Dict[str, Dict] = {}
+
+    @property
+    def to_embed(self) -> List[str]:
+        return self.new + self.changed
+
+    def as_dict(self) -> Dict:
+        return {
+            "new": len(self.new),
+            "changed": len(self.changed),
+            "removed": len(self.removed),
+            "unchanged": len(self.unchanged),
+            "duplicates": len(self.duplicates),
+        }
+
+    @property
+    def has_changes(self) -> bool:
+        return bool(self.new or self.changed or self.removed)
+
+
+def plan_sync(chunks: List[Dict], manifest: Dict, force: bool = False) -> SyncPlan:
+    plan = SyncPlan()
+
+    # Model / passage settings changed → every stored vector is stale
+    known = manifest.get("chunks", {})
+    if force or manifest.get("settings") != settings_fingerprint():
+        known = {cid: {**entry, "hash": None} for cid, entry in known.items()}
+
+    for chunk in chunks:
+        chunk_id = chunk.get("id")
+        if not chunk_id or not chunk.get("text"):
+            continue
+
+        # Repeated IDs would map onto the same points; first one wins
+        if chunk_id in plan.chunks:
+            plan.duplicates.append(chunk_id)
+            continue
+
+        digest = chunk_hash(chunk)
+        plan.hashes[chunk_id] = digest
+        plan.chunks[chunk_id] = chunk
+
+        entry = known.get(chunk_id)
+        if entry is None:
+            plan.new.append(chunk_id)
+        elif entry.get("hash") != digest:
+            plan.changed.append(chunk_id)
+        else:
+            plan.unchanged.append(chunk_id)
+
+    plan.removed = [cid for cid in known if cid not in plan.hashes]
+    return plan
+
+
+# =============================
+# DELETES
+# =============================
+def _delete(engine: IngestionEngine, flt: Filter):
+    engine.qdrant.delete(
+        collection_name=engine.collection_name,
+        points_selector=FilterSelector(filter=flt),
+        wait=True
+    )
+
+
+def delete_chunks(engine: IngestionEngine, chunk_ids: List[str]):
+    if not chunk_ids:
+        return
+
+    _delete(engine, Filter(must=[
+        FieldCondition(key="chunk_id", match=MatchAny(any=chunk_ids))
+    ]))
+
+
+def delete_trailing_passages(engine: IngestionEngine, chunk_id: str, keep: int):
+    """
+    A changed chunk that now has fewer passages keeps its first `keep`
+    points (overwritten in place by ID); the rest are dropped.
+    """
+    _delete(engine, Filter(must=[
+        FieldCondition(key="chunk_id", match=MatchValue(value=chunk_id)),
+        FieldCondition(key="passage_index", range=Range(gte=keep)),
+    ]))
+
+
+# =============================
+# SYNC
+# =============================
+def sync_chunks(
+    engine: IngestionEngine,
+    chunks: List[Dict],
+    dry_run: bool = False,
+    force: bool = False
+) -> Dict:
+    """
+    Bring the collection in line with the normalized chunks:
+    rewrite the docstore, embed only new/changed chunks, delete points of
+    removed chunks, then record the new content hashes in the manifest.
+    `force` re-embeds every chunk (a full re-ingest).
+    """
+    started = time.perf_counter()
+
+    manifest = load_manifest(engine.collection_name)
+    plan = plan_sync(chunks, manifest, force=force)
+
+    print(
+        f"🧮 Sync plan: {len(plan.new)} new, {len(plan.changed)} changed, "
+        f"{len(plan.removed)} removed, {len(plan.unchanged)} unchanged"
+        + (f" ({len(plan.duplicates)} duplicate IDs skipped)" if plan.duplicates else "")
+    )
+
+    report = {"collection": engine.collection_name, "dry_run": dry_run, **plan.as_dict()}
+
+    if dry_run:
+        report["seconds"] = round(time.perf_counter() - started, 3)
+        return report
+
+    # Points carry no text; write the texts they will point at first
+    if plan.has_changes or not docstore_path(engine.collection_name).exists():
+        build_docstore(engine.collection_name, plan.chunks.values())
+
+    if plan.to_embed:
+        stats = engine.ingest(plan.chunks[cid] for cid in plan.to_embed)
+    else:
+        stats = IngestStats()
+
+    old_entries = manifest.get("chunks", {})
+    for chunk_id in plan.changed:
+        old_count = old_entries.get(chunk_id, {}).get("passages", 0)
+        new_count = stats.chunk_passages.get(chunk_id, 0)
+        if new_count < old_count:
+            delete_trailing_passages(engine, chunk_id, new_count)
+
+    delete_chunks(engine, plan.removed)
+
+    entries = {cid: e for cid, e in old_entries.items() if cid in plan.hashes}
+    for chunk_id in plan.to_embed:
+        entries[chunk_id] = {
+            "hash": plan.hashes[chunk_id],
+            "passages": stats.chunk_passages.get(chunk_id, 0)
+        }
+    manifest["chunks"] = entries
+
+    # Version only moves when the collection contents actually changed
+    if plan.has_changes:
+        save_manifest(manifest)
+
+    # The BM25 index is cheap to build, so it is rebuilt from all current
+    # chunks rather than patched
+    if plan.has_changes or not lexical_index_path(engine.collection_name).exists():
+        build_lexical_index(engine.collection_name, plan.chunks.values())
+
+    # Sentence vectors of unchanged chunks are reused, so only the sentences
+    # of new/changed chunks are encoded
+    if plan.has_changes or not sentence_index_path(engine.collection_name).exists():
+        build_sentence_index(engine.collection_name, plan.chunks.values(), engine.embedder)
+
+    stats.finished = stats.finished or time.perf_counter()
+    if stats.passages:
+        stats.report()
+
+    report.update({
+        "embedded_passages": stats.passages,
+        "deleted_chunks": len(plan.removed),
+        "manifest_version": manifest["version"],
+        "seconds": round(time.perf_counter() - started, 3),
+    })
+    return report
+
+
+def print_sync_report(report: Dict):
+    print("\n🔁 Sync report")
+    for key, value in report.items():
+        print(f"   {key}: {value}")
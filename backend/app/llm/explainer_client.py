@@ -1,12 +0,0 @@
-import os
-from openai import OpenAI
-from google import genai
-
-
-def get_explainer_openai_client() -> OpenAI:
-    return OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
-
-
-def get_explainer_gemini_client() -> genai.Client:
-    return genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
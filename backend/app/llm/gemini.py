@@ -0,0 +1,46 @@
+import asyncio
+import os
+import threading
+from typing import Dict
+
+from app.config import GEMINI_MODEL, GEMINI_TIMEOUT_SECONDS
+from app.llm.resilience import CircuitBreaker, with_retries
+
+# google.genai is only needed when GEMINI_ENABLED; it is imported on the
+# first Gemini call instead of at module import.
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_gemini_client():
+    global _client
+
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from google import genai
+                _client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
+
+    return _client
+
+
+breaker = CircuitBreaker("gemini")
+
+
+async def generate_text(contents: str, model: str = GEMINI_MODEL, timeout_seconds: float = GEMINI_TIMEOUT_SECONDS) -> str:
+    """
+    One Gemini completion through the shared client, with the same
+    timeout / retry / circuit-breaker handling as Ollama calls.
+    """
+    async def attempt() -> str:
+        response = await asyncio.wait_for(
+            get_gemini_client().aio.models.generate_content(model=model, contents=contents),
+            timeout=timeout_seconds
+        )
+        return (response.text or "").strip()
+
+    return await breaker.call(lambda: with_retries(attempt, "gemini"))
+
+
+def stats() -> Dict:
+    return {"model": GEMINI_MODEL, "breaker": breaker.stats()}
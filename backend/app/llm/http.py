@@ -0,0 +1,36 @@
+from typing import Optional
+
+import aiohttp
+
+from app.config import HTTP_MAX_CONNECTIONS, HTTP_KEEPALIVE_SECONDS
+
+# One pooled async session shared by the router and the explainer.
+# Requests reuse keep-alive connections instead of opening one per call.
+_session: Optional[aiohttp.ClientSession] = None
+
+
+def get_http_session() -> aiohttp.ClientSession:
+    """
+    Lazily created on first use, inside the running event loop.
+    """
+    global _session
+
+    if _session is None or _session.closed:
+        _session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=HTTP_MAX_CONNECTIONS,
+                limit_per_host=HTTP_MAX_CONNECTIONS,
+                keepalive_timeout=HTTP_KEEPALIVE_SECONDS,
+            ),
+            timeout=aiohttp.ClientTimeout(total=180, connect=5),
+        )
+
+    return _session
+
+
+async def close_http_session():
+    global _session
+
+    if _session is not None:
+        await _session.close()
+        _session = None
@@ -0,0 +1,154 @@
+import json
+import time
+from typing import AsyncIterator, Dict, List, Optional
+
+import aiohttp
+
+from app.config import (
+    OLLAMA_URL,
+    OLLAMA_MODEL,
+    OLLAMA_KEEP_ALIVE,
+    OLLAMA_CONNECT_TIMEOUT_SECONDS,
+    OLLAMA_STREAM_READ_TIMEOUT_SECONDS,
+    OLLAMA_PRELOAD_TIMEOUT_SECONDS,
+)
+from app.llm.http import get_http_session
+from app.llm.resilience import CircuitBreaker, with_retries
+
+
+class OllamaClient:
+    """
+    Ollama /api/chat shared by the router and the explainer: one pooled
+    keep-alive session, `keep_alive` on every request so the model stays
+    loaded, retries with jitter, and one circuit breaker for the server
+    (when it is down, both roles skip to their fallback at once).
+
+    Callers pass their own total timeout; the connect timeout is shared.
+    """
+
+    name = "ollama"
+
+    def __init__(
+        self,
+        url: str = OLLAMA_URL,
+        model: str = OLLAMA_MODEL,
+        keep_alive: str = OLLAMA_KEEP_ALIVE,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
+        self.url = url
+        self.model = model
+        self.keep_alive = keep_alive
+        self.breaker = breaker or CircuitBreaker(self.name)
+
+    def payload(self, messages: List[dict], stream: bool, **fields) -> dict:
+        return {
+            "model": self.model,
+            "messages": messages,
+            "keep_alive": self.keep_alive,
+            "stream": stream,
+            **fields
+        }
+
+    async def chat(self, messages: List[dict], timeout_seconds: float, **fields) -> dict:
+        """
+        Final /api/chat reply (stream off). Raises CircuitOpenError without
+        calling the server while the breaker is open.
+        """
+        timeout = aiohttp.ClientTimeout(total=timeout_seconds, connect=OLLAMA_CONNECT_TIMEOUT_SECONDS)
+
+        async def attempt() -> dict:
+            async with get_http_session().post(
+                self.url,
+                json=self.payload(messages, stream=False, **fields),
+                timeout=timeout
+            ) as r:
+                r.raise_for_status()
+                data = await r.json(content_type=None)
+
+            if "message" not in data:
+                raise RuntimeError(f"Unexpected Ollama response: {data}")
+            return data
+
+        return await self.breaker.call(lambda: with_retries(attempt, self.name))
+
+    async def chat_stream(self, messages: List[dict], timeout_seconds: float, **fields) -> AsyncIterator[dict]:
+        """
+        Streamed /api/chat: yields every NDJSON message up to and including
+        the final one (done=True). Opening the stream is retried; once
+        messages have been yielded, a failure is raised to the caller. A
+        stream that ends before done=True is a failure too.
+        """
+        timeout = aiohttp.ClientTimeout(
+            total=timeout_seconds,
+            connect=OLLAMA_CONNECT_TIMEOUT_SECONDS,
+            sock_read=OLLAMA_STREAM_READ_TIMEOUT_SECONDS
+        )
+
+        async def open_stream() -> aiohttp.ClientResponse:
+            r = await get_http_session().post(
+                self.url,
+                json=self.payload(messages, stream=True, **fields),
+                timeout=timeout
+            )
+            if r.status >= 400:
+                r.release()
+            r.raise_for_status()
+            return r
+
+        self.breaker.check()
+        try:
+            r = await with_retries(open_stream, self.name)
+            done = False
+            try:
+                # Ollama streams one JSON object per line
+                async for line in r.content:
+                    if not line.strip():
+                        continue
+
+                    data = json.loads(line)
+                    if "error" in data:
+                        raise RuntimeError(data["error"])
+
+                    yield data
+                    if data.get("done"):
+                        done = True
+                        break
+            finally:
+                r.release()
+
+            if not done:
+                raise aiohttp.ClientPayloadError("Ollama stream ended before done")
+
+        except Exception:
+            self.breaker.record_failure()
+            raise
+
+        self.breaker.record_success()
+
+    async def preload(self, timeout_seconds: float = OLLAMA_PRELOAD_TIMEOUT_SECONDS) -> Dict:
+        """
+        Load the model into memory (a chat request without messages) and
+        pin it for `keep_alive`, so the first real request does not pay
+        for loading the weights. Bypasses the breaker: a slow first load
+        must not open the circuit.
+        """
+        t0 = time.perf_counter()
+        async with get_http_session().post(
+            self.url,
+            json=self.payload([], stream=False),
+            timeout=aiohttp.ClientTimeout(total=timeout_seconds, connect=OLLAMA_CONNECT_TIMEOUT_SECONDS)
+        ) as r:
+            r.raise_for_status()
+            data = await r.json(content_type=None)
+
+        return {
+            "keep_alive": self.keep_alive,
+            "load_ms": round((time.perf_counter() - t0) * 1000, 1),
+            "done_reason": data.get("done_reason"),
+        }
+
+    def stats(self) -> Dict:
+        return {"model": self.model, "keep_alive": self.keep_alive, "breaker": self.breaker.stats()}
+
+
+ollama = OllamaClient()
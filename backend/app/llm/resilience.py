@@ -0,0 +1,192 @@
+import asyncio
+import logging
+import random
+import time
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+
+from app.config import (
+    LLM_RETRIES,
+    LLM_RETRY_BASE_SECONDS,
+    LLM_RETRY_MAX_SECONDS,
+    LLM_BREAKER_FAILURES,
+    LLM_BREAKER_RESET_SECONDS,
+)
+from app.metrics import LLM_BREAKER_STATE, LLM_CALLS
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Rate limiting and transient server errors; other 4xx will fail again
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(RuntimeError):
+    """
+    The backend failed repeatedly and is being skipped for now.
+    """
+
+
+# =================================================
+# RETRIES
+# =================================================
+
+def is_retryable(error: BaseException) -> bool:
+    """
+    Connection failures and 429/5xx replies. Timeouts are not retried:
+    the backend is up but slow, and another attempt would only double
+    the wait.
+    """
+    import aiohttp
+
+    if isinstance(error, asyncio.TimeoutError):
+        return False
+    if isinstance(error, aiohttp.ClientConnectionError):
+        return True
+    # aiohttp.ClientResponseError.status, google.genai APIError.code
+    return getattr(error, "status", None) in RETRY_STATUSES or getattr(error, "code", None) in RETRY_STATUSES
+
+
+async def with_retries(
+    call: Callable[[], Awaitable[T]],
+    backend: str,
+    retries: int = LLM_RETRIES,
+    base_seconds: float = LLM_RETRY_BASE_SECONDS,
+    max_seconds: float = LLM_RETRY_MAX_SECONDS,
+) -> T:
+    """
+    Await call() up to 1 + retries times. Between attempts sleep a random
+    time in [0, min(max, base * 2^attempt)] ("full jitter"), so callers
+    that failed together do not retry together.
+    """
+    for attempt in range(retries + 1):
+        try:
+            return await call()
+        except Exception as e:
+            if attempt == retries or not is_retryable(e):
+                raise
+            delay = random.uniform(0, min(max_seconds, base_seconds * 2 ** attempt))
+            LLM_CALLS.labels(backend, "retry").inc()
+            logger.info("retrying %s in %.0f ms: %s", backend, delay * 1000, e,
+                        extra={"backend": backend, "attempt": attempt + 1})
+            await asyncio.sleep(delay)
+
+
+# =================================================
+# CIRCUIT BREAKER
+# =================================================
+
+class CircuitBreaker:
+    """
+    closed    → calls go through; `failure_threshold` consecutive failures
+                open the circuit
+    open      → calls are rejected at once (CircuitOpenError) for
+                `reset_seconds`, so requests go straight to the fallback
+                instead of waiting out the backend's timeout
+    half-open → one probe call is let through; success closes the
+                circuit, failure opens it again. A probe that never
+                reports back (abandoned stream) frees its slot after
+                `reset_seconds`
+
+    Used from the event loop only, so no locking.
+    """
+
+    STATES = {"closed": 0, "half_open": 1, "open": 2}
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = LLM_BREAKER_FAILURES,
+        reset_seconds: float = LLM_BREAKER_RESET_SECONDS,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probe_until = 0.0
+
+        # Stats
+        self.successes = 0
+        self.errors = 0
+        self.rejected = 0
+        self.opened = 0
+        self._set_gauge()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.reset_seconds:
+            return "open"
+        return "half_open"
+
+    def _set_gauge(self):
+        LLM_BREAKER_STATE.labels(self.name).set(self.STATES[self.state])
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+
+        now = time.monotonic()
+        if state == "half_open" and now >= self._probe_until:
+            self._probe_until = now + self.reset_seconds
+            self._set_gauge()
+            return True
+
+        self.rejected += 1
+        LLM_CALLS.labels(self.name, "rejected").inc()
+        return False
+
+    def check(self):
+        if not self.allow():
+            raise CircuitOpenError(f"{self.name} circuit open, skipping")
+
+    def record_success(self):
+        if self.opened_at is not None:
+            logger.info("%s circuit closed", self.name)
+        self.failures = 0
+        self.opened_at = None
+        self._probe_until = 0.0
+        self.successes += 1
+        LLM_CALLS.labels(self.name, "ok").inc()
+        self._set_gauge()
+
+    def record_failure(self):
+        self.failures += 1
+        self.errors += 1
+        LLM_CALLS.labels(self.name, "error").inc()
+
+        # A failed probe re-opens at once; otherwise wait for the threshold
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                self.opened += 1
+                logger.warning("%s circuit open for %.0f s after %d failures",
+                               self.name, self.reset_seconds, self.failures)
+            self.opened_at = time.monotonic()
+            self._probe_until = 0.0
+        self._set_gauge()
+
+    async def call(self, fn: Callable[[], Awaitable[T]]) -> T:
+        self.check()
+        try:
+            result = await fn()
+        except Exception:
+            self.record_failure()
+            raise
+        self.record_success()
+        return result
+
+    def stats(self) -> Dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "successes": self.successes,
+            "errors": self.errors,
+            "rejected": self.rejected,
+            "opened": self.opened,
+            "failure_threshold": self.failure_threshold,
+            "reset_seconds": self.reset_seconds,
+        }
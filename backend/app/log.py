@@ -0,0 +1,80 @@
+import json
+import logging
+import sys
+import time
+import uuid
+from contextvars import ContextVar
+
+from app.config import LOG_FORMAT, LOG_LEVEL
+
+# Set per HTTP request by the middleware in main.py; tasks spawned while
+# handling the request inherit it
+request_id: ContextVar[str] = ContextVar("request_id", default="-")
+
+# Attributes every LogRecord has; anything else came in through `extra=`
+_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "request_id"}
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex[:12]
+
+
+class RequestIdFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id.get()
+        return True
+
+
+def _extra_fields(record: logging.LogRecord) -> dict:
+    return {k: v for k, v in vars(record).items() if k not in _RECORD_FIELDS}
+
+
+class TextFormatter(logging.Formatter):
+    """
+    2025-01-01T12:00:00Z INFO  [3f9c0a1b2c4d] app.main: routed book=... topics=[...]
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        ts = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(record.created))
+        line = f"{ts} {record.levelname:<5} [{record.request_id}] {record.name}: {record.getMessage()}"
+
+        fields = _extra_fields(record)
+        if fields:
+            line += " " + " ".join(f"{k}={v}" for k, v in fields.items())
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": record.request_id,
+            "msg": record.getMessage(),
+            **_extra_fields(record),
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def setup_logging(level: str = LOG_LEVEL, fmt: str = LOG_FORMAT):
+    """
+    Configure the "app" logger tree once. Safe to call again (e.g. from
+    both main.py and a CLI entry point).
+    """
+    logger = logging.getLogger("app")
+    if getattr(logger, "_configured", False):
+        return
+
+    handler = logging.StreamHandler(sys.stderr)
+    handler.addFilter(RequestIdFilter())
+    handler.setFormatter(JsonFormatter() if fmt == "json" else TextFormatter())
+
+    logger.addHandler(handler)
+    logger.setLevel(level)
+    logger.propagate = False
+    logger._configured = True
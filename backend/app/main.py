@@ -1,25 +1,133 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+import asyncio
 import json
+import logging
+import time
 
-from app.routing.book_router import run_router_llm
-from app.retrieval.retriever import retrieve
-from app.generation.explainer import generate
+from app.config import (
+    RETRIEVAL_TOP_K,
+    RETRIEVAL_NEIGHBORS,
+    FAST_ROUTER_ENABLED,
+    ANSWER_CACHE_ENABLED,
+    RERANK_ENABLED,
+    SPECULATIVE_RETRIEVAL,
+    EMBED_MODE,
+    WARMUP_ENABLED,
+)
+from app.llm import gemini
+from app.llm.http import close_http_session
+from app.llm.ollama import ollama
+from app.routing.book_router import flush_router_cache, get_router_cache, get_routing_decision
+from app.routing.fast_router import get_fast_router
+from app.retrieval.docstore import all_docstore_stats
+from app.retrieval.embedding import (
+    EMBED_EXECUTOR,
+    embed_np_async,
+    embedding_batcher,
+    embedding_service,
+    get_model,
+    model_loaded,
+)
+from app.retrieval.rerank import reranker
+from app.retrieval.retriever import retrieve, BOOK_COLLECTION_MAP
+from app.retrieval.speculative import SpeculativeRetrieval, speculation_stats
+from app.retrieval.stores import close_vector_store
+from app.generation.answer_cache import SemanticAnswerCache
+from app.generation.explainer import (
+    FALLBACK_ANSWER,
+    generate,
+    generate_stream,
+    select_quotes,
+)
+from app.log import new_request_id, request_id, setup_logging
+from app.metrics import HTTP_REQUESTS, observe_stage, render as render_metrics
+from app.warmup import readiness
 
-app = FastAPI(title="Claritas")
+setup_logging()
+logger = logging.getLogger(__name__)
 
 
-@app.post("/ask")
-def ask_question(question: str):
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm up in the background: the server accepts connections right away
+    # and GET /ready turns 200 once the model is loaded and deps answer
+    warmup = readiness.start() if WARMUP_ENABLED else None
+
+    yield
+
+    if warmup is not None and not warmup.done():
+        warmup.cancel()
+    await embedding_batcher.close()
+    await asyncio.to_thread(flush_router_cache)
+    await close_http_session()
+    await close_vector_store()
+
+
+app = FastAPI(title="Claritas", lifespan=lifespan)
+
+
+@app.middleware("http")
+async def request_context(request: Request, call_next):
+    """
+    Request ID for every log line of the request (taken from X-Request-ID
+    when the caller sends one) and per-route request counters.
+    """
+    token = request_id.set(request.headers.get("x-request-id") or new_request_id())
+    try:
+        response = await call_next(request)
+        response.headers["X-Request-ID"] = request_id.get()
+        route = request.scope.get("route")
+        HTTP_REQUESTS.labels(getattr(route, "path", "unmatched"), str(response.status_code)).inc()
+        return response
+    finally:
+        request_id.reset(token)
+
+
+answer_cache = SemanticAnswerCache(BOOK_COLLECTION_MAP) if ANSWER_CACHE_ENABLED else None
+
+
+NO_ANSWER = "Meher Baba has not spoken directly on this question."
 
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 1)
+
+
+def _finish(timings: dict, started: float):
+    seconds = time.perf_counter() - started
+    timings["total_ms"] = _ms(seconds)
+    observe_stage("request", seconds)
+    logger.info("request finished", extra=timings)
+
+
+async def route_and_retrieve(question: str, timings: dict) -> dict:
+    """
+    Stages 1 + 2 shared by /ask and /ask/stream.
+    Returns either {"error": ...} or the routing decision plus chunks.
+    With SPECULATIVE_RETRIEVAL the vector search of every book starts
+    before routing and runs alongside it.
+    """
+    speculation = SpeculativeRetrieval(question) if SPECULATIVE_RETRIEVAL else None
+    try:
+        return await _route_and_retrieve(question, timings, speculation)
+    finally:
+        if speculation is not None:
+            speculation.cancel()
+
+
+async def _route_and_retrieve(question: str, timings: dict, speculation) -> dict:
     # -------------------------------
     # 1️⃣ ROUTING (Structured)
     # -------------------------------
-    router_response = run_router_llm(question)
-    print("📡 Router response:", router_response)
+    t0 = time.perf_counter()
+    routing_data, router_response = await get_routing_decision(question)
+    timings["routing_ms"] = _ms(time.perf_counter() - t0)
+    observe_stage("routing", time.perf_counter() - t0)
 
-    try:
-        routing_data = json.loads(router_response)
-    except Exception:
+    if routing_data is None:
         return {
             "error": "Router did not return valid JSON",
             "raw_router_output": router_response
@@ -29,33 +137,279 @@ def ask_question(question: str):
     topics = routing_data.get("topics", [])
     keywords = routing_data.get("keywords", [])
 
-    print(f"📚 Routing to book: {book}")
-    print(f"🏷 Topics: {topics}")
-    print(f"🔎 Keywords: {keywords}")
+    logger.info("routed", extra={"book": book, "topics": topics, "keywords": keywords})
 
     # -------------------------------
     # 2️⃣ RETRIEVAL (Hybrid)
     # -------------------------------
-    chunks = retrieve(
+    t0 = time.perf_counter()
+    chunks = await retrieve(
         book=book,
         query=question,
         router_topics=topics,
         router_keywords=keywords,
-        top_k=1
+        top_k=RETRIEVAL_TOP_K,
+        neighbors=RETRIEVAL_NEIGHBORS,
+        timings=timings,
+        speculation=speculation
     )
-    
+    timings["retrieval_ms"] = _ms(time.perf_counter() - t0)
+
+    return {
+        "book": book,
+        "topics": topics,
+        "keywords": keywords,
+        "chunks": chunks
+    }
+
+
+@app.post("/ask")
+async def ask_question(question: str):
+    started = time.perf_counter()
+    timings: dict = {}
+
+    routed = await route_and_retrieve(question, timings)
+    if "error" in routed:
+        _finish(timings, started)
+        return {**routed, "timings": timings}
+
+    book = routed["book"]
+    chunks = routed["chunks"]
+
     if not chunks:
+        _finish(timings, started)
         return {
             "book_used": book,
-            "answer": "Meher Baba has not spoken directly on this question."
+            "answer": NO_ANSWER,
+            "timings": timings
         }
 
     # -------------------------------
-    # 3️⃣ GENERATION
+    # 3️⃣ GENERATION (semantic cache first)
     # -------------------------------
-    answer = generate(chunks, question)
+    t0 = time.perf_counter()
+    question_vector = await _question_vector(question)
+
+    cached = _cached_answer(question_vector, book, chunks)
+    if cached is not None:
+        timings["generation_ms"] = _ms(time.perf_counter() - t0)
+        _finish(timings, started)
+        return {
+            "book_used": book,
+            "answer": cached,
+            "cached": True,
+            "timings": timings
+        }
+
+    answer = await generate(chunks, question, timings)
+    _store_answer(question_vector, question, book, chunks, answer)
+    timings["generation_ms"] = _ms(time.perf_counter() - t0)
+    _finish(timings, started)
 
     return {
         "book_used": book,
-        "answer": answer
+        "answer": answer,
+        "timings": timings
+    }
+
+
+# =================================================
+# SEMANTIC ANSWER CACHE
+# =================================================
+
+async def _question_vector(question: str):
+    if answer_cache is None:
+        return None
+    return await embed_np_async(question)
+
+
+def _cached_answer(vector, book: str, chunks: list):
+    if answer_cache is None or vector is None:
+        return None
+    return answer_cache.lookup(vector, book, chunks)
+
+
+def _store_answer(vector, question: str, book: str, chunks: list, answer: str):
+    # Fallback answers mean the LLM failed; never replay those
+    if answer_cache is None or vector is None or answer == FALLBACK_ANSWER:
+        return
+    answer_cache.store(vector, question, book, chunks, answer)
+
+
+# =================================================
+# STREAMING (Server-Sent Events)
+# =================================================
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def _quote_event(chunk: dict) -> dict:
+    return {
+        "chunk_id": chunk.get("chunk_id"),
+        "passage_id": chunk.get("passage_id"),
+        "book": chunk.get("book"),
+        "chapter": chunk.get("chapter"),
+        "topic": chunk.get("topic"),
+        "sub_topic": chunk.get("sub_topic"),
+        "speaker": chunk.get("speaker"),
+        "text": chunk.get("text"),
     }
+
+
+async def _ask_events(question: str) -> AsyncIterator[str]:
+    """
+    routing → quotes → token* → done
+    Quotes go out as soon as retrieval returns; the answer follows token
+    by token while the explainer is still generating.
+    """
+    started = time.perf_counter()
+    timings: dict = {}
+
+    try:
+        routed = await route_and_retrieve(question, timings)
+    except Exception as e:
+        # Headers are already sent: report the failure as an event
+        logger.error("routing/retrieval failed: %s", e)
+        routed = {"error": f"Routing or retrieval failed: {e}"}
+
+    if "error" in routed:
+        _finish(timings, started)
+        yield _sse("error", {**routed, "timings": timings})
+        return
+
+    book = routed["book"]
+    chunks = routed["chunks"]
+
+    yield _sse("routing", {
+        "book": book,
+        "topics": routed["topics"],
+        "keywords": routed["keywords"],
+    })
+    yield _sse("quotes", {
+        "book_used": book,
+        "quotes": [_quote_event(c) for c in select_quotes(chunks)],
+    })
+
+    if not chunks:
+        yield _sse("token", {"text": NO_ANSWER})
+    else:
+        t0 = time.perf_counter()
+        question_vector = await _question_vector(question)
+        cached = _cached_answer(question_vector, book, chunks)
+
+        if cached is not None:
+            timings["cached"] = True
+            timings["first_token_ms"] = _ms(time.perf_counter() - started)
+            yield _sse("token", {"text": cached})
+        else:
+            parts = []
+            async for token in generate_stream(chunks, question, timings):
+                if "first_token_ms" not in timings:
+                    timings["first_token_ms"] = _ms(time.perf_counter() - started)
+                parts.append(token)
+                yield _sse("token", {"text": token})
+            # A stream that broke after the first tokens ends quietly; only
+            # an answer that reached done=True is worth replaying
+            if timings.pop("answer_complete", False):
+                _store_answer(question_vector, question, book, chunks, "".join(parts).strip())
+
+        timings["generation_ms"] = _ms(time.perf_counter() - t0)
+
+    _finish(timings, started)
+    yield _sse("done", {"book_used": book, "timings": timings})
+
+
+@app.post("/ask/stream")
+async def ask_question_stream(question: str):
+    return StreamingResponse(
+        _ask_events(question),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+# =================================================
+# STATS
+# =================================================
+
+@app.get("/stats/router-cache")
+async def router_cache_stats():
+    cache = get_router_cache()
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
+
+
+@app.get("/stats/fast-router")
+async def fast_router_stats():
+    if not FAST_ROUTER_ENABLED:
+        return {"enabled": False}
+    return {"enabled": True, **get_fast_router().stats()}
+
+
+@app.get("/stats/answer-cache")
+async def answer_cache_stats():
+    if answer_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **answer_cache.stats()}
+
+
+@app.get("/stats/embedding")
+async def embedding_stats():
+    stats = {"mode": EMBED_MODE, **embedding_service.stats(), "batching": embedding_batcher.stats()}
+    if EMBED_MODE == "shared" and model_loaded():
+        loop = asyncio.get_running_loop()
+        stats["server"] = await loop.run_in_executor(EMBED_EXECUTOR, get_model().info)
+    return stats
+
+
+@app.get("/stats/docstore")
+async def docstore_stats():
+    # Only docstores opened since startup
+    return all_docstore_stats()
+
+
+@app.get("/stats/llm")
+async def llm_stats():
+    # Circuit breaker state per backend
+    return {"ollama": ollama.stats(), "gemini": gemini.stats()}
+
+
+@app.get("/stats/speculative")
+async def speculative_stats():
+    if not SPECULATIVE_RETRIEVAL:
+        return {"enabled": False}
+    return {"enabled": True, **speculation_stats.as_dict()}
+
+
+@app.get("/stats/rerank")
+async def rerank_stats():
+    if not RERANK_ENABLED:
+        return {"enabled": False}
+    return {"enabled": True, **reranker.stats()}
+
+
+# =================================================
+# HEALTH / READINESS
+# =================================================
+
+@app.get("/metrics")
+async def metrics():
+    body, content_type = render_metrics()
+    return Response(body, media_type=content_type)
+
+
+@app.get("/health")
+async def health():
+    return {"status": "ok"}
+
+
+@app.get("/ready")
+async def ready():
+    # Report the last known state at once; a probe only starts a new run
+    # of the failed checks when none is in progress
+    readiness.start()
+
+    report = readiness.report()
+    return JSONResponse(report, status_code=200 if report["ready"] else 503)
@@ -0,0 +1,138 @@
+from typing import Optional
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+# Served by GET /metrics (Prometheus text format)
+
+# Buckets from 0.5 ms (in-process search) up to a minute (cold LLM calls)
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25,
+    0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+
+# stage: routing, router_llm, embed, lexical, vector_search, rescore,
+#        rerank, select, speculation_wait, context, explainer_llm,
+#        prompt_eval, request
+STAGE_SECONDS = Histogram(
+    "claritas_stage_seconds",
+    "Latency of one pipeline stage",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+
+HTTP_REQUESTS = Counter(
+    "claritas_http_requests_total",
+    "HTTP requests by route and status",
+    ["path", "status"],
+)
+
+# source: cache, fast, llm
+ROUTER_DECISIONS = Counter(
+    "claritas_router_decisions_total",
+    "Routing decisions by where they came from",
+    ["source"],
+)
+
+ROUTER_JSON_FAILURES = Counter(
+    "claritas_router_json_failures_total",
+    "LLM router replies that were not a JSON object",
+)
+
+# kind: router_gemini, explainer_gemini, retrieval_bm25, rerank_budget,
+#       explainer_fallback_answer
+FALLBACKS = Counter(
+    "claritas_fallbacks_total",
+    "Degraded paths taken",
+    ["kind"],
+)
+
+# role: router, explainer. Taken from Ollama's eval_count / eval_duration
+LLM_TOKENS = Counter(
+    "claritas_llm_tokens_total",
+    "Tokens generated by the LLM",
+    ["role"],
+)
+
+LLM_PROMPT_TOKENS = Counter(
+    "claritas_llm_prompt_tokens_total",
+    "Prompt tokens evaluated by the LLM",
+    ["role"],
+)
+
+LLM_TOKENS_PER_SECOND = Histogram(
+    "claritas_llm_tokens_per_second",
+    "Generation throughput of one LLM call",
+    ["role"],
+    buckets=(1, 2, 5, 10, 20, 30, 50, 75, 100, 150, 250, 500),
+)
+
+
+# backend: ollama, gemini. outcome: ok, error, retry, rejected (breaker open)
+LLM_CALLS = Counter(
+    "claritas_llm_calls_total",
+    "LLM backend calls by outcome",
+    ["backend", "outcome"],
+)
+
+LLM_BREAKER_STATE = Gauge(
+    "claritas_llm_breaker_state",
+    "Circuit breaker state per LLM backend (0 closed, 1 half-open, 2 open)",
+    ["backend"],
+)
+
+
+EMBED_BATCH_SIZE = Histogram(
+    "claritas_embed_batch_size",
+    "Texts per micro-batched embedding forward pass",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128),
+)
+
+EMBED_QUEUE_SECONDS = Histogram(
+    "claritas_embed_queue_seconds",
+    "Time a text waited in the embedding batch queue before its forward pass",
+    buckets=(0.0001, 0.0005, 0.001, 0.002, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+
+EMBED_BACKPRESSURE = Counter(
+    "claritas_embed_backpressure_total",
+    "Embedding requests that waited for space in a full batch queue",
+)
+
+# outcome: used, discarded (finished, other book routed), cancelled, failed
+SPECULATIVE_SEARCHES = Counter(
+    "claritas_speculative_searches_total",
+    "Speculative per-book vector searches by outcome",
+    ["outcome"],
+)
+
+
+def observe_stage(stage: str, seconds: float):
+    STAGE_SECONDS.labels(stage).observe(seconds)
+
+
+def observe_ollama(role: str, data: Optional[dict]):
+    """
+    Token counts from the final message of an Ollama /api/chat reply
+    (missing on errors and from other backends).
+    """
+    if not data:
+        return
+
+    eval_count = data.get("eval_count")
+    if eval_count:
+        LLM_TOKENS.labels(role).inc(eval_count)
+        eval_ns = data.get("eval_duration")
+        if eval_ns:
+            LLM_TOKENS_PER_SECOND.labels(role).observe(eval_count / (eval_ns / 1e9))
+
+    if data.get("prompt_eval_count"):
+        LLM_PROMPT_TOKENS.labels(role).inc(data["prompt_eval_count"])
+        if data.get("prompt_eval_duration") and role == "explainer":
+            observe_stage("prompt_eval", data["prompt_eval_duration"] / 1e9)
+
+
+def render() -> tuple:
+    """
+    (body, content type) for the /metrics response.
+    """
+    return generate_latest(), CONTENT_TYPE_LATEST
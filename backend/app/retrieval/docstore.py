@@ -0,0 +1,266 @@
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.config import DOCSTORE_DIR, DOCSTORE_CACHE_SIZE
+
+logger = logging.getLogger(__name__)
+
+DOCSTORE_VERSION = 2
+
+# =================================================
+# FILE LAYOUT
+# =================================================
+# One file per collection (DOCSTORE_DIR/<collection>.docs):
+#   each chunk text cut into BLOCK_CHARS-character blocks, one zlib stream
+#   per block, back to back
+#   JSON index {"meta": ..., "chunks": {chunk_id: [[offset, length], ...]}}
+#   8-byte little-endian offset of the JSON index
+# Written under a temporary name and renamed, so a reader never sees a
+# half-built file. Passages are exact slices of their chunk text, so a
+# passage is hydrated from the blocks covering its char offsets only,
+# not from the whole (possibly 100K+ character) chunk.
+#
+# Version 1 files (one block per chunk) are still read.
+
+_FOOTER = struct.Struct("<Q")
+COMPRESS_LEVEL = 6
+BLOCK_CHARS = 2048
+
+
+def docstore_path(collection_name: str) -> Path:
+    return DOCSTORE_DIR / f"{collection_name}.docs"
+
+
+def write_docstore(path: Path, texts: Dict[str, str], block_chars: int = BLOCK_CHARS) -> Dict:
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    index: Dict[str, List[List[int]]] = {}
+    raw_bytes = 0
+    blocks = 0
+    offset = 0
+
+    tmp = path.with_suffix(".docs.tmp")
+    with open(tmp, "wb") as f:
+        for chunk_id, text in texts.items():
+            entries = []
+            for start in range(0, max(len(text), 1), block_chars):
+                raw = text[start:start + block_chars].encode("utf-8")
+                block = zlib.compress(raw, COMPRESS_LEVEL)
+                f.write(block)
+                entries.append([offset, len(block)])
+                raw_bytes += len(raw)
+                offset += len(block)
+            index[chunk_id] = entries
+            blocks += len(entries)
+
+        meta = {
+            "version": DOCSTORE_VERSION,
+            "chunks": len(index),
+            "blocks": blocks,
+            "block_chars": block_chars,
+            "raw_bytes": raw_bytes,
+            "compressed_bytes": offset,
+            "built_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        }
+        f.write(json.dumps({"meta": meta, "chunks": index}, ensure_ascii=False).encode("utf-8"))
+        f.write(_FOOTER.pack(offset))
+
+    os.replace(tmp, path)
+    return meta
+
+
+def build_docstore(collection_name: str, chunks: Iterable[Dict]) -> Dict:
+    """
+    Build from normalized chunks (same first-wins handling of repeated
+    chunk IDs as the vector and BM25 indexes).
+    """
+    texts: Dict[str, str] = {}
+    for chunk in chunks:
+        if chunk.get("id") and chunk.get("text"):
+            texts.setdefault(chunk["id"], chunk["text"])
+
+    t0 = time.perf_counter()
+    meta = write_docstore(docstore_path(collection_name), texts)
+
+    print(f"🗜️ Docstore: {meta['chunks']} chunks ({meta['blocks']} blocks), {meta['raw_bytes'] / 1e6:.2f} MB → "
+          f"{meta['compressed_bytes'] / 1e6:.2f} MB in {time.perf_counter() - t0:.2f} s "
+          f"→ {docstore_path(collection_name)}")
+    return meta
+
+
+# =================================================
+# READER
+# =================================================
+
+class DocStore:
+    """
+    Chunk texts by chunk_id from one memory-mapped docstore file. Only the
+    blocks covering the requested characters are decompressed; the last
+    `cache_size` blocks are kept in an LRU.
+    """
+
+    def __init__(self, path: Path, cache_size: int = DOCSTORE_CACHE_SIZE):
+        self._mmap = None
+        self.path = path
+        self.cache_size = cache_size
+
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (index_offset,) = _FOOTER.unpack_from(self._mmap, len(self._mmap) - _FOOTER.size)
+        header = json.loads(self._mmap[index_offset:len(self._mmap) - _FOOTER.size])
+        self.meta: Dict = header["meta"]
+        self.index: Dict[str, List[List[int]]] = header["chunks"]
+
+        # Version 1: one [offset, length] block per chunk
+        self.block_chars: Optional[int] = self.meta.get("block_chars")
+        if self.block_chars is None:
+            self.index = {chunk_id: [entry] for chunk_id, entry in self.index.items()}
+
+        self._cache: "OrderedDict[Tuple[str, int], str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Stats
+        self.hits = 0
+        self.misses = 0
+        self.bytes_read = 0
+
+    def _block(self, chunk_id: str, i: int, entry: List[int]) -> str:
+        key = (chunk_id, i)
+        with self._lock:
+            text = self._cache.get(key)
+            if text is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return text
+
+        offset, length = entry
+        text = zlib.decompress(self._mmap[offset:offset + length]).decode("utf-8")
+
+        with self._lock:
+            self.misses += 1
+            self.bytes_read += length
+            if self.cache_size > 0:
+                self._cache[key] = text
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return text
+
+    def slice(self, chunk_id: str, start: int = 0, end: Optional[int] = None) -> Optional[str]:
+        """
+        text(chunk_id)[start:end], decompressing only the blocks it spans.
+        """
+        entries = self.index.get(chunk_id)
+        if entries is None:
+            return None
+
+        if self.block_chars is None:
+            first, last = 0, len(entries) - 1
+        else:
+            first = min(start // self.block_chars, len(entries) - 1)
+            last = len(entries) - 1 if end is None else min(max(end - 1, start) // self.block_chars, len(entries) - 1)
+
+        text = "".join(self._block(chunk_id, i, entries[i]) for i in range(first, last + 1))
+        base = first * self.block_chars if self.block_chars is not None else 0
+        return text[start - base:None if end is None else end - base]
+
+    def text(self, chunk_id: str) -> Optional[str]:
+        return self.slice(chunk_id)
+
+    def passage_text(self, payload: dict) -> Optional[str]:
+        return self.slice(payload.get("chunk_id"), payload.get("char_start", 0), payload.get("char_end"))
+
+    def stats(self) -> Dict:
+        return {
+            **self.meta,
+            "hits": self.hits,
+            "misses": self.misses,
+            "bytes_read": self.bytes_read,
+            "cache_entries": len(self._cache),
+            "cache_size": self.cache_size,
+        }
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    # A replaced docstore may still be read by a running request, so the
+    # mapping is released when the object goes away
+    __del__ = close
+
+
+_docstores: Dict[str, Tuple[int, DocStore]] = {}
+_docstores_lock = threading.Lock()
+
+
+def get_docstore(collection_name: str) -> Optional[DocStore]:
+    """
+    Opened on first use and reopened when the file is rebuilt
+    (mtime check, one stat call). None if it was never built.
+    """
+    path = docstore_path(collection_name)
+    try:
+        mtime = path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+    cached = _docstores.get(collection_name)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    with _docstores_lock:
+        cached = _docstores.get(collection_name)
+        if cached is None or cached[0] != mtime:
+            cached = (mtime, DocStore(path))
+            _docstores[collection_name] = cached
+        return cached[1]
+
+
+def all_docstore_stats() -> Dict:
+    return {name: store.stats() for name, (_, store) in _docstores.items()}
+
+
+# =================================================
+# HYDRATION
+# =================================================
+
+def hydrate(collection_name: str, payloads: List[dict]) -> List[dict]:
+    """
+    Copies of `payloads` with "text" filled in from the docstore.
+    Payloads that already carry text (indexes built before the docstore)
+    pass through; passages whose chunk is not in the docstore are dropped.
+    """
+    missing = [p for p in payloads if "text" not in p]
+    if not missing:
+        return payloads
+
+    store = get_docstore(collection_name)
+    if store is None:
+        logger.warning("docstore missing, re-run ingestion",
+                       extra={"collection": collection_name, "passages": len(missing)})
+        return [p for p in payloads if "text" in p]
+
+    hydrated = []
+    for payload in payloads:
+        if "text" in payload:
+            hydrated.append(payload)
+            continue
+
+        text = store.passage_text(payload)
+        if text is None:
+            logger.warning("chunk not in docstore",
+                           extra={"collection": collection_name, "chunk_id": payload.get("chunk_id")})
+            continue
+        hydrated.append({**payload, "text": text})
+
+    return hydrated
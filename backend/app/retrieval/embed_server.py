@@ -0,0 +1,300 @@
+import argparse
+import asyncio
+import json
+import os
+import signal
+import socket
+import struct
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.config import (
+    EMBED_BACKEND,
+    EMBED_SOCKET,
+    EMBED_SERVER_TIMEOUT_SECONDS,
+    LOCAL_EMBED_MODEL,
+)
+
+# Wire format (native byte order, same host):
+#   request  : op u8, payload length u32, payload
+#              OP_ENCODE payload = JSON list of texts; OP_INFO payload empty
+#   response : status u8, rows u32, dim u32, body length u32, body
+#              OK + OP_ENCODE → rows × dim float32 matrix, raw
+#              OK + OP_INFO   → JSON; ERROR → UTF-8 message
+# Vectors travel as raw float32 bytes: the server writes the matrix buffer
+# as-is and the client receives straight into the buffer that backs the
+# returned array, with no per-float encoding or decoding on either side.
+REQUEST = struct.Struct("=BI")
+RESPONSE = struct.Struct("=BIII")
+
+OP_ENCODE = 1
+OP_INFO = 2
+
+OK = 0
+ERROR = 1
+
+
+def rss_mb(pid="self") -> Optional[float]:
+    """
+    Resident memory of a process from /proc (Linux), None elsewhere.
+    """
+    try:
+        with open(f"/proc/{pid}/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+# =================================================
+# CLIENT (API workers)
+# =================================================
+
+def _recv_exact(sock: socket.socket, size: int) -> bytearray:
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        n = sock.recv_into(view[received:])
+        if n == 0:
+            raise ConnectionError("embedding server closed the connection")
+        received += n
+    return buffer
+
+
+class RemoteModel:
+    """
+    Stands in for the SentenceTransformer in API workers when
+    EMBED_MODE=shared: EmbeddingService calls encode() as usual and the
+    embedding server answers it. The worker-side LRU cache and
+    micro-batching stay in front of it.
+
+    One blocking connection per thread (the embedding executor's), opened
+    on first use. Encoding is idempotent, so a request that hits a dropped
+    connection (server restarted) is sent once more on a new one.
+    """
+
+    def __init__(self, path: Path = EMBED_SOCKET, timeout_seconds: float = EMBED_SERVER_TIMEOUT_SECONDS):
+        self.path = str(path)
+        self.timeout_seconds = timeout_seconds
+        self._local = threading.local()
+        self._dim: Optional[int] = None
+
+    def _connection(self) -> socket.socket:
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout_seconds)
+            try:
+                sock.connect(self.path)
+            except OSError as e:
+                sock.close()
+                raise RuntimeError(
+                    f"Embedding server not reachable at {self.path} "
+                    "(start it with: python -m app.retrieval.embed_server)"
+                ) from e
+            self._local.sock = sock
+        return sock
+
+    def _close(self):
+        sock = getattr(self._local, "sock", None)
+        self._local.sock = None
+        if sock is not None:
+            sock.close()
+
+    def _request(self, op: int, payload: bytes):
+        for attempt in range(2):
+            sock = self._connection()
+            try:
+                sock.sendall(REQUEST.pack(op, len(payload)))
+                sock.sendall(payload)
+                status, rows, dim, size = RESPONSE.unpack(_recv_exact(sock, RESPONSE.size))
+                body = _recv_exact(sock, size)
+                break
+            except ConnectionError:
+                self._close()
+                if attempt:
+                    raise
+            except Exception:
+                # Timeout or partial read: the stream is out of step
+                self._close()
+                raise
+
+        if status != OK:
+            raise RuntimeError(f"Embedding server error: {body.decode('utf-8', 'replace')}")
+        return rows, dim, body
+
+    def encode(self, texts, **kwargs) -> np.ndarray:
+        """
+        Normalized float32 (len(texts), dim) matrix, backed by the
+        received buffer. Keyword arguments are accepted for
+        SentenceTransformer compatibility; the server always normalizes.
+        """
+        rows, dim, body = self._request(OP_ENCODE, json.dumps(list(texts)).encode("utf-8"))
+        return np.frombuffer(body, dtype=np.float32).reshape(rows, dim)
+
+    def get_sentence_embedding_dimension(self) -> int:
+        if self._dim is None:
+            self._dim = self.info()["dim"]
+        return self._dim
+
+    def info(self) -> Dict:
+        _, _, body = self._request(OP_INFO, b"")
+        return json.loads(body)
+
+
+# =================================================
+# SERVER
+# =================================================
+
+class EmbeddingServer:
+    """
+    Shared embedding server for multi-worker deployments
+    (EMBED_MODE=shared).
+
+    One process owns the SentenceTransformer and its thread pool; API
+    workers send encode requests over a Unix socket instead of loading a
+    model each, so RAM no longer grows with the number of uvicorn workers
+    and embedding threads stop contending for the same cores.
+
+    Requests of up to one batch of texts go through the micro-batcher
+    (so single questions from different workers share a forward pass);
+    larger ones (ingestion) are encoded directly.
+
+    The server keeps no cache: each worker's LRU already answers repeats
+    before they reach the socket.
+    """
+
+    def __init__(self, path: Path = EMBED_SOCKET):
+        from app.retrieval.embedding import EMBED_EXECUTOR, EmbeddingBatcher, EmbeddingService
+
+        self.path = Path(path)
+        self.executor = EMBED_EXECUTOR
+        self.service = EmbeddingService(model_loader=self._model, cache_size=0)
+        self.batcher = EmbeddingBatcher(service=self.service, executor=self.executor)
+
+        self._loaded = None
+        self._server: Optional[asyncio.AbstractServer] = None
+
+        # Stats
+        self.connections = 0
+        self.requests = 0
+        self.texts = 0
+        self.errors = 0
+
+    def _model(self):
+        if self._loaded is None:
+            from app.retrieval.embedding import load_sentence_transformer
+            self._loaded = load_sentence_transformer()
+        return self._loaded
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        # Load and warm up before listening: workers only ever see a ready model
+        await loop.run_in_executor(self.executor, self.service.embed_many, ["warmup"], False)
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if self.path.exists():
+            self.path.unlink()
+        self._server = await asyncio.start_unix_server(self._handle, path=str(self.path))
+        # Owner only: the socket is an unauthenticated local API
+        os.chmod(self.path, 0o600)
+
+    async def serve_forever(self):
+        async with self._server:
+            await self._server.serve_forever()
+
+    def close(self):
+        if self._server is not None:
+            self._server.close()
+        if self.path.exists():
+            self.path.unlink()
+
+    async def encode(self, texts: List[str]) -> np.ndarray:
+        if 0 < len(texts) <= self.batcher.max_batch:
+            rows = await asyncio.gather(*(self.batcher.embed(text) for text in texts))
+            return np.stack(rows)
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self.service.embed_many, texts, False)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        try:
+            while True:
+                try:
+                    op, size = REQUEST.unpack(await reader.readexactly(REQUEST.size))
+                    payload = await reader.readexactly(size)
+                except asyncio.IncompleteReadError:
+                    break
+
+                self.requests += 1
+                try:
+                    if op == OP_ENCODE:
+                        texts = json.loads(payload)
+                        self.texts += len(texts)
+                        matrix = np.ascontiguousarray(await self.encode(texts), dtype=np.float32)
+                        writer.write(RESPONSE.pack(OK, matrix.shape[0], matrix.shape[1], matrix.nbytes))
+                        writer.write(matrix.data)
+                    elif op == OP_INFO:
+                        body = json.dumps(self.info()).encode("utf-8")
+                        writer.write(RESPONSE.pack(OK, 0, 0, len(body)) + body)
+                    else:
+                        raise ValueError(f"unknown op {op}")
+                except Exception as e:
+                    self.errors += 1
+                    body = f"{type(e).__name__}: {e}".encode("utf-8")
+                    writer.write(RESPONSE.pack(ERROR, 0, 0, len(body)) + body)
+
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.connections -= 1
+            writer.close()
+
+    def info(self) -> Dict:
+        return {
+            "pid": os.getpid(),
+            "model": LOCAL_EMBED_MODEL,
+            "backend": EMBED_BACKEND,
+            "dim": self._model().get_sentence_embedding_dimension(),
+            "rss_mb": rss_mb(),
+            "connections": self.connections,
+            "requests": self.requests,
+            "texts": self.texts,
+            "errors": self.errors,
+            "forward_passes": self.service.forward_passes,
+            "batching": self.batcher.stats(),
+        }
+
+
+async def serve(path: Path):
+    server = EmbeddingServer(path)
+    await server.start()
+    print(f"🧠 Embedding server ({LOCAL_EMBED_MODEL}, {EMBED_BACKEND}) listening on {path}", flush=True)
+    try:
+        await server.serve_forever()
+    finally:
+        server.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Shared embedding server for EMBED_MODE=shared API workers.")
+    parser.add_argument("--socket", type=Path, default=EMBED_SOCKET)
+    args = parser.parse_args()
+
+    def stop(*_):
+        raise KeyboardInterrupt
+
+    # SIGTERM (systemd, docker stop) shuts down like Ctrl-C and removes the socket
+    signal.signal(signal.SIGTERM, stop)
+    try:
+        asyncio.run(serve(args.socket))
+    except KeyboardInterrupt:
+        pass
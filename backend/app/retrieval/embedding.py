@@ -1,10 +1,532 @@
-from sentence_transformers import SentenceTransformer
+import asyncio
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
 
-# Load model once
-_model = SentenceTransformer("all-MiniLM-L6-v2")
+import numpy as np
+
+from app.config import (
+    LOCAL_EMBED_MODEL,
+    EMBED_BACKEND,
+    EMBED_QUANTIZATION,
+    EMBED_MODEL_DIR,
+    EMBED_EXECUTOR_WORKERS,
+    EMBED_CACHE_SIZE,
+    EMBED_BATCHING,
+    EMBED_BATCH_WINDOW_MS,
+    EMBED_BATCH_MAX_SIZE,
+    EMBED_BATCH_QUEUE_SIZE,
+    EMBED_MODE,
+)
+from app.metrics import EMBED_BACKPRESSURE, EMBED_BATCH_SIZE, EMBED_QUEUE_SECONDS
+
+BACKENDS = ("torch", "onnx", "onnx-int8")
+MODES = ("in-process", "shared")
+
+
+# =================================================
+# BACKENDS
+# =================================================
+# Shared by the API and the ingestion scripts, so queries and passages are
+# always embedded by the same backend.
+
+def onnx_export_dir(model_name: str = LOCAL_EMBED_MODEL) -> Path:
+    return EMBED_MODEL_DIR / model_name.replace("/", "__")
+
+
+def quantized_file_name(quantization: str = EMBED_QUANTIZATION) -> str:
+    return f"onnx/model_qint8_{quantization}.onnx"
+
+
+def _export_onnx(model_name: str) -> Path:
+    """
+    Export the model to ONNX once and keep it on disk; later loads skip
+    the export.
+    """
+    from sentence_transformers import SentenceTransformer
+
+    path = onnx_export_dir(model_name)
+    if not (path / "onnx" / "model.onnx").exists():
+        print(f"📦 Exporting {model_name} to ONNX → {path}")
+        SentenceTransformer(model_name, backend="onnx").save(str(path))
+    return path
+
+
+def load_sentence_transformer(
+    backend: str = EMBED_BACKEND,
+    model_name: str = LOCAL_EMBED_MODEL,
+    quantization: str = EMBED_QUANTIZATION,
+):
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown EMBED_BACKEND {backend!r}, expected one of {BACKENDS}")
+
+    from sentence_transformers import SentenceTransformer
+
+    if backend == "torch":
+        return SentenceTransformer(model_name)
+
+    try:
+        path = _export_onnx(model_name)
+
+        if backend == "onnx":
+            return SentenceTransformer(str(path), backend="onnx")
+
+        file_name = quantized_file_name(quantization)
+        if not (path / file_name).exists():
+            from sentence_transformers import export_dynamic_quantized_onnx_model
+
+            print(f"📦 Quantizing {model_name} to int8 ({quantization})")
+            export_dynamic_quantized_onnx_model(
+                SentenceTransformer(str(path), backend="onnx"),
+                quantization,
+                str(path)
+            )
+
+        return SentenceTransformer(
+            str(path),
+            backend="onnx",
+            model_kwargs={"file_name": file_name}
+        )
+
+    except ImportError as e:
+        raise RuntimeError(
+            f"EMBED_BACKEND={backend} needs Optimum and ONNX Runtime: "
+            "pip install sentence-transformers[onnx]"
+        ) from e
+
+
+# =================================================
+# MODEL (lazy)
+# =================================================
+# sentence_transformers pulls in torch; importing it and loading the model
+# happens on first use (or at warmup), not when this module is imported.
+# With EMBED_MODE=shared it never happens in this process: the model is a
+# client of the embedding server (app/retrieval/embed_server.py).
+
+_model = None
+_model_lock = threading.Lock()
+
+
+def get_model():
+    global _model
+
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                if EMBED_MODE not in MODES:
+                    raise ValueError(f"Unknown EMBED_MODE {EMBED_MODE!r}, expected one of {MODES}")
+
+                if EMBED_MODE == "shared":
+                    from app.retrieval.embed_server import RemoteModel
+                    _model = RemoteModel()
+                else:
+                    _model = load_sentence_transformer()
+
+    return _model
+
+
+def model_loaded() -> bool:
+    return _model is not None
+
+# Dedicated pool for CPU-bound encoding, kept apart from FastAPI's
+# threadpool and from the event loop
+EMBED_EXECUTOR = ThreadPoolExecutor(
+    max_workers=EMBED_EXECUTOR_WORKERS,
+    thread_name_prefix="embed"
+)
+
+
+# =================================================
+# EMBEDDING SERVICE
+# =================================================
+
+class EmbeddingService:
+    """
+    Wraps the model with an LRU cache keyed on the exact text.
+
+    All internal paths work on normalized float32 NumPy arrays; only the
+    list-returning embed() builds Python lists. Cached vectors are marked
+    read-only because they are shared between callers.
+    """
+
+    def __init__(self, model_loader=get_model, cache_size: int = EMBED_CACHE_SIZE):
+        self.model_loader = model_loader
+        self.cache_size = cache_size
+
+        self._cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Stats
+        self.calls = 0
+        self.hits = 0
+        self.misses = 0
+        self.forward_passes = 0
+        self.latencies: deque = deque(maxlen=2000)
+
+    # ---------- model ----------
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        self.forward_passes += 1
+        return self.model_loader().encode(
+            texts,
+            normalize_embeddings=True,
+            convert_to_numpy=True,
+            show_progress_bar=False
+        ).astype(np.float32, copy=False)
+
+    # ---------- cache ----------
+    def _get(self, text: str):
+        with self._lock:
+            vector = self._cache.get(text)
+            if vector is not None:
+                self._cache.move_to_end(text)
+            return vector
+
+    def _put(self, text: str, vector: np.ndarray):
+        if self.cache_size <= 0:
+            return
+        # Own copy, so a cached row does not pin the whole batch matrix
+        vector = vector.copy()
+        vector.setflags(write=False)
+        with self._lock:
+            self._cache[text] = vector
+            self._cache.move_to_end(text)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def cached(self, text: str) -> Optional[np.ndarray]:
+        """
+        Cached vector of `text` (read-only) or None, counted as a call and
+        a hit. Lets async callers answer from the cache without a trip
+        through the batch queue and the executor.
+        """
+        t0 = time.perf_counter()
+        vector = self._get(text)
+        if vector is not None:
+            with self._lock:
+                self.calls += 1
+                self.hits += 1
+                self.latencies.append(time.perf_counter() - t0)
+        return vector
+
+    # ---------- public API ----------
+    def embed_many(self, texts: Sequence[str], use_cache: bool = True) -> np.ndarray:
+        """
+        (len(texts), dim) matrix. Cache misses are encoded together in one
+        forward pass; duplicates within the batch are encoded once.
+        """
+        t0 = time.perf_counter()
+        texts = list(texts)
+
+        found: Dict[str, np.ndarray] = {}
+        if use_cache:
+            for text in texts:
+                if text not in found:
+                    vector = self._get(text)
+                    if vector is not None:
+                        found[text] = vector
+
+        missing = list(dict.fromkeys(t for t in texts if t not in found))
+        if missing:
+            matrix = self._encode(missing)
+            for text, vector in zip(missing, matrix):
+                found[text] = vector
+                if use_cache:
+                    self._put(text, vector)
+
+        with self._lock:
+            self.calls += 1
+            if use_cache:
+                self.hits += len(texts) - len(missing)
+                self.misses += len(missing)
+            self.latencies.append(time.perf_counter() - t0)
+
+        if not texts:
+            return np.zeros((0, self.model_loader().get_sentence_embedding_dimension()), dtype=np.float32)
+        return np.stack([found[t] for t in texts])
+
+    def embed_np(self, text: str) -> np.ndarray:
+        """
+        Single normalized float32 vector (no list conversion).
+        """
+        return self.embed_many([text])[0]
+
+    def embed(self, text: str) -> list[float]:
+        return self.embed_np(text).tolist()
+
+    # ---------- stats ----------
+    def stats(self) -> Dict:
+        def pct(values, q):
+            return round(float(np.percentile(list(values), q)) * 1000, 3) if values else None
+
+        lookups = self.hits + self.misses
+        return {
+            "cache_entries": len(self._cache),
+            "cache_size": self.cache_size,
+            "calls": self.calls,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "forward_passes": self.forward_passes,
+            "p50_ms": pct(self.latencies, 50),
+            "p95_ms": pct(self.latencies, 95),
+        }
+
+
+embedding_service = EmbeddingService()
+
+
+# =================================================
+# MICRO-BATCHING
+# =================================================
+
+class EmbeddingBatcher:
+    """
+    Cross-request micro-batching for single-text embeddings.
+
+    Concurrent requests each embed one question; encoding them one by one
+    pays the per-call overhead of the model every time. Texts are queued
+    instead, and a dispatcher task collects whatever arrives within
+    `window_ms` of the first one (or until `max_batch` are waiting), runs
+    one embed_many() on the embedding executor and resolves each caller's
+    future with its own row.
+
+    While every executor worker is busy the dispatcher holds back, so
+    batches grow with load instead of queueing forward passes. Once
+    `queue_size` texts are pending, callers wait for space (backpressure)
+    rather than growing the queue without bound.
+
+    Cache hits never enter the queue. Used from the event loop only; the
+    queue and dispatcher are created lazily on the running loop.
+    """
+
+    def __init__(
+        self,
+        service: EmbeddingService = embedding_service,
+        window_ms: float = EMBED_BATCH_WINDOW_MS,
+        max_batch: int = EMBED_BATCH_MAX_SIZE,
+        queue_size: int = EMBED_BATCH_QUEUE_SIZE,
+        executor: ThreadPoolExecutor = EMBED_EXECUTOR,
+        max_in_flight: int = EMBED_EXECUTOR_WORKERS,
+    ):
+        self.service = service
+        self.window_seconds = max(0.0, window_ms) / 1000
+        self.max_batch = max(1, max_batch)
+        self.queue_size = max(self.max_batch, queue_size)
+        self.executor = executor
+        self.max_in_flight = max(1, max_in_flight)
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._full: Optional[asyncio.Event] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._running: set = set()
+
+        # Stats
+        self.requests = 0
+        self.cache_hits = 0
+        self.batches = 0
+        self.backpressure = 0
+        self.errors = 0
+        self.batch_sizes: deque = deque(maxlen=2000)
+        self.queue_delays: deque = deque(maxlen=2000)
+
+    # ---------- lifecycle ----------
+    def _ensure_started(self) -> asyncio.Queue:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._dispatcher is None or self._dispatcher.done():
+            self._loop = loop
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+            self._full = asyncio.Event()
+            self._slots = asyncio.Semaphore(self.max_in_flight)
+            self._dispatcher = loop.create_task(self._dispatch())
+        return self._queue
+
+    async def close(self):
+        """
+        Stop the dispatcher; texts still queued fail with CancelledError.
+        """
+        dispatcher, queue = self._dispatcher, self._queue
+        self._dispatcher = None
+        if dispatcher is None or dispatcher.get_loop() is not asyncio.get_running_loop():
+            return
+
+        dispatcher.cancel()
+        try:
+            await dispatcher
+        except asyncio.CancelledError:
+            pass
+
+        while not queue.empty():
+            _, future, _ = queue.get_nowait()
+            if not future.done():
+                future.cancel()
+
+    # ---------- public API ----------
+    async def embed(self, text: str) -> np.ndarray:
+        self.requests += 1
+        vector = self.service.cached(text)
+        if vector is not None:
+            self.cache_hits += 1
+            return vector
+
+        queue = self._ensure_started()
+        future = self._loop.create_future()
+        item = (text, future, time.perf_counter())
+        try:
+            queue.put_nowait(item)
+        except asyncio.QueueFull:
+            self.backpressure += 1
+            EMBED_BACKPRESSURE.inc()
+            await queue.put(item)
+
+        # A full batch is waiting: no need to sit out the window
+        if queue.qsize() >= self.max_batch - 1:
+            self._full.set()
+
+        return await future
+
+    # ---------- dispatcher ----------
+    async def _dispatch(self):
+        queue = self._queue
+        while True:
+            # Wait for a free executor worker first; texts keep queueing
+            # meanwhile and go out together in the next batch
+            await self._slots.acquire()
+            try:
+                batch = [await queue.get()]
+
+                if self.window_seconds > 0 and queue.qsize() < self.max_batch - 1:
+                    self._full.clear()
+                    try:
+                        await asyncio.wait_for(self._full.wait(), self.window_seconds)
+                    except asyncio.TimeoutError:
+                        pass
+
+                while len(batch) < self.max_batch and not queue.empty():
+                    batch.append(queue.get_nowait())
+                self._full.clear()
+            except BaseException:
+                self._slots.release()
+                raise
+
+            # The loop only keeps weak references to tasks
+            task = asyncio.ensure_future(self._run(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch: List[tuple]):
+        try:
+            # Callers that gave up (request cancelled) are not encoded
+            live = [item for item in batch if not item[1].done()]
+            if not live:
+                return
+
+            now = time.perf_counter()
+            for _, _, enqueued in live:
+                delay = now - enqueued
+                self.queue_delays.append(delay)
+                EMBED_QUEUE_SECONDS.observe(delay)
+            self.batches += 1
+            self.batch_sizes.append(len(live))
+            EMBED_BATCH_SIZE.observe(len(live))
+
+            try:
+                matrix = await self._loop.run_in_executor(
+                    self.executor, self.service.embed_many, [text for text, _, _ in live]
+                )
+            except Exception as e:
+                self.errors += 1
+                for _, future, _ in live:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+
+            for (_, future, _), vector in zip(live, matrix):
+                if not future.done():
+                    future.set_result(vector)
+        finally:
+            self._slots.release()
+
+    # ---------- stats ----------
+    def stats(self) -> Dict:
+        sizes = list(self.batch_sizes)
+        delays = list(self.queue_delays)
+
+        def pct(values, q, scale=1.0):
+            return round(float(np.percentile(values, q)) * scale, 3) if values else None
+
+        return {
+            "enabled": EMBED_BATCHING,
+            "window_ms": self.window_seconds * 1000,
+            "max_batch": self.max_batch,
+            "queue_size": self.queue_size,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "requests": self.requests,
+            "cache_hits": self.cache_hits,
+            "batches": self.batches,
+            "backpressure": self.backpressure,
+            "errors": self.errors,
+            "batch_size_mean": round(float(np.mean(sizes)), 2) if sizes else None,
+            "batch_size_p95": pct(sizes, 95),
+            "batch_size_max": max(sizes) if sizes else None,
+            "queue_p50_ms": pct(delays, 50, 1000),
+            "queue_p95_ms": pct(delays, 95, 1000),
+        }
+
+
+# With EMBED_MODE=shared the embedding server runs the window across all
+# workers; waiting here as well would add it twice. Load-driven batching
+# (texts queued while the executor is busy) still cuts socket round trips.
+embedding_batcher = EmbeddingBatcher(window_ms=0 if EMBED_MODE == "shared" else EMBED_BATCH_WINDOW_MS)
+
+
+# =================================================
+# MODULE-LEVEL HELPERS
+# =================================================
 
 def embed(text: str) -> list[float]:
     """
     Generate embedding locally (no API, no quota).
     """
-    return _model.encode(text, normalize_embeddings=True).tolist()
+    return embedding_service.embed(text)
+
+
+def embed_np(text: str) -> np.ndarray:
+    return embedding_service.embed_np(text)
+
+
+def encode_batch(texts: list[str], use_cache: bool = False):
+    """
+    Encode many texts in one forward pass; returns a normalized
+    (len(texts), dim) float32 matrix.
+    """
+    return embedding_service.embed_many(texts, use_cache=use_cache)
+
+
+async def embed_async(text: str) -> list[float]:
+    """
+    Same as embed(), off the event loop so it keeps serving other requests
+    meanwhile. With EMBED_BATCHING, concurrent calls share forward passes.
+    """
+    return (await embed_np_async(text)).tolist()
+
+
+async def embed_np_async(text: str) -> np.ndarray:
+    if EMBED_BATCHING:
+        return await embedding_batcher.embed(text)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(EMBED_EXECUTOR, embed_np, text)
+
+
+async def embed_many_async(texts: Sequence[str]) -> np.ndarray:
+    # Already one forward pass; the batch queue would only add its window
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(EMBED_EXECUTOR, embedding_service.embed_many, texts)
@@ -0,0 +1,353 @@
+import json
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.config import LEXICAL_DIR, BM25_K1, BM25_B
+
+# 2: docs without text
+INDEX_VERSION = 2
+
+# Bonus for query terms that appear next to each other in the passage, in
+# units of the rarer term's IDF
+PHRASE_WEIGHT = 0.5
+
+
+# =================================================
+# TOKENIZATION
+# =================================================
+
+STOPWORDS = {
+    "a", "about", "after", "all", "also", "am", "an", "and", "any", "are",
+    "as", "at", "be", "because", "been", "before", "being", "but", "by",
+    "can", "could", "did", "do", "does", "for", "from", "had", "has",
+    "have", "he", "her", "him", "his", "how", "i", "if", "in", "into",
+    "is", "it", "its", "me", "my", "no", "not", "of", "on", "one", "or",
+    "our", "she", "so", "such", "than", "that", "the", "their", "them",
+    "then", "there", "these", "they", "this", "those", "to", "up", "us",
+    "was", "we", "were", "what", "when", "where", "which", "who", "why",
+    "will", "with", "would", "you", "your",
+}
+
+_TOKEN = re.compile(r"[a-z0-9]+(?:['\-][a-z0-9]+)*")
+
+
+def _stem(word: str) -> str:
+    """
+    Light plural folding only (sanskaras → sanskara, bodies → body);
+    anything stronger mangles the Sufi/Vedantic vocabulary.
+    """
+    if word.endswith("'s"):
+        word = word[:-2]
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    return word
+
+
+def tokenize(text: str) -> List[Tuple[str, int]]:
+    """
+    (term, position) pairs. Positions count every word, stopwords
+    included, so phrase offsets survive stopword removal.
+    """
+    terms = []
+    for position, match in enumerate(_TOKEN.finditer(text.lower())):
+        word = match.group()
+        if word in STOPWORDS:
+            continue
+        terms.append((_stem(word), position))
+    return terms
+
+
+def term_set(text: str) -> List[str]:
+    """
+    Sorted distinct terms of `text`, normalized exactly like the index.
+    Stored on passage payloads so boosting never rescans the text.
+    """
+    return sorted({term for term, _ in tokenize(text)})
+
+
+# =================================================
+# INDEX
+# =================================================
+
+class LexicalIndex:
+    """
+    BM25 inverted index over passages, with term positions.
+
+    Postings are stored as flat NumPy arrays (CSR layout):
+      term_offsets[t] : term_offsets[t+1]  → rows of post_docs / post_weight
+      pos_offsets[r]  : pos_offsets[r+1]   → positions of that posting
+    post_weight holds the precomputed BM25 term weight (idf × saturated tf,
+    length-normalized), so scoring a query is one scatter-add per term.
+    """
+
+    def __init__(self, docs: List[Dict], vocab: Dict[str, int], arrays: Dict[str, np.ndarray], meta: Dict):
+        self.docs = docs
+        self.vocab = vocab
+        self.meta = meta
+
+        self.idf = arrays["idf"]
+        self.term_offsets = arrays["term_offsets"]
+        self.post_docs = arrays["post_docs"]
+        self.post_weight = arrays["post_weight"]
+        self.pos_offsets = arrays["pos_offsets"]
+        self.positions = arrays["positions"]
+
+    # ---------- build ----------
+    @classmethod
+    def build(cls, passages: Iterable[Dict], k1: float = BM25_K1, b: float = BM25_B) -> "LexicalIndex":
+        from app.ingestion.passages import vector_payload
+
+        docs: List[Dict] = []
+        postings: Dict[str, List[Tuple[int, List[int]]]] = {}
+        doc_len: List[int] = []
+
+        for payload in passages:
+            doc = len(docs)
+            # Texts are hydrated from the docstore, like vector hits
+            docs.append(vector_payload(payload))
+
+            terms = tokenize(payload.get("text", ""))
+            doc_len.append(len(terms))
+
+            by_term: Dict[str, List[int]] = {}
+            for term, position in terms:
+                by_term.setdefault(term, []).append(position)
+            for term, positions in by_term.items():
+                postings.setdefault(term, []).append((doc, positions))
+
+        n_docs = len(docs)
+        lengths = np.asarray(doc_len, dtype=np.float32)
+        avgdl = float(lengths.mean()) if n_docs else 0.0
+
+        vocab_terms = sorted(postings)
+        vocab = {term: i for i, term in enumerate(vocab_terms)}
+
+        term_offsets = [0]
+        post_docs: List[int] = []
+        post_tf: List[int] = []
+        pos_offsets = [0]
+        positions: List[int] = []
+        idf = np.zeros(len(vocab_terms), dtype=np.float32)
+
+        for t, term in enumerate(vocab_terms):
+            plist = postings[term]
+            df = len(plist)
+            idf[t] = np.log(1.0 + (n_docs - df + 0.5) / (df + 0.5))
+
+            for doc, pos in plist:
+                post_docs.append(doc)
+                post_tf.append(len(pos))
+                positions.extend(pos)
+                pos_offsets.append(len(positions))
+            term_offsets.append(len(post_docs))
+
+        post_docs_arr = np.asarray(post_docs, dtype=np.int32)
+        tf = np.asarray(post_tf, dtype=np.float32)
+        term_of_posting = np.repeat(np.arange(len(vocab_terms)), np.diff(term_offsets))
+
+        norm = k1 * (1 - b + b * lengths[post_docs_arr] / (avgdl or 1.0))
+        weight = idf[term_of_posting] * tf * (k1 + 1) / (tf + norm)
+
+        arrays = {
+            "idf": idf,
+            "term_offsets": np.asarray(term_offsets, dtype=np.int64),
+            "post_docs": post_docs_arr,
+            "post_weight": weight.astype(np.float32),
+            "pos_offsets": np.asarray(pos_offsets, dtype=np.int64),
+            "positions": np.asarray(positions, dtype=np.int32),
+        }
+        meta = {
+            "version": INDEX_VERSION,
+            "k1": k1,
+            "b": b,
+            "docs": n_docs,
+            "terms": len(vocab_terms),
+            "avgdl": round(avgdl, 2),
+            "built_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        }
+        return cls(docs, vocab, arrays, meta)
+
+    # ---------- persistence ----------
+    def save(self, path: Path):
+        """
+        One .npz file: postings arrays plus a JSON header with the
+        vocabulary and passage payloads. Written atomically.
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        header = json.dumps({
+            "meta": self.meta,
+            "vocab": sorted(self.vocab, key=self.vocab.get),
+            "docs": self.docs,
+        }, ensure_ascii=False)
+
+        tmp = path.with_suffix(".tmp.npz")
+        np.savez(
+            tmp,
+            header=np.frombuffer(header.encode("utf-8"), dtype=np.uint8),
+            idf=self.idf,
+            term_offsets=self.term_offsets,
+            post_docs=self.post_docs,
+            post_weight=self.post_weight,
+            pos_offsets=self.pos_offsets,
+            positions=self.positions,
+        )
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, path: Path) -> "LexicalIndex":
+        with np.load(path, allow_pickle=False) as data:
+            arrays = {k: data[k] for k in data.files}
+
+        header = json.loads(arrays.pop("header").tobytes().decode("utf-8"))
+        vocab = {term: i for i, term in enumerate(header["vocab"])}
+        return cls(header["docs"], vocab, arrays, header["meta"])
+
+    # ---------- query ----------
+    def _postings(self, t: int) -> slice:
+        return slice(self.term_offsets[t], self.term_offsets[t + 1])
+
+    def _occurrences(self, t: int) -> np.ndarray:
+        """
+        Sorted (doc << 32 | position) keys of every occurrence of term t.
+        """
+        rows = self._postings(t)
+        start, stop = self.pos_offsets[rows.start], self.pos_offsets[rows.stop]
+        docs = np.repeat(
+            self.post_docs[rows].astype(np.int64),
+            np.diff(self.pos_offsets[rows.start:rows.stop + 1])
+        )
+        return (docs << 32) | self.positions[start:stop]
+
+    def _adjacent_docs(self, t1: int, t2: int, gap: int) -> np.ndarray:
+        """
+        Docs where t2 occurs exactly `gap` words after t1.
+        """
+        first = self._occurrences(t1) + gap
+        second = self._occurrences(t2)
+        i = np.minimum(np.searchsorted(second, first), len(second) - 1)
+        return np.unique(first[second[i] == first] >> 32)
+
+    def phrase_docs(self, phrase: str) -> np.ndarray:
+        """
+        Passages containing the exact phrase (stopwords aside).
+        """
+        terms = [(self.vocab.get(term), pos) for term, pos in tokenize(phrase)]
+        if not terms or any(t is None for t, _ in terms):
+            return np.zeros(0, dtype=np.int64)
+
+        first, first_pos = terms[0]
+        docs = np.unique(self.post_docs[self._postings(first)]).astype(np.int64)
+        for t, pos in terms[1:]:
+            docs = np.intersect1d(docs, self._adjacent_docs(first, t, pos - first_pos), assume_unique=True)
+        return docs
+
+    def search(self, query: str, limit: int = 10) -> List[Tuple[float, Dict]]:
+        """
+        BM25 ranking with a proximity bonus for query terms that appear
+        side by side. Quoted parts of the query ("sound of silence") are
+        required phrases.
+        """
+        terms = [
+            (self.vocab[term], pos)
+            for term, pos in tokenize(query)
+            if term in self.vocab
+        ]
+        if not terms or not self.docs:
+            return []
+
+        scores = np.zeros(len(self.docs), dtype=np.float32)
+        for t in {t for t, _ in terms}:
+            rows = self._postings(t)
+            scores[self.post_docs[rows]] += self.post_weight[rows]
+
+        for phrase in re.findall(r'"([^"]+)"', query):
+            mask = np.zeros(len(self.docs), dtype=bool)
+            mask[self.phrase_docs(phrase)] = True
+            scores[~mask] = 0.0
+
+        for (t1, p1), (t2, p2) in zip(terms, terms[1:]):
+            if t1 != t2:
+                docs = self._adjacent_docs(t1, t2, p2 - p1)
+                scores[docs] += (scores[docs] > 0) * PHRASE_WEIGHT * min(self.idf[t1], self.idf[t2])
+
+        matched = np.flatnonzero(scores > 0)
+        if not len(matched):
+            return []
+
+        if len(matched) > limit:
+            matched = matched[np.argpartition(-scores[matched], limit - 1)[:limit]]
+        order = matched[np.argsort(-scores[matched], kind="stable")]
+        return [(float(scores[doc]), self.docs[doc]) for doc in order]
+
+
+# =================================================
+# FILES / LOADING
+# =================================================
+
+def lexical_index_path(collection_name: str) -> Path:
+    return LEXICAL_DIR / f"{collection_name}.bm25.npz"
+
+
+def build_lexical_index(collection_name: str, chunks: Iterable[Dict]) -> LexicalIndex:
+    """
+    Build from normalized chunks (same passage split and same first-wins
+    handling of repeated chunk IDs as the vector index) and persist next to
+    the other ingestion artifacts.
+    """
+    from app.ingestion.passages import build_passages
+
+    unique: Dict[str, Dict] = {}
+    for chunk in chunks:
+        if chunk.get("id") and chunk.get("text"):
+            unique.setdefault(chunk["id"], chunk)
+
+    passages = (p for chunk in unique.values() for p in build_passages(chunk))
+
+    t0 = time.perf_counter()
+    index = LexicalIndex.build(passages)
+    index.save(lexical_index_path(collection_name))
+
+    print(f"🔤 BM25 index: {index.meta['docs']} passages, {index.meta['terms']} terms "
+          f"in {time.perf_counter() - t0:.2f} s → {lexical_index_path(collection_name)}")
+    return index
+
+
+_indexes: Dict[str, Tuple[int, LexicalIndex]] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_lexical_index(collection_name: str) -> Optional[LexicalIndex]:
+    """
+    Loaded on first use and reloaded when the file is rebuilt
+    (mtime check, one stat call). None if the index was never built.
+    """
+    path = lexical_index_path(collection_name)
+    try:
+        mtime = path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+    cached = _indexes.get(collection_name)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    with _indexes_lock:
+        cached = _indexes.get(collection_name)
+        if cached is None or cached[0] != mtime:
+            cached = (mtime, LexicalIndex.load(path))
+            _indexes[collection_name] = cached
+        return cached[1]
+
+
+def lexical_search(collection_name: str, query: str, limit: int = 10) -> List[Tuple[float, Dict]]:
+    index = get_lexical_index(collection_name)
+    if index is None:
+        return []
+    return index.search(query, limit)
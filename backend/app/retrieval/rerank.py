@@ -0,0 +1,157 @@
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.config import (
+    RERANK_MODEL,
+    RERANK_BATCH_SIZE,
+    RERANK_CACHE_SIZE,
+)
+from app.retrieval.embedding import EMBED_EXECUTOR
+
+
+# =================================================
+# LAZY MODEL
+# =================================================
+# Same pattern as the embedding model: nothing is imported until the
+# first rerank (or the warmup check) needs it.
+
+_model = None
+_model_lock = threading.Lock()
+
+
+def get_reranker_model():
+    global _model
+
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                from sentence_transformers import CrossEncoder
+                _model = CrossEncoder(RERANK_MODEL)
+
+    return _model
+
+
+def passage_key(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+
+# =================================================
+# RERANKER
+# =================================================
+
+class Reranker:
+    """
+    Cross-encoder scores for (query, passage) pairs, with an LRU cache
+    keyed on (query, passage text hash).
+
+    All uncached pairs of a call are scored in one batched predict() on
+    the embedding executor. If that does not finish within the budget the
+    call returns None and the caller keeps its own order; the scores are
+    still cached when the batch completes, so a repeat of the question is
+    reranked.
+    """
+
+    def __init__(self, model_loader=get_reranker_model, cache_size: int = RERANK_CACHE_SIZE):
+        self.model_loader = model_loader
+        self.cache_size = cache_size
+
+        self._cache: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Stats
+        self.calls = 0
+        self.pairs_scored = 0
+        self.cache_hits = 0
+        self.over_budget = 0
+
+    # ---------- cache ----------
+    def _get(self, key: Tuple[str, str]) -> Optional[float]:
+        with self._lock:
+            score = self._cache.get(key)
+            if score is not None:
+                self._cache.move_to_end(key)
+            return score
+
+    def _put_many(self, items: Dict[Tuple[str, str], float]):
+        if self.cache_size <= 0:
+            return
+        with self._lock:
+            for key, score in items.items():
+                self._cache[key] = score
+                self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    # ---------- scoring ----------
+    def score_pairs(self, query: str, texts: Sequence[str]) -> np.ndarray:
+        """
+        Blocking: one predict() over all pairs. Results go into the cache.
+        """
+        scores = np.asarray(self.model_loader().predict(
+            [(query, text) for text in texts],
+            batch_size=RERANK_BATCH_SIZE,
+            show_progress_bar=False
+        ), dtype=np.float32)
+
+        self._put_many({(query, passage_key(t)): float(s) for t, s in zip(texts, scores)})
+        with self._lock:
+            self.pairs_scored += len(texts)
+        return scores
+
+    async def rerank(self, query: str, payloads: List[dict], budget_s: float) -> Optional[List[dict]]:
+        """
+        `payloads` sorted by cross-encoder score, or None when scoring did
+        not finish within `budget_s`.
+        """
+        self.calls += 1
+        keys = [(query, passage_key(p.get("text", ""))) for p in payloads]
+
+        scores: Dict[int, float] = {}
+        missing: List[int] = []
+        for i, key in enumerate(keys):
+            score = self._get(key)
+            if score is None:
+                missing.append(i)
+            else:
+                scores[i] = score
+        self.cache_hits += len(payloads) - len(missing)
+
+        if missing:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(
+                EMBED_EXECUTOR,
+                self.score_pairs,
+                query,
+                [payloads[i].get("text", "") for i in missing]
+            )
+            try:
+                fresh = await asyncio.wait_for(asyncio.shield(future), timeout=budget_s)
+            except asyncio.TimeoutError:
+                self.over_budget += 1
+                return None
+            scores.update(zip(missing, fresh.tolist()))
+
+        order = sorted(range(len(payloads)), key=lambda i: scores[i], reverse=True)
+        return [{**payloads[i], "rerank_score": round(scores[i], 4)} for i in order]
+
+    def stats(self) -> Dict:
+        return {
+            "model": RERANK_MODEL,
+            "calls": self.calls,
+            "pairs_scored": self.pairs_scored,
+            "cache_hits": self.cache_hits,
+            "cache_entries": len(self._cache),
+            "over_budget": self.over_budget,
+        }
+
+
+reranker = Reranker()
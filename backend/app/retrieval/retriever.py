@@ -1,18 +1,34 @@
-from typing import List, Optional
-from qdrant_client import QdrantClient
+import asyncio
+import bisect
+import logging
+import time
+from functools import lru_cache
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.config import (
+    LEXICAL_ENABLED,
+    RRF_K,
+    RERANK_ENABLED,
+    RERANK_CANDIDATES,
+    RERANK_BUDGET_MS,
+)
+from app.ingestion.passages import topic_labels
+from app.metrics import FALLBACKS, observe_stage
+from app.retrieval.docstore import hydrate
+from app.retrieval.embedding import embed_np_async
+from app.retrieval.lexical import lexical_search, term_set
+from app.retrieval.rerank import reranker
+from app.retrieval.stores import get_vector_store
 
-from app.config import QDRANT_HOST, QDRANT_PORT
-from app.retrieval.embedding import embed
+if TYPE_CHECKING:
+    from app.retrieval.speculative import SpeculativeRetrieval
 
+logger = logging.getLogger(__name__)
 
-# =================================================
-# QDRANT CLIENT
-# =================================================
-
-qdrant = QdrantClient(
-    host=QDRANT_HOST,
-    port=QDRANT_PORT
-)
+# Minimum vector similarity of a candidate
+DEFAULT_THRESHOLD = 0.2
 
 
 # =================================================
@@ -26,50 +42,335 @@ BOOK_COLLECTION_MAP = {
 
 
 # =================================================
-# KEYWORD FALLBACK
+# RANKING CONFIG
 # =================================================
 
-def keyword_fallback(book: str, query: str, limit: int = 5) -> List[dict]:
+class RetrievalConfig:
     """
-    Simple fallback retrieval using raw keyword matching.
-    Used only if vector search fails.
+    Ranking knobs of retrieve(). The defaults are the production values;
+    benchmarks/eval_retrieval.py sweeps them against labelled questions.
     """
 
-    collection = BOOK_COLLECTION_MAP.get(book)
-    if not collection:
-        return []
+    def __init__(
+        self,
+        vector_weight: float = 0.8,
+        topic_boost: float = 0.10,
+        keyword_boost: float = 0.05,
+        keyword_boost_cap: float = 0.15,
+        speaker_boost: float = 0.05,
+        lexical: bool = LEXICAL_ENABLED,
+        rrf_k: int = RRF_K,
+        rerank: bool = RERANK_ENABLED,
+        rerank_candidates: int = RERANK_CANDIDATES,
+        rerank_budget_ms: float = RERANK_BUDGET_MS,
+    ):
+        self.vector_weight = vector_weight
+        self.topic_boost = topic_boost
+        self.keyword_boost = keyword_boost
+        self.keyword_boost_cap = keyword_boost_cap
+        self.speaker_boost = speaker_boost
+        self.lexical = lexical
+        self.rrf_k = rrf_k
+        self.rerank = rerank
+        self.rerank_candidates = rerank_candidates
+        self.rerank_budget_ms = rerank_budget_ms
+
+    def as_dict(self) -> Dict:
+        return dict(vars(self))
+
+    def replace(self, **changes) -> "RetrievalConfig":
+        return RetrievalConfig(**{**self.as_dict(), **changes})
+
+
+DEFAULT_CONFIG = RetrievalConfig()
+
+
+def _stage(timings: Dict[str, float], stage: str, t0: float):
+    seconds = time.perf_counter() - t0
+    timings[f"{stage}_ms"] = round(seconds * 1000, 3)
+    observe_stage(stage, seconds)
+
+
+# =================================================
+# METADATA BOOSTING
+# =================================================
+# Works on the term sets stored at ingestion (lex_terms / topic_terms),
+# never on the passage text: a router topic or keyword matches when all
+# of its terms are in the passage's set, normalized like the BM25 index.
+
+def _lexical_features(payload: dict) -> Tuple[List[str], List[str]]:
+    """
+    (lex_terms, topic_terms) of a payload, both sorted. Recomputed for
+    payloads indexed before these fields existed.
+    """
+    lex_terms = payload.get("lex_terms")
+    if lex_terms is None:
+        lex_terms = term_set(payload.get("text", ""))
+
+    topic_terms = payload.get("topic_terms")
+    if topic_terms is None:
+        topic_terms = term_set(" ".join(topic_labels(payload)))
+
+    return lex_terms, topic_terms
+
 
-    points, _ = qdrant.scroll(
-        collection_name=collection,
-        limit=300,
-        with_payload=True
+@lru_cache(maxsize=4096)
+def _needle_terms(text: str) -> Tuple[str, ...]:
+    # Router topics/keywords come from a small, recurring vocabulary
+    return tuple(term_set(text))
+
+
+def _match_matrix(term_lists: Sequence[Sequence[str]], needles: List[Sequence[str]]) -> np.ndarray:
+    """
+    Bool (candidates, needles): needle j matches candidate i when all of
+    its terms are in term_lists[i]. Needles without terms never match.
+    """
+    vocab = {term: i for i, term in enumerate({t for needle in needles for t in needle})}
+    if not vocab or not term_lists:
+        return np.zeros((len(term_lists), len(needles)), dtype=bool)
+
+    # Needle × vocab incidence
+    incidence = np.zeros((len(needles), len(vocab)), dtype=np.int32)
+    incidence[
+        [j for j, needle in enumerate(needles) for _ in needle],
+        [vocab[t] for needle in needles for t in needle]
+    ] = 1
+
+    # Candidate × vocab presence. Term lists are sorted: a binary search
+    # per needle term, whatever the passage length
+    rows, cols = [], []
+    for i, terms in enumerate(term_lists):
+        for term, col in vocab.items():
+            at = bisect.bisect_left(terms, term)
+            if at < len(terms) and terms[at] == term:
+                rows.append(i)
+                cols.append(col)
+
+    presence = np.zeros((len(term_lists), len(vocab)), dtype=np.int32)
+    presence[rows, cols] = 1
+
+    lengths = np.array([len(needle) for needle in needles])
+    return (presence @ incidence.T == lengths) & (lengths > 0)
+
+
+def rescore(
+    payloads: List[dict],
+    vector_scores: Sequence[float],
+    router_topics: List[str],
+    router_keywords: List[str],
+    config: RetrievalConfig = DEFAULT_CONFIG
+) -> Dict[str, np.ndarray]:
+    """
+    Hybrid score of every candidate at once:
+        vector_weight * vector + topic + min(keywords, cap) + speaker
+    Returns the components and "final_score", aligned with `payloads`.
+    """
+    features = [_lexical_features(p) for p in payloads]
+
+    topic_hit = _match_matrix(
+        [topic_terms for _, topic_terms in features],
+        [_needle_terms(topic) for topic in router_topics]
+    ).any(axis=1)
+    keyword_hits = _match_matrix(
+        [lex_terms for lex_terms, _ in features],
+        [_needle_terms(keyword) for keyword in router_keywords]
+    ).sum(axis=1)
+    speaker = np.array([p.get("speaker") == "Meher Baba" for p in payloads], dtype=bool)
+
+    scores = {
+        "vector_score": np.asarray(vector_scores, dtype=np.float64),
+        "topic_boost": np.where(topic_hit, config.topic_boost, 0.0),
+        # Capped so keywords cannot dominate the vector score
+        "keyword_boost": np.minimum(keyword_hits * config.keyword_boost, config.keyword_boost_cap),
+        "speaker_boost": np.where(speaker, config.speaker_boost, 0.0),
+    }
+    scores["final_score"] = (
+        config.vector_weight * scores["vector_score"]
+        + scores["topic_boost"]
+        + scores["keyword_boost"]
+        + scores["speaker_boost"]
     )
+    return scores
 
-    query_terms = query.lower().split()
-    results: List[dict] = []
 
-    for p in points:
-        payload = p.payload or {}
-        text = payload.get("text", "").lower()
+# =================================================
+# RANK FUSION
+# =================================================
 
-        if any(term in text for term in query_terms):
-            results.append(payload)
+def reciprocal_rank_fusion(rankings: List[List[dict]], k: int = RRF_K) -> List[dict]:
+    """
+    Merge ranked payload lists: each list contributes 1 / (k + rank) per
+    passage, so a passage found by both retrievers rises to the top.
+    """
+    scores: Dict[str, float] = {}
+    payloads: Dict[str, dict] = {}
+
+    for ranking in rankings:
+        for rank, payload in enumerate(ranking, 1):
+            key = payload.get("passage_id") or payload.get("chunk_id")
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+            payloads.setdefault(key, payload)
 
-    return results[:limit]
+    order = sorted(scores, key=scores.get, reverse=True)
+    return [payloads[key] for key in order]
+
+
+# =================================================
+# NEIGHBOUR EXPANSION
+# =================================================
+
+def _merge_passages(passages: List[dict]) -> str:
+    """
+    Stitch consecutive passages of one chunk back together.
+    Passages are exact slices of the parent text, so the overlap is
+    dropped using their character offsets.
+    """
+    passages = sorted(passages, key=lambda p: p.get("char_start", 0))
+
+    text = passages[0].get("text", "")
+    end = passages[0].get("char_end", len(text))
+
+    for p in passages[1:]:
+        p_text = p.get("text", "")
+        p_start = p.get("char_start", end)
+        p_end = p.get("char_end", p_start + len(p_text))
+
+        if p_end <= end:
+            continue
+
+        if p_start < end:
+            text += p_text[end - p_start:]
+        else:
+            text += " " + p_text
+
+        end = p_end
+
+    return text
+
+
+async def expand_with_neighbors(collection: str, hit: dict, neighbors: int) -> dict:
+    """
+    Return the passage hit widened by up to `neighbors` passages on each
+    side, taken from the same parent chunk.
+    """
+    if neighbors <= 0 or "passage_index" not in hit:
+        return hit
+
+    index = hit["passage_index"]
+
+    window = await get_vector_store().passage_window(
+        collection,
+        hit["chunk_id"],
+        index - neighbors,
+        index + neighbors
+    ) or [hit]
+    if not any(p.get("passage_index") == index for p in window):
+        window.append(hit)
+
+    window.sort(key=lambda p: p.get("passage_index", 0))
+
+    expanded = dict(hit)
+    expanded["char_start"] = window[0].get("char_start")
+    expanded["char_end"] = window[-1].get("char_end")
+    if all("text" in p for p in window):
+        expanded["text"] = _merge_passages(window)
+    else:
+        # Hydrated from the docstore as one slice of the chunk
+        expanded.pop("text", None)
+    expanded["passage_window"] = [
+        window[0].get("passage_index"),
+        window[-1].get("passage_index")
+    ]
+
+    return expanded
+
+
+async def _hydrate(collection: str, payloads: List[dict]) -> List[dict]:
+    """
+    hydrate() off the event loop: block reads and decompression run on
+    the default executor, leaving the embedding threads to the model.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, hydrate, collection, payloads)
+
+
+async def _select_hits(
+    collection: str,
+    ranked: List[dict],
+    top_k: int,
+    neighbors: int
+) -> List[dict]:
+    """
+    Take the best passages, skipping any passage that is already covered
+    by the expanded window of a better-ranked hit from the same chunk.
+    Only these hits get their text from the docstore.
+    """
+    covered: Dict[str, List[range]] = {}
+    selected: List[dict] = []
+
+    for payload in ranked:
+        if len(selected) >= top_k:
+            break
+
+        chunk_id = payload.get("chunk_id")
+        index = payload.get("passage_index")
+
+        if index is not None and any(
+            index in window for window in covered.get(chunk_id, [])
+        ):
+            continue
+
+        hit = await expand_with_neighbors(collection, payload, neighbors)
+        selected.append(hit)
+
+        if index is not None:
+            first, last = hit.get("passage_window", [index, index])
+            covered.setdefault(chunk_id, []).append(range(first, last + 1))
+
+    return await _hydrate(collection, selected)
 
 
 # =================================================
 # MAIN HYBRID RETRIEVER
 # =================================================
 
-def retrieve(
+def candidate_count(top_k: int, neighbors: int, config: RetrievalConfig = DEFAULT_CONFIG) -> int:
+    """
+    Vector / BM25 candidates fetched for `top_k` hits.
+    """
+    candidates = max(top_k * 3, top_k + 2 * neighbors)
+    if config.rerank:
+        # Cheap stages over-fetch; the cross-encoder picks from the pool
+        candidates = max(candidates, config.rerank_candidates)
+    return candidates
+
+
+async def retrieve(
     book: str,
     query: str,
     router_topics: Optional[List[str]] = None,
     router_keywords: Optional[List[str]] = None,
     top_k: int = 1,
-    threshold: float = 0.2
+    threshold: float = DEFAULT_THRESHOLD,
+    neighbors: int = 0,
+    config: RetrievalConfig = DEFAULT_CONFIG,
+    timings: Optional[Dict[str, float]] = None,
+    speculation: Optional["SpeculativeRetrieval"] = None
 ) -> List[dict]:
+    """
+    Passage-level hybrid retrieval.
+    Each hit is one passage (pointing back to its parent `chunk_id`),
+    optionally widened with `neighbors` passages on each side.
+    Candidates carry metadata only; passage text is read from the docstore
+    for the rerank pool and the returned hits.
+    If `timings` is given, per-stage durations are written into it
+    (embed_ms, lexical_ms, vector_search_ms, rescore_ms, rerank_ms, select_ms)
+    and observed in the stage histograms.
+    With a `speculation` started before routing, the vector candidates it
+    already fetched for this book are used (see app.retrieval.speculative)
+    instead of embedding and searching again.
+    Per-candidate scores are logged at DEBUG.
+    """
 
     collection = BOOK_COLLECTION_MAP.get(book)
     if not collection:
@@ -77,6 +378,8 @@ def retrieve(
 
     router_topics = router_topics or []
     router_keywords = router_keywords or []
+    timings = {} if timings is None else timings
+    debug = logger.isEnabledFor(logging.DEBUG)
 
     # --------------------------------------------------
     # 1️⃣ QUERY ENRICHMENT
@@ -93,94 +396,97 @@ def retrieve(
             + " ".join(router_keywords)
         )
 
-    print("\n🔎 Enhanced Query Used For Embedding:")
-    print(enhanced_query)
+    if debug:
+        logger.debug("enhanced query", extra={"query": enhanced_query})
+
+    prefetched = await speculation.take(collection, timings) if speculation is not None else None
 
     # Generate embedding
-    vector = embed(enhanced_query)
+    if prefetched is None:
+        t0 = time.perf_counter()
+        vector = await embed_np_async(enhanced_query)
+        _stage(timings, "embed", t0)
+    candidates = candidate_count(top_k, neighbors, config)
+
+    # BM25 over the same passages (in-process, sub-millisecond)
+    t0 = time.perf_counter()
+    lexical = (
+        [payload for _, payload in lexical_search(collection, enhanced_query, limit=candidates)]
+        if config.lexical else []
+    )
+    _stage(timings, "lexical", t0)
 
     try:
-        response = qdrant.query_points(
-            collection_name=collection,
-            query=vector,
-            limit=top_k * 3,
-            score_threshold=threshold,
-            with_payload=True
+        store = get_vector_store()
+        if prefetched is not None:
+            results = prefetched
+        else:
+            t0 = time.perf_counter()
+            results = await store.search(collection, vector, candidates, threshold)
+            _stage(timings, "vector_search", t0)
+
+        t0 = time.perf_counter()
+
+        if debug:
+            logger.debug("vector candidates", extra={"store": store.name, "count": len(results)})
+
+        payloads = [payload for _, payload in results]
+        scores = rescore(
+            payloads,
+            [vector_score for vector_score, _ in results],
+            router_topics,
+            router_keywords,
+            config
         )
+        # Stable, so ties keep the vector store's order
+        order = np.argsort(-scores["final_score"], kind="stable")
+        ranked_payloads = [payloads[i] for i in order]
+
+        if debug:
+            for i in order:
+                logger.debug("candidate", extra={
+                    "chunk_id": payloads[i].get("chunk_id"),
+                    "passage": payloads[i].get("passage_index"),
+                    **{name: round(float(values[i]), 4) for name, values in scores.items()},
+                })
+
+        # Fuse with the lexical ranking
+        if lexical:
+            if debug:
+                logger.debug("fused with BM25", extra={"lexical_candidates": len(lexical)})
+            ranked_payloads = reciprocal_rank_fusion([ranked_payloads, lexical], k=config.rrf_k)
+        _stage(timings, "rescore", t0)
+
+        if config.rerank and ranked_payloads:
+            t0 = time.perf_counter()
+            # The cross-encoder reads text: hydrate the pool only
+            pool = await _hydrate(collection, ranked_payloads[:config.rerank_candidates])
+            reranked = await reranker.rerank(query, pool, config.rerank_budget_ms / 1000)
+            if reranked is None:
+                logger.info("rerank over budget, keeping hybrid order",
+                            extra={"candidates": len(pool), "budget_ms": config.rerank_budget_ms})
+                FALLBACKS.labels("rerank_budget").inc()
+            else:
+                ranked_payloads = reranked + ranked_payloads[config.rerank_candidates:]
+            _stage(timings, "rerank", t0)
+
+        t0 = time.perf_counter()
+        hits = await _select_hits(
+            collection,
+            ranked_payloads,
+            top_k,
+            neighbors
+        )
+        _stage(timings, "select", t0)
+
+        if debug:
+            logger.debug("selected", extra={
+                "hits": [f"{h.get('chunk_id')}#{h.get('passage_index')}" for h in hits]
+            })
 
-        results = response.points
-        ranked = []
-
-        print("\n📦 RAW RESULTS FROM QDRANT:")
-        print(f"Total returned: {len(results)}\n")
-
-        for r in results:
-            payload = r.payload or {}
-
-            # -------------------------
-            # 2️⃣ BASE VECTOR SCORE
-            # -------------------------
-            vector_score = r.score
-
-            # -------------------------
-            # 3️⃣ METADATA BOOSTING
-            # -------------------------
-            topic_boost = 0.0
-            keyword_boost = 0.0
-            speaker_boost = 0.0
-
-            payload_topic = payload.get("topic", "").lower()
-            text = payload.get("text", "").lower()
-
-            # Topic boost (small)
-            for topic in router_topics:
-                if topic.lower() in payload_topic:
-                    topic_boost = 0.10
-
-            # Keyword boost (very small per match)
-            for keyword in router_keywords:
-                if keyword.lower() in text:
-                    keyword_boost += 0.05
-
-            # Cap keyword boost (prevents domination)
-            keyword_boost = min(keyword_boost, 0.15)
-
-            # Speaker boost (tiny)
-            if payload.get("speaker") == "Meher Baba":
-                speaker_boost = 0.05
-
-            # -------------------------
-            # 4️⃣ FINAL HYBRID SCORE
-            # -------------------------
-            final_score = (
-                0.8 * vector_score
-                + topic_boost
-                + keyword_boost
-                + speaker_boost
-            )
-
-            # Debug print
-            print("--------------------------------------------------")
-            print("Vector Score:", round(vector_score, 4))
-            print("Topic Boost:", topic_boost)
-            print("Keyword Boost:", keyword_boost)
-            print("Speaker Boost:", speaker_boost)
-            print("Final Score:", round(final_score, 4))
-            print("Chunk ID:", payload.get("chunk_id"))
-            print("Preview:", payload.get("text", "")[:200], "...")
-            print("--------------------------------------------------\n")
-
-            ranked.append((final_score, payload))
-
-        # Sort by final score
-        ranked.sort(key=lambda x: x[0], reverse=True)
-
-        print("\n🏆 FINAL TOP RANKED CHUNKS:")
-        for i, (score, payload) in enumerate(ranked[:top_k], 1):
-            print(f"{i}. {payload.get('chunk_id')} | Score: {round(score, 4)}")
-
-        return [payload for _, payload in ranked[:top_k]]
+        return hits
 
     except Exception as e:
-        print("⚠️ Vector search failed, using keyword fallback:", e)
-        return keyword_fallback(book, query, limit=top_k)
+        logger.warning("vector search failed, using BM25 fallback: %s", e)
+        FALLBACKS.labels("retrieval_bm25").inc()
+        return await _hydrate(collection, lexical[:top_k])
@@ -0,0 +1,267 @@
+import hashlib
+import json
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.config import INGEST_BATCH_SIZE, SENTENCE_DIR
+
+INDEX_VERSION = 1
+
+# Sentences shorter than this are merged into the next one ("Yes.", "1.",
+# headings), longer ones are cut at a word boundary
+MIN_SENTENCE_CHARS = 40
+MAX_SENTENCE_CHARS = 600
+
+
+# =================================================
+# SPLITTING
+# =================================================
+
+# End of sentence: . ! ? (optionally followed by a closing quote or
+# bracket) then whitespace, or a blank line
+_BOUNDARY = re.compile(r"(?<=[.!?])([\"”’')\]]*)\s+|\n\s*\n")
+
+
+def split_sentences(text: str) -> List[Tuple[int, int]]:
+    """
+    (start, end) character spans of the sentences of `text`, with
+    surrounding whitespace excluded. Spans are slices of the original text,
+    so quoting them keeps the exact wording.
+    """
+    spans: List[Tuple[int, int]] = []
+    start = 0
+
+    def add(a: int, b: int):
+        while a < b and text[a].isspace():
+            a += 1
+        while b > a and text[b - 1].isspace():
+            b -= 1
+        if a >= b:
+            return
+        # Merge fragments into the previous sentence when that keeps it
+        # within bounds, otherwise into the next one
+        if spans and (b - a < MIN_SENTENCE_CHARS or spans[-1][1] - spans[-1][0] < MIN_SENTENCE_CHARS) \
+                and b - spans[-1][0] <= MAX_SENTENCE_CHARS:
+            spans[-1] = (spans[-1][0], b)
+            return
+        while b - a > MAX_SENTENCE_CHARS:
+            cut = text.rfind(" ", a, a + MAX_SENTENCE_CHARS)
+            cut = cut if cut > a else a + MAX_SENTENCE_CHARS
+            spans.append((a, cut))
+            a = cut
+            while a < b and text[a].isspace():
+                a += 1
+        if a < b:
+            spans.append((a, b))
+
+    for match in _BOUNDARY.finditer(text):
+        # Closing quotes and brackets stay with their sentence
+        add(start, match.end(1) if match.group(1) is not None else match.start())
+        start = match.end()
+    add(start, len(text))
+
+    return spans
+
+
+def _chunk_digest(text: str, fingerprint: str) -> str:
+    # Splitting rules are versioned with the index, so a change re-splits
+    raw = f"{INDEX_VERSION}\n{fingerprint}\n{text}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+# =================================================
+# INDEX
+# =================================================
+
+class SentenceIndex:
+    """
+    Sentence spans of every chunk of a collection and their embeddings
+    (normalized, float16), used to pick the most query-relevant sentences
+    of the retrieved passages for the prompt.
+
+    Sentences of chunk k are rows chunk_offsets[k] : chunk_offsets[k+1],
+    in text order.
+    """
+
+    def __init__(self, chunk_ids: List[str], digests: List[str], arrays: Dict[str, np.ndarray], meta: Dict):
+        self.chunk_ids = chunk_ids
+        self.digests = digests
+        self.meta = meta
+        self.chunk_row = {cid: k for k, cid in enumerate(chunk_ids)}
+
+        self.chunk_offsets = arrays["chunk_offsets"]
+        self.starts = arrays["starts"]
+        self.ends = arrays["ends"]
+        self.vectors = arrays["vectors"]
+
+    def rows(self, chunk_id: str, start: int, end: int) -> np.ndarray:
+        """
+        Rows of the sentences that lie inside [start, end) of the chunk.
+        """
+        k = self.chunk_row.get(chunk_id)
+        if k is None:
+            return np.zeros(0, dtype=np.int64)
+
+        lo, hi = int(self.chunk_offsets[k]), int(self.chunk_offsets[k + 1])
+        inside = (self.starts[lo:hi] >= start) & (self.ends[lo:hi] <= end)
+        return lo + np.flatnonzero(inside)
+
+    # ---------- persistence ----------
+    def save(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        header = json.dumps({
+            "meta": self.meta,
+            "chunk_ids": self.chunk_ids,
+            "digests": self.digests,
+        }, ensure_ascii=False)
+
+        tmp = path.with_suffix(".tmp.npz")
+        np.savez(
+            tmp,
+            header=np.frombuffer(header.encode("utf-8"), dtype=np.uint8),
+            chunk_offsets=self.chunk_offsets,
+            starts=self.starts,
+            ends=self.ends,
+            vectors=self.vectors,
+        )
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, path: Path) -> "SentenceIndex":
+        with np.load(path, allow_pickle=False) as data:
+            arrays = {k: data[k] for k in data.files}
+
+        header = json.loads(arrays.pop("header").tobytes().decode("utf-8"))
+        return cls(header["chunk_ids"], header["digests"], arrays, header["meta"])
+
+
+# =================================================
+# FILES / BUILD
+# =================================================
+
+def sentence_index_path(collection_name: str) -> Path:
+    return SENTENCE_DIR / f"{collection_name}.sentences.npz"
+
+
+def build_sentence_index(
+    collection_name: str,
+    chunks: Iterable[Dict],
+    embedder,
+    batch_size: int = INGEST_BATCH_SIZE,
+) -> SentenceIndex:
+    """
+    Split and embed every chunk (same first-wins handling of repeated
+    chunk IDs as the other indexes). Sentences of chunks whose text and
+    model settings did not change are copied from the previous build.
+    """
+    from app.ingestion.manifest import vector_fingerprint
+
+    t0 = time.perf_counter()
+    fingerprint = vector_fingerprint()
+
+    unique: Dict[str, str] = {}
+    for chunk in chunks:
+        if chunk.get("id") and chunk.get("text"):
+            unique.setdefault(chunk["id"], chunk["text"])
+
+    previous = get_sentence_index(collection_name)
+    old = {}
+    if previous is not None:
+        old = {d: k for k, d in enumerate(previous.digests)}
+
+    chunk_ids: List[str] = []
+    digests: List[str] = []
+    offsets = [0]
+    starts: List[int] = []
+    ends: List[int] = []
+    parts: List[np.ndarray] = []
+    to_encode: List[Tuple[int, str]] = []   # (row, sentence)
+
+    for chunk_id, text in unique.items():
+        digest = _chunk_digest(text, fingerprint)
+        k = old.get(digest)
+
+        if k is not None:
+            lo, hi = int(previous.chunk_offsets[k]), int(previous.chunk_offsets[k + 1])
+            spans = list(zip(previous.starts[lo:hi].tolist(), previous.ends[lo:hi].tolist()))
+            parts.append(previous.vectors[lo:hi])
+        else:
+            spans = split_sentences(text)
+            row = offsets[-1]
+            to_encode.extend((row + i, text[a:b]) for i, (a, b) in enumerate(spans))
+            parts.append(None)
+
+        chunk_ids.append(chunk_id)
+        digests.append(digest)
+        starts.extend(a for a, _ in spans)
+        ends.extend(b for _, b in spans)
+        offsets.append(offsets[-1] + len(spans))
+
+    dim = embedder.get_sentence_embedding_dimension()
+    vectors = np.zeros((offsets[-1], dim), dtype=np.float16)
+    for k, part in enumerate(parts):
+        if part is not None:
+            vectors[offsets[k]:offsets[k + 1]] = part
+
+    for i in range(0, len(to_encode), batch_size):
+        batch = to_encode[i:i + batch_size]
+        vectors[[row for row, _ in batch]] = embedder.encode(
+            [sentence for _, sentence in batch],
+            batch_size=batch_size,
+            normalize_embeddings=True,
+            convert_to_numpy=True,
+            show_progress_bar=False
+        )
+
+    arrays = {
+        "chunk_offsets": np.asarray(offsets, dtype=np.int64),
+        "starts": np.asarray(starts, dtype=np.int32),
+        "ends": np.asarray(ends, dtype=np.int32),
+        "vectors": vectors,
+    }
+    meta = {
+        "version": INDEX_VERSION,
+        "chunks": len(chunk_ids),
+        "sentences": int(offsets[-1]),
+        "encoded": len(to_encode),
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }
+    index = SentenceIndex(chunk_ids, digests, arrays, meta)
+    index.save(sentence_index_path(collection_name))
+
+    print(f"✂️ Sentence index: {meta['sentences']} sentences from {meta['chunks']} chunks "
+          f"({meta['encoded']} encoded) in {time.perf_counter() - t0:.2f} s "
+          f"→ {sentence_index_path(collection_name)}")
+    return index
+
+
+_indexes: Dict[str, Tuple[int, SentenceIndex]] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_sentence_index(collection_name: str) -> Optional[SentenceIndex]:
+    """
+    Loaded on first use and reloaded when the file is rebuilt
+    (mtime check, one stat call). None if the index was never built.
+    """
+    path = sentence_index_path(collection_name)
+    try:
+        mtime = path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+    cached = _indexes.get(collection_name)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    with _indexes_lock:
+        cached = _indexes.get(collection_name)
+        if cached is None or cached[0] != mtime:
+            cached = (mtime, SentenceIndex.load(path))
+            _indexes[collection_name] = cached
+        return cached[1]
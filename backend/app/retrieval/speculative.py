@@ -0,0 +1,181 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.config import RETRIEVAL_TOP_K, RETRIEVAL_NEIGHBORS, SPECULATIVE_OVERFETCH
+from app.metrics import SPECULATIVE_SEARCHES, observe_stage
+from app.retrieval.embedding import embed_np_async
+from app.retrieval.retriever import (
+    BOOK_COLLECTION_MAP,
+    DEFAULT_CONFIG,
+    DEFAULT_THRESHOLD,
+    RetrievalConfig,
+    candidate_count,
+)
+from app.retrieval.stores import get_vector_store
+
+logger = logging.getLogger(__name__)
+
+
+# =================================================
+# STATS
+# =================================================
+
+class SpeculationStats:
+    """
+    Process-wide counters behind GET /stats/speculative.
+    searches_per_request is the extra vector store load: 1.0 would be
+    the sequential path.
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.searches = 0
+        self.used = 0
+        self.discarded = 0
+        self.cancelled = 0
+        self.failed = 0
+        self.saved: deque = deque(maxlen=2000)
+
+    def record(self, outcome: str):
+        setattr(self, outcome, getattr(self, outcome) + 1)
+        SPECULATIVE_SEARCHES.labels(outcome).inc()
+
+    def as_dict(self) -> Dict:
+        saved = list(self.saved)
+        return {
+            "requests": self.requests,
+            "searches": self.searches,
+            "searches_per_request": round(self.searches / self.requests, 3) if self.requests else None,
+            "used": self.used,
+            "discarded": self.discarded,
+            "cancelled": self.cancelled,
+            "failed": self.failed,
+            "saved_p50_ms": round(float(np.percentile(saved, 50)), 1) if saved else None,
+            "saved_mean_ms": round(float(np.mean(saved)), 1) if saved else None,
+        }
+
+
+speculation_stats = SpeculationStats()
+
+
+# =================================================
+# SPECULATIVE RETRIEVAL
+# =================================================
+
+class SpeculativeRetrieval:
+    """
+    Vector search of every book, started before the router has decided.
+
+    The raw question is embedded once and each book's collection is
+    searched concurrently while routing runs. retrieve() then takes the
+    candidates of the routed book and applies the router's topic/keyword
+    rescoring and BM25 fusion to them as usual; searches of the other books
+    are cancelled (still running) or discarded (finished).
+
+    The question is embedded without the router's topics/keywords, which
+    are not known yet, so SPECULATIVE_OVERFETCH times the usual candidates
+    are fetched to give the rescoring the same room to reorder.
+    """
+
+    def __init__(
+        self,
+        question: str,
+        top_k: int = RETRIEVAL_TOP_K,
+        neighbors: int = RETRIEVAL_NEIGHBORS,
+        threshold: float = DEFAULT_THRESHOLD,
+        config: RetrievalConfig = DEFAULT_CONFIG,
+        overfetch: float = SPECULATIVE_OVERFETCH,
+        collections: Optional[List[str]] = None,
+    ):
+        self.question = question
+        self.threshold = threshold
+        self.candidates = max(1, int(candidate_count(top_k, neighbors, config) * overfetch))
+        self.embed_seconds: Optional[float] = None
+        self._taken = False
+
+        speculation_stats.requests += 1
+
+        self._embed = asyncio.ensure_future(self._embed_question())
+        self._searches: Dict[str, asyncio.Future] = {
+            collection: asyncio.ensure_future(self._search(collection))
+            for collection in (collections or list(BOOK_COLLECTION_MAP.values()))
+        }
+
+    async def _embed_question(self) -> np.ndarray:
+        t0 = time.perf_counter()
+        vector = await embed_np_async(self.question)
+        self.embed_seconds = time.perf_counter() - t0
+        observe_stage("embed", self.embed_seconds)
+        return vector
+
+    async def _search(self, collection: str) -> Tuple[list, float]:
+        # Shielded: cancelling one book's search must not cancel the
+        # embedding the others are waiting on
+        vector = await asyncio.shield(self._embed)
+
+        speculation_stats.searches += 1
+        t0 = time.perf_counter()
+        results = await get_vector_store().search(collection, vector, self.candidates, self.threshold)
+        seconds = time.perf_counter() - t0
+        observe_stage("vector_search", seconds)
+        return results, seconds
+
+    async def take(self, collection: str, timings: Optional[Dict] = None) -> Optional[list]:
+        """
+        Vector candidates of `collection` as the store returned them, or
+        None when that search failed (the caller then searches itself).
+        All other searches are dropped.
+        """
+        task = self._searches.pop(collection, None)
+        self._taken = True
+        self.cancel()
+        if task is None:
+            return None
+
+        t0 = time.perf_counter()
+        try:
+            results, search_seconds = await task
+        except Exception as e:
+            logger.warning("speculative search failed, searching again: %s", e,
+                           extra={"collection": collection})
+            speculation_stats.record("failed")
+            return None
+        wait = time.perf_counter() - t0
+        observe_stage("speculation_wait", wait)
+
+        speculation_stats.record("used")
+
+        # The embed + search time the sequential path would have spent
+        # after routing, minus what this request still had to wait
+        saved = (self.embed_seconds or 0.0) + search_seconds - wait
+        speculation_stats.saved.append(saved * 1000)
+
+        if timings is not None:
+            timings["speculative"] = True
+            timings["embed_ms"] = round((self.embed_seconds or 0.0) * 1000, 3)
+            timings["vector_search_ms"] = round(search_seconds * 1000, 3)
+            timings["speculation_wait_ms"] = round(wait * 1000, 3)
+            timings["speculation_saved_ms"] = round(saved * 1000, 3)
+        return results
+
+    def cancel(self):
+        """
+        Drop every search not taken (routing failed, or another book won).
+        Safe to call more than once.
+        """
+        for task in self._searches.values():
+            if task.done():
+                if not task.cancelled() and task.exception() is None:
+                    speculation_stats.record("discarded")
+            else:
+                task.cancel()
+                speculation_stats.record("cancelled")
+        self._searches.clear()
+
+        if not self._taken and not self._embed.done():
+            self._embed.cancel()
@@ -0,0 +1,316 @@
+import json
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.config import QDRANT_HOST, QDRANT_PORT, VECTOR_STORE, EMBEDDED_DIR
+
+# (score, payload) pairs, best first
+Hits = List[Tuple[float, dict]]
+
+
+# =================================================
+# QDRANT
+# =================================================
+
+class QdrantStore:
+    """
+    Qdrant server (HNSW). The client and qdrant_client itself are created
+    on first use, so importing the retriever stays cheap.
+    """
+
+    name = "qdrant"
+
+    def __init__(self, host: str = QDRANT_HOST, port: int = QDRANT_PORT):
+        self.host = host
+        self.port = port
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    from qdrant_client import AsyncQdrantClient
+                    self._client = AsyncQdrantClient(host=self.host, port=self.port)
+        return self._client
+
+    async def search(self, collection: str, vector: np.ndarray, limit: int, score_threshold: float) -> Hits:
+        from app.ingestion.collection_profiles import search_params
+
+        response = await self.client.query_points(
+            collection_name=collection,
+            query=vector,
+            limit=limit,
+            score_threshold=score_threshold,
+            search_params=search_params(collection),
+            with_payload=True
+        )
+        return [(r.score, r.payload or {}) for r in response.points]
+
+    async def passage_window(self, collection: str, chunk_id: str, first: int, last: int) -> List[dict]:
+        from qdrant_client.models import FieldCondition, Filter, MatchValue, Range
+
+        points, _ = await self.client.scroll(
+            collection_name=collection,
+            scroll_filter=Filter(must=[
+                FieldCondition(key="chunk_id", match=MatchValue(value=chunk_id)),
+                FieldCondition(key="passage_index", range=Range(gte=first, lte=last)),
+            ]),
+            limit=last - first + 1,
+            with_payload=True
+        )
+        return [p.payload for p in points if p.payload]
+
+    async def ping(self) -> Dict:
+        response = await self.client.get_collections()
+        return {"collections": sorted(c.name for c in response.collections)}
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+
+# =================================================
+# EMBEDDED (in-process, exact)
+# =================================================
+# One directory per collection, one subdirectory per build:
+#   CURRENT          name of the live build directory
+#   v<ns>/vectors.npy    (rows, dim) float16/float32, normalized, memory-mapped
+#   v<ns>/payloads.jsonl one JSON payload per line, read on demand
+#   v<ns>/table.json     row → passage_id, chunk_id, passage_index, text
+#                        hash, payload byte offset/length
+# A build is written in full before CURRENT is atomically replaced to point
+# at it, so a reader always gets the table, vectors and payloads of one
+# build. Collections written before builds were versioned keep their files
+# directly in the collection directory and are read from there.
+
+CURRENT = "CURRENT"
+_LEGACY_FILES = ("table.json", "vectors.npy", "payloads.jsonl")
+
+
+def current_build_path(collection_dir: Path) -> Optional[Path]:
+    """
+    Directory of the live build of a collection, or None when not built.
+    """
+    try:
+        name = (collection_dir / CURRENT).read_text(encoding="utf-8").strip()
+        return collection_dir / name
+    except FileNotFoundError:
+        if (collection_dir / "table.json").exists():
+            return collection_dir
+        return None
+
+
+class EmbeddedCollection:
+    def __init__(self, path: Path):
+        self._payload_fd = None
+        with open(path / "table.json", "r", encoding="utf-8") as f:
+            table = json.load(f)
+
+        self.path = path
+        self.dtype = table["dtype"]
+        self.rows: List[Dict] = table["rows"]
+        self.vectors = np.load(path / "vectors.npy", mmap_mode="r")
+        self._payload_fd = os.open(path / "payloads.jsonl", os.O_RDONLY)
+
+        # chunk_id → {passage_index: row}, for neighbour windows
+        self.by_chunk: Dict[str, Dict[int, int]] = {}
+        for i, row in enumerate(self.rows):
+            self.by_chunk.setdefault(row["chunk_id"], {})[row["passage_index"]] = i
+
+    def payload(self, row: int) -> dict:
+        entry = self.rows[row]
+        raw = os.pread(self._payload_fd, entry["length"], entry["offset"])
+        return json.loads(raw)
+
+    def scores(self, vector: np.ndarray) -> np.ndarray:
+        if self.vectors.dtype == np.float32:
+            return self.vectors @ vector
+        # float16 has no BLAS path; upcast block-wise to keep memory flat
+        out = np.empty(len(self.vectors), dtype=np.float32)
+        for start in range(0, len(self.vectors), 4096):
+            block = self.vectors[start:start + 4096].astype(np.float32)
+            out[start:start + 4096] = block @ vector
+        return out
+
+    def close(self):
+        if self._payload_fd is not None:
+            os.close(self._payload_fd)
+            self._payload_fd = None
+
+    # A replaced collection may still be in use by a running search, so
+    # its file descriptor is released when the object goes away
+    __del__ = close
+
+
+class EmbeddedStore:
+    """
+    Exact dot-product search over a memory-mapped matrix per collection.
+    Only the payloads of returned rows are read from disk. Collections are
+    opened on first use and reopened when CURRENT points at a new build.
+    """
+
+    name = "embedded"
+
+    def __init__(self, root: Path = EMBEDDED_DIR):
+        self.root = root
+        self._collections: Dict[str, Tuple[Path, EmbeddedCollection]] = {}
+        self._lock = threading.Lock()
+
+    def collection(self, name: str) -> EmbeddedCollection:
+        path = current_build_path(self.root / name)
+        if path is None:
+            raise RuntimeError(f"Embedded collection {name!r} not built ({self.root / name})")
+
+        cached = self._collections.get(name)
+        if cached is not None and cached[0] == path:
+            return cached[1]
+
+        with self._lock:
+            cached = self._collections.get(name)
+            if cached is None or cached[0] != path:
+                cached = (path, EmbeddedCollection(path))
+                self._collections[name] = cached
+            return cached[1]
+
+    async def search(self, collection: str, vector: np.ndarray, limit: int, score_threshold: float) -> Hits:
+        coll = self.collection(collection)
+        scores = coll.scores(np.asarray(vector, dtype=np.float32))
+
+        candidates = np.flatnonzero(scores >= score_threshold)
+        if len(candidates) > limit:
+            candidates = candidates[np.argpartition(-scores[candidates], limit - 1)[:limit]]
+        order = candidates[np.argsort(-scores[candidates], kind="stable")]
+
+        return [(float(scores[row]), coll.payload(int(row))) for row in order]
+
+    async def passage_window(self, collection: str, chunk_id: str, first: int, last: int) -> List[dict]:
+        coll = self.collection(collection)
+        rows = coll.by_chunk.get(chunk_id, {})
+        return [coll.payload(rows[i]) for i in range(first, last + 1) if i in rows]
+
+    async def ping(self) -> Dict:
+        from app.retrieval.retriever import BOOK_COLLECTION_MAP
+
+        return {
+            "collections": {
+                name: len(self.collection(name).rows)
+                for name in BOOK_COLLECTION_MAP.values()
+            }
+        }
+
+    async def close(self):
+        with self._lock:
+            for _, coll in self._collections.values():
+                coll.close()
+            self._collections.clear()
+
+
+def write_embedded_collection(
+    collection: str,
+    vectors: np.ndarray,
+    payloads: Sequence[dict],
+    text_hashes: Sequence[str],
+    dtype: str = "float32",
+    root: Path = EMBEDDED_DIR,
+):
+    """
+    Replace the on-disk collection: the new build goes into its own
+    directory, then CURRENT is switched to it in one rename.
+
+    The previous build is kept, since a reader may have just resolved
+    CURRENT to it; older ones are removed (open files and memory maps stay
+    valid after the unlink).
+    """
+    collection_dir = root / collection
+    collection_dir.mkdir(parents=True, exist_ok=True)
+    previous = current_build_path(collection_dir)
+
+    path = collection_dir / f"v{time.time_ns()}"
+    path.mkdir()
+
+    rows = []
+    offset = 0
+    with open(path / "payloads.jsonl", "wb") as f:
+        for payload, text_hash in zip(payloads, text_hashes):
+            raw = json.dumps(payload, ensure_ascii=False).encode("utf-8") + b"\n"
+            f.write(raw)
+            rows.append({
+                "passage_id": payload["passage_id"],
+                "chunk_id": payload["chunk_id"],
+                "passage_index": payload["passage_index"],
+                "text_hash": text_hash,
+                "offset": offset,
+                "length": len(raw),
+            })
+            offset += len(raw)
+
+    with open(path / "vectors.npy", "wb") as f:
+        np.save(f, np.ascontiguousarray(vectors, dtype=dtype))
+
+    with open(path / "table.json", "w", encoding="utf-8") as f:
+        json.dump({"dtype": dtype, "dim": int(vectors.shape[1]), "rows": rows}, f)
+
+    tmp = collection_dir / f"{CURRENT}.tmp"
+    tmp.write_text(path.name, encoding="utf-8")
+    os.replace(tmp, collection_dir / CURRENT)
+
+    keep = {path, previous}
+    for old in collection_dir.glob("v*"):
+        if old.is_dir() and old not in keep:
+            shutil.rmtree(old, ignore_errors=True)
+    if previous != collection_dir:
+        for name in _LEGACY_FILES:
+            (collection_dir / name).unlink(missing_ok=True)
+
+
+def load_embedded_table(collection: str, root: Path = EMBEDDED_DIR) -> Optional[Tuple[List[Dict], np.ndarray]]:
+    """
+    Existing rows and vectors (for reuse when rebuilding), or None.
+    """
+    path = current_build_path(root / collection)
+    if path is None:
+        return None
+
+    with open(path / "table.json", "r", encoding="utf-8") as f:
+        rows = json.load(f)["rows"]
+    return rows, np.load(path / "vectors.npy", mmap_mode="r")
+
+
+# =================================================
+# SELECTION
+# =================================================
+
+STORES = {"qdrant": QdrantStore, "embedded": EmbeddedStore}
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_vector_store():
+    global _store
+
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                if VECTOR_STORE not in STORES:
+                    raise ValueError(f"Unknown VECTOR_STORE {VECTOR_STORE!r}, expected one of {list(STORES)}")
+                _store = STORES[VECTOR_STORE]()
+
+    return _store
+
+
+async def close_vector_store():
+    global _store
+
+    if _store is not None:
+        await _store.close()
+        _store = None
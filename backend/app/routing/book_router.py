@@ -1,16 +1,30 @@
 # backend/app/routing/book_router.py
 
+import asyncio
+import json
+import logging
 import os
-from typing import Optional
-from google import genai
+import threading
+import time
+from typing import Optional, Tuple
 
 from app.config import (
     LOCAL_LLM_ENABLED,
     GEMINI_ENABLED,
-    OLLAMA_URL,
     OLLAMA_MODEL,
+    OLLAMA_ROUTER_TIMEOUT_SECONDS,
     GEMINI_MODEL,
+    ROUTER_CACHE_ENABLED,
+    ROUTER_CACHE_PATH,
+    ROUTER_CACHE_MAX_ENTRIES,
+    ROUTER_CACHE_TTL_SECONDS,
+    FAST_ROUTER_ENABLED,
 )
+from app.metrics import FALLBACKS, ROUTER_DECISIONS, ROUTER_JSON_FAILURES, observe_ollama, observe_stage
+from app.routing.fast_router import get_fast_router
+from app.routing.router_cache import RouterCache, router_fingerprint
+
+logger = logging.getLogger(__name__)
 
 # Models (override from env if you want)
 # OPENAI_ROUTER_MODEL = os.getenv("OPENAI_ROUTER_MODEL", "gpt-4o-mini")
@@ -154,39 +168,23 @@ give only the JSON as output, no explanations, no extra text.
 stictly follow the format, and ensure the output is valid JSON.
 """
 
-import os
-from typing import Optional
-import requests
-from google import genai
+from app.llm import gemini
+from app.llm.ollama import ollama
 # -------------------------------------------------
 # LOCAL OLLAMA CALL
 # -------------------------------------------------
 
-import requests
-
-def call_ollama(user_prompt: str) -> str:
-    payload = {
-        "model": OLLAMA_MODEL,      # use your installed model
-        "messages": [
+async def call_ollama(user_prompt: str) -> str:
+    data = await ollama.chat(
+        [
             {"role": "system", "content": SYSTEM_MESSAGE},
             {"role": "user", "content": user_prompt}
         ],
-        "temperature": 0.0,
-        "stream": False
-    }
-
-    print("📡 Sending request to local Ollama router...")
-
-    r = requests.post(
-        OLLAMA_URL,   # ✅ FIXED ENDPOINT
-        json=payload,
-        timeout=180
+        timeout_seconds=OLLAMA_ROUTER_TIMEOUT_SECONDS,
+        temperature=0.0
     )
 
-    r.raise_for_status()
-
-    data = r.json()
-
+    observe_ollama("router", data)
     return data["message"]["content"].strip()
 
 
@@ -194,19 +192,12 @@ def call_ollama(user_prompt: str) -> str:
 # GEMINI CALL
 # -------------------------------------------------
 
-def call_gemini(prompt: str) -> str:
+async def call_gemini(prompt: str) -> str:
     try:
-        gclient = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
-
-        resp = gclient.models.generate_content(
-            model=GEMINI_MODEL,
-            contents=SYSTEM_MESSAGE + "\n\n" + prompt
-        )
-
-        return (resp.text or "").strip()
+        return await gemini.generate_text(SYSTEM_MESSAGE + "\n\n" + prompt, model=GEMINI_MODEL)
 
     except Exception as e:
-        print("⚠️ Gemini router failed:", e)
+        logger.warning("Gemini router failed: %s", e)
         raise
 
 
@@ -214,23 +205,108 @@ def call_gemini(prompt: str) -> str:
 # FINAL ROUTER
 # -------------------------------------------------
 
-def run_router_llm(question: str) -> str:
+async def run_router_llm(question: str) -> str:
 
     user_prompt = f"User question:\n{question}"
 
     # 1️⃣ Try local first
     if LOCAL_LLM_ENABLED:
         try:
-            print("🟢 Using LOCAL Ollama router")
-            return call_ollama(user_prompt)
-        except Exception:
+            return await call_ollama(user_prompt)
+        except Exception as e:
+            logger.warning("Ollama router failed: %s", e)
             if not GEMINI_ENABLED:
                 raise RuntimeError("Local LLM failed and Gemini disabled.")
 
     # 2️⃣ Fallback to Gemini (if allowed)
     if GEMINI_ENABLED:
-        print("🟡 Using Gemini fallback")
-        return call_gemini(user_prompt)
+        if LOCAL_LLM_ENABLED:
+            FALLBACKS.labels("router_gemini").inc()
+        return await call_gemini(user_prompt)
 
     # 3️⃣ Nothing available
-    raise RuntimeError("No LLM available (local disabled and Gemini disabled).")
\ No newline at end of file
+    raise RuntimeError("No LLM available (local disabled and Gemini disabled).")
+
+
+# -------------------------------------------------
+# CACHED ROUTING DECISION
+# -------------------------------------------------
+
+_router_cache: Optional[RouterCache] = None
+_router_cache_lock = threading.Lock()
+
+
+def get_router_cache() -> Optional[RouterCache]:
+    global _router_cache
+
+    if not ROUTER_CACHE_ENABLED:
+        return None
+
+    if _router_cache is None:
+        with _router_cache_lock:
+            if _router_cache is None:
+                _router_cache = RouterCache(
+                    ROUTER_CACHE_PATH,
+                    fingerprint=router_fingerprint(SYSTEM_MESSAGE, OLLAMA_MODEL),
+                    max_entries=ROUTER_CACHE_MAX_ENTRIES,
+                    ttl_seconds=ROUTER_CACHE_TTL_SECONDS,
+                )
+
+    return _router_cache
+
+
+def flush_router_cache():
+    """
+    Write pending last_used updates and expiry deletions (at shutdown).
+    """
+    if _router_cache is not None:
+        _router_cache.flush()
+
+
+async def get_routing_decision(question: str) -> Tuple[Optional[dict], str]:
+    """
+    Parsed {book, topics, keywords} for the question, plus the raw router
+    output. The decision is None when the router did not return valid JSON.
+    Repeated (normalized) questions are answered from the router cache;
+    otherwise the embedding fast router decides, and only uncertain
+    questions go to the LLM router.
+    """
+    # SQLite reads and writes stay off the event loop (opening the cache
+    # on first use included)
+    cache = await asyncio.to_thread(get_router_cache) if ROUTER_CACHE_ENABLED else None
+
+    if cache is not None:
+        cached = await asyncio.to_thread(cache.get, question)
+        if cached is not None:
+            ROUTER_DECISIONS.labels("cache").inc()
+            return cached, json.dumps(cached)
+
+    if FAST_ROUTER_ENABLED:
+        decision = await get_fast_router().route(question)
+        if decision is not None:
+            ROUTER_DECISIONS.labels("fast").inc()
+            return decision, json.dumps(decision)
+
+    t0 = time.perf_counter()
+    router_response = await run_router_llm(question)
+    latency = time.perf_counter() - t0
+    observe_stage("router_llm", latency)
+    ROUTER_DECISIONS.labels("llm").inc()
+
+    if FAST_ROUTER_ENABLED:
+        get_fast_router().record_llm_latency(latency)
+
+    try:
+        decision = json.loads(router_response)
+    except Exception:
+        decision = None
+
+    if not isinstance(decision, dict):
+        ROUTER_JSON_FAILURES.inc()
+        logger.warning("router returned invalid JSON", extra={"router_output": router_response[:200]})
+        return None, router_response
+
+    if cache is not None and decision.get("book"):
+        await asyncio.to_thread(cache.put, question, decision, latency)
+
+    return decision, router_response
@@ -0,0 +1,233 @@
+import asyncio
+import re
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.config import FAST_ROUTER_MARGIN, FAST_ROUTER_TOPIC_MIN
+from app.retrieval.embedding import EMBED_EXECUTOR, embed_np_async, encode_batch
+from app.routing.prototypes import (
+    BOOK_DESCRIPTIONS,
+    LIFE_ETERNAL_TOPIC_DESCRIPTIONS,
+    load_router_examples,
+    load_supplement_topics,
+)
+
+BOOKS = ["God Speaks", "Life Eternal"]
+
+# Book score = mean of the best few prototype similarities for that book,
+# so one lucky prototype does not decide the route on its own
+TOP_PROTOTYPES_PER_BOOK = 3
+MAX_TOPICS = 3
+MAX_KEYWORDS = 6
+
+_STOPWORDS = {
+    "a", "about", "am", "an", "and", "are", "as", "at", "be", "by", "can",
+    "did", "do", "does", "for", "from", "how", "i", "in", "is", "it", "me",
+    "my", "of", "on", "or", "say", "said", "should", "so", "that", "the",
+    "there", "this", "to", "us", "was", "what", "when", "where", "which",
+    "who", "why", "will", "with", "you", "your", "according", "baba",
+    "meher", "explain", "really", "much", "more", "without", "into",
+}
+
+_WORD = re.compile(r"[a-z][a-z\-']+")
+
+
+def content_words(text: str) -> List[str]:
+    words = []
+    for w in _WORD.findall(text.lower()):
+        if w not in _STOPWORDS and len(w) > 2 and w not in words:
+            words.append(w)
+    return words
+
+
+# =================================================
+# PROTOTYPES
+# =================================================
+
+class Prototype:
+    __slots__ = ("book", "kind", "label", "text")
+
+    def __init__(self, book: str, kind: str, label: Optional[str], text: str):
+        self.book = book
+        self.kind = kind          # "book" | "topic" | "example"
+        self.label = label        # topic label for kind == "topic"
+        self.text = text
+
+
+def build_prototypes() -> List[Prototype]:
+    protos: List[Prototype] = []
+
+    for book, descriptions in BOOK_DESCRIPTIONS.items():
+        for text in descriptions:
+            protos.append(Prototype(book, "book", None, text))
+
+    for topic, description in LIFE_ETERNAL_TOPIC_DESCRIPTIONS.items():
+        label = topic.title()
+        protos.append(Prototype("Life Eternal", "topic", label, f"{label}: {description}"))
+
+    for topic in load_supplement_topics():
+        protos.append(Prototype("God Speaks", "topic", topic, topic))
+
+    for example in load_router_examples():
+        if example.get("book") in BOOKS:
+            protos.append(Prototype(example["book"], "example", None, example["question"]))
+
+    return protos
+
+
+# =================================================
+# FAST ROUTER
+# =================================================
+
+class FastRouter:
+    """
+    Chooses the book by comparing the question embedding with prototype
+    embeddings (book metadata, topic descriptions, labelled examples).
+    Returns None when the margin between the two books is too small, in
+    which case the caller escalates to the LLM router.
+    """
+
+    def __init__(self, margin: float = FAST_ROUTER_MARGIN, topic_min: float = FAST_ROUTER_TOPIC_MIN):
+        self.margin = margin
+        self.topic_min = topic_min
+
+        self.prototypes: List[Prototype] = []
+        self.matrix: Optional[np.ndarray] = None
+        self._book_rows: Dict[str, np.ndarray] = {}
+        self._topic_rows: Dict[str, np.ndarray] = {}
+        self._lock = threading.Lock()
+
+        # Stats
+        self.decisions = 0
+        self.escalations = 0
+        self.fast_latencies: deque = deque(maxlen=2000)
+        self.llm_latencies: deque = deque(maxlen=2000)
+
+    # ---------- build ----------
+    def build(self):
+        with self._lock:
+            if self.matrix is not None:
+                return
+
+            protos = build_prototypes()
+            matrix = encode_batch([p.text for p in protos]).astype(np.float32)
+
+            books = np.array([p.book for p in protos])
+            kinds = np.array([p.kind for p in protos])
+
+            self._book_rows = {b: np.flatnonzero(books == b) for b in BOOKS}
+            self._topic_rows = {
+                b: np.flatnonzero((books == b) & (kinds == "topic")) for b in BOOKS
+            }
+            self.prototypes = protos
+            self.matrix = matrix
+
+    # ---------- scoring ----------
+    def score(self, vector: np.ndarray, exclude: Optional[int] = None) -> Dict:
+        """
+        Book scores, margin and nearest topics for one normalized vector.
+        `exclude` masks one prototype row (leave-one-out evaluation).
+        """
+        self.build()
+
+        sims = self.matrix @ vector
+        if exclude is not None:
+            sims = sims.copy()
+            sims[exclude] = -1.0
+
+        book_scores = {}
+        for book, rows in self._book_rows.items():
+            best = np.sort(sims[rows])[-TOP_PROTOTYPES_PER_BOOK:]
+            book_scores[book] = float(best.mean())
+
+        ranked = sorted(book_scores.items(), key=lambda kv: kv[1], reverse=True)
+        (book, best), (_, second) = ranked[0], ranked[1]
+
+        topic_rows = self._topic_rows[book]
+        order = topic_rows[np.argsort(sims[topic_rows])[::-1]]
+        topics = [
+            self.prototypes[i].label
+            for i in order[:MAX_TOPICS]
+            if sims[i] >= self.topic_min
+        ]
+
+        return {
+            "book": book,
+            "margin": best - second,
+            "book_scores": book_scores,
+            "topics": topics,
+        }
+
+    def decide(self, question: str, vector: np.ndarray) -> Optional[Dict]:
+        scored = self.score(vector)
+        self.decisions += 1
+
+        if scored["margin"] < self.margin:
+            self.escalations += 1
+            return None
+
+        keywords = content_words(question)
+        for topic in scored["topics"]:
+            keywords += [w for w in content_words(topic) if w not in keywords]
+
+        return {
+            "book": scored["book"],
+            "topics": scored["topics"],
+            "keywords": keywords[:MAX_KEYWORDS],
+        }
+
+    async def route(self, question: str) -> Optional[Dict]:
+        """
+        Embedding through the shared (micro-batched) async path, scoring on
+        the embedding executor; the whole call is timed so stats reflect
+        what the request actually waited for.
+        """
+        t0 = time.perf_counter()
+        vector = await embed_np_async(question)
+
+        loop = asyncio.get_running_loop()
+        decision = await loop.run_in_executor(EMBED_EXECUTOR, self.decide, question, vector)
+        self.fast_latencies.append(time.perf_counter() - t0)
+        return decision
+
+    def record_llm_latency(self, seconds: float):
+        self.llm_latencies.append(seconds)
+
+    # ---------- stats ----------
+    def stats(self) -> Dict:
+        def pct(values, q):
+            return round(float(np.percentile(list(values), q)) * 1000, 2) if values else None
+
+        fast = self.decisions - self.escalations
+        llm_p50 = pct(self.llm_latencies, 50)
+        fast_p50 = pct(self.fast_latencies, 50)
+
+        saved_ms = None
+        if llm_p50 is not None and fast_p50 is not None:
+            saved_ms = round(fast * (llm_p50 - fast_p50), 1)
+
+        return {
+            "margin": self.margin,
+            "decisions": self.decisions,
+            "escalations": self.escalations,
+            "escalation_rate": round(self.escalations / self.decisions, 4) if self.decisions else 0.0,
+            "fast_p50_ms": fast_p50,
+            "fast_p95_ms": pct(self.fast_latencies, 95),
+            "llm_p50_ms": llm_p50,
+            "llm_p95_ms": pct(self.llm_latencies, 95),
+            "estimated_saved_ms": saved_ms,
+        }
+
+
+_fast_router: Optional[FastRouter] = None
+
+
+def get_fast_router() -> FastRouter:
+    global _fast_router
+    if _fast_router is None:
+        _fast_router = FastRouter()
+    return _fast_router
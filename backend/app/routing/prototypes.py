@@ -0,0 +1,103 @@
+import json
+from typing import Dict, List
+
+from app.config import DATA_DIR
+
+# =================================================
+# BOOK METADATA
+# =================================================
+# Condensed from the router SYSTEM_MESSAGE metadata.
+
+BOOK_DESCRIPTIONS: Dict[str, List[str]] = {
+    "Life Eternal": [
+        "Direct guidance, spiritual counsel and practical spirituality in Meher Baba's own words.",
+        "Personal suffering and inner pain: why am I suffering, how to face problems and hardship, "
+        "sadness, depression, loneliness.",
+        "Love and devotion: what is real love, how to love God and Baba, love versus attachment.",
+        "Surrender and trust: how to surrender, accepting God's will, stop worrying and trust Baba.",
+        "Prayer: how to pray, does prayer help, prayer versus meditation.",
+        "Happiness and peace: lasting happiness, why worldly pleasures do not satisfy.",
+        "The practical spiritual path: daily practice, how to live as Baba wants, obstacles to progress.",
+        "Following Meher Baba: obedience, honesty, remembrance, what Baba expects from his lovers.",
+        "Morality and right conduct: truthfulness, purity, integrity, living ethically.",
+        "Mind and desires: controlling the mind, anger, lust, greed, fear, ego and temptation.",
+    ],
+    "God Speaks": [
+        "Metaphysical doctrine: the theme of creation and the purpose of the universe.",
+        "Evolution of consciousness through stone, plant, worm, fish, bird, animal and human forms.",
+        "Sanskaras, impressions and the mechanism of reincarnation.",
+        "The seven planes of consciousness, the subtle and mental worlds, involution.",
+        "States of God, God-realization, the Beyond-Beyond state and the initial urge.",
+        "The Avatar, Perfect Masters, the spiritual hierarchy and states of divine consciousness.",
+    ],
+}
+
+# =================================================
+# LIFE ETERNAL TOPICS
+# =================================================
+# Same table as TOPIC_DESCRIPTIONS in data/life.py (that script parses the
+# PDF at import time, so it cannot be imported here).
+
+LIFE_ETERNAL_TOPIC_DESCRIPTIONS: Dict[str, str] = {
+    "AGENTS": "Agents are men and women who work on the inner planes of consciousness for Perfect Masters and the Avatar.",
+    "ANGELS": "Angels are beings who live in the inner planes.",
+    "ARCHANGELS": "Archangels are beings who live between the sixth and seventh plane.",
+    "THE ASTRAL WORLD": "The Astral World is the realm between the Gross and Subtle worlds.",
+    "THE AVATAR": "The Avatar incarnates from time to time and oversees creation.",
+    "CREATION": "How the universe came about.",
+    "DEATH": "What happens when we die.",
+    "DESTINY": "Fate versus free will.",
+    "DIET": "What Meher Baba said about food.",
+    "DREAMS": "Seven kinds of dreams explained by Baba.",
+    "DRUGS": "Teachings on mind-altering substances.",
+    "GOD-REALISATION": "The highest state of consciousness.",
+    "LIBERATION": "Final freedom attained after God-realisation.",
+    "LOVE": "Different kinds of love.",
+    "MEDITATION": "How, when and why to meditate.",
+    "MIRACLES": "Miracles and their spiritual meaning.",
+    "THE PATH": "Journey through the seven planes.",
+    "PERFECTION": "God-realised souls who return to help others.",
+    "PRAYER": "Teachings on prayer.",
+    "SANSKARAS": "Mental impressions binding the soul.",
+    "SPIRITUAL HIERARCHY": "Spiritual governance of creation.",
+    "SURRENDER": "Giving everything to God or to a Perfect Master."
+}
+
+# =================================================
+# GOD SPEAKS SUPPLEMENT TOPICS
+# =================================================
+
+SUPPLEMENT_FILE = DATA_DIR / "god_chunks" / "supplement_topicwise_chunks.json"
+
+
+def load_supplement_topics() -> List[str]:
+    if not SUPPLEMENT_FILE.exists():
+        return []
+
+    with open(SUPPLEMENT_FILE, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    topics = []
+    for raw in data:
+        topic = (raw.get("topic") or "").strip()
+        if topic and topic not in topics:
+            topics.append(topic)
+    return topics
+
+
+# =================================================
+# LABELLED EXAMPLES
+# =================================================
+
+EXAMPLES_FILE = DATA_DIR / "router_examples.json"
+
+
+def load_router_examples() -> List[Dict]:
+    """
+    [{"question": ..., "book": ..., "topics": [...]}, ...]
+    """
+    if not EXAMPLES_FILE.exists():
+        return []
+
+    with open(EXAMPLES_FILE, "r", encoding="utf-8") as f:
+        return json.load(f)
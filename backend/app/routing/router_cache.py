@@ -0,0 +1,207 @@
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from pathlib import Path
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+# =================================================
+# QUESTION NORMALIZATION
+# =================================================
+
+_NON_WORD = re.compile(r"[^\w\s]+")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_question(question: str) -> str:
+    """
+    "Why do I suffer?!" and "  why do i SUFFER " share one cache entry.
+    """
+    text = unicodedata.normalize("NFKC", question).lower()
+    text = _NON_WORD.sub(" ", text)
+    return _SPACES.sub(" ", text).strip()
+
+
+def question_key(question: str) -> str:
+    return hashlib.sha256(normalize_question(question).encode("utf-8")).hexdigest()
+
+
+def router_fingerprint(system_message: str, model: str) -> str:
+    """
+    Entries are only valid for the prompt + model that produced them.
+    """
+    raw = f"{model}\n{system_message}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+
+# =================================================
+# ON-DISK LRU + TTL STORE
+# =================================================
+
+class RouterCache:
+    """
+    Parsed router decisions ({book, topics, keywords}) in SQLite.
+
+    - LRU: when full, the least recently used entries are evicted
+    - TTL: entries older than `ttl_seconds` are treated as misses
+    - Entries written under a different fingerprint (SYSTEM_MESSAGE or
+      OLLAMA_MODEL changed) are dropped when the cache is opened
+
+    Hits do not write: last_used updates and deletions of expired entries
+    are kept in memory and written in one transaction every
+    `flush_every` of them, or with the next put(). Losing them on a crash
+    only makes the LRU order slightly stale.
+    """
+
+    def __init__(self, path: Path, fingerprint: str, max_entries: int, ttl_seconds: float,
+                 flush_every: int = 64):
+        self.path = Path(path)
+        self.fingerprint = fingerprint
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.flush_every = flush_every
+
+        self._touched: Dict[str, float] = {}   # key → last_used not yet written
+        self._expired: set = set()
+
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS decisions (
+                key         TEXT PRIMARY KEY,
+                fingerprint TEXT NOT NULL,
+                decision    TEXT NOT NULL,
+                created     REAL NOT NULL,
+                last_used   REAL NOT NULL,
+                latency     REAL NOT NULL
+            )
+        """)
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS decisions_last_used ON decisions(last_used)"
+        )
+
+        invalidated = self._db.execute(
+            "DELETE FROM decisions WHERE fingerprint != ?", (fingerprint,)
+        ).rowcount
+        self._db.commit()
+
+        if invalidated:
+            logger.info("router cache: dropped %d entries from an older prompt/model", invalidated)
+
+    def get(self, question: str) -> Optional[Dict]:
+        key = question_key(question)
+        now = time.time()
+
+        with self._lock:
+            row = self._db.execute(
+                "SELECT decision, created, latency FROM decisions "
+                "WHERE key = ? AND fingerprint = ?",
+                (key, self.fingerprint)
+            ).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            decision, created, latency = row
+
+            expired = now - created > self.ttl_seconds
+            if expired:
+                self._touched.pop(key, None)
+                self._expired.add(key)
+                self.misses += 1
+            else:
+                self._touched[key] = now
+                self.hits += 1
+                self.saved_seconds += latency
+
+            if len(self._touched) + len(self._expired) >= self.flush_every:
+                self._write_pending()
+                self._db.commit()
+
+            # Decided before the flush above, which empties _expired
+            if expired:
+                return None
+
+        return json.loads(decision)
+
+    def _write_pending(self):
+        if self._touched:
+            self._db.executemany(
+                "UPDATE decisions SET last_used = ? WHERE key = ?",
+                [(last_used, key) for key, last_used in self._touched.items()]
+            )
+            self._touched.clear()
+        if self._expired:
+            self._db.executemany(
+                "DELETE FROM decisions WHERE key = ?", [(key,) for key in self._expired]
+            )
+            self._expired.clear()
+
+    def flush(self):
+        with self._lock:
+            self._write_pending()
+            self._db.commit()
+
+    def put(self, question: str, decision: Dict, latency: float):
+        key = question_key(question)
+        now = time.time()
+
+        with self._lock:
+            # Pending last_used updates first, so eviction sees the real LRU order
+            self._write_pending()
+            self._db.execute(
+                "INSERT OR REPLACE INTO decisions "
+                "(key, fingerprint, decision, created, last_used, latency) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, self.fingerprint, json.dumps(decision), now, now, latency)
+            )
+            self._evict()
+            self._db.commit()
+
+    def _evict(self):
+        count = self._db.execute("SELECT COUNT(*) FROM decisions").fetchone()[0]
+        overflow = count - self.max_entries
+        if overflow > 0:
+            self._db.execute(
+                "DELETE FROM decisions WHERE key IN "
+                "(SELECT key FROM decisions ORDER BY last_used ASC LIMIT ?)",
+                (overflow,)
+            )
+
+    def clear(self):
+        with self._lock:
+            self._touched.clear()
+            self._expired.clear()
+            self._db.execute("DELETE FROM decisions")
+            self._db.commit()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            entries = self._db.execute("SELECT COUNT(*) FROM decisions").fetchone()[0]
+
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "fingerprint": self.fingerprint,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "saved_latency_ms": round(self.saved_seconds * 1000, 1),
+        }
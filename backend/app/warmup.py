@@ -0,0 +1,169 @@
+import asyncio
+import logging
+import time
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from app.config import (
+    FAST_ROUTER_ENABLED,
+    LOCAL_LLM_ENABLED,
+    OLLAMA_MODEL,
+    OLLAMA_PRELOAD,
+    OLLAMA_URL,
+    RERANK_ENABLED,
+    WARMUP_TIMEOUT_SECONDS,
+)
+from app.llm.http import get_http_session
+from app.llm.ollama import ollama
+from app.retrieval.embedding import EMBED_EXECUTOR, embedding_service, model_loaded
+from app.retrieval.stores import get_vector_store
+
+logger = logging.getLogger(__name__)
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 1)
+
+
+def ollama_tags_url() -> str:
+    parts = urlsplit(OLLAMA_URL)
+    return f"{parts.scheme}://{parts.netloc}/api/tags"
+
+
+# =================================================
+# CHECKS
+# =================================================
+# Each check returns a detail dict and raises on failure.
+
+def _load_model() -> Dict:
+    # One real encode, so tokenizer and weights are paged in as well
+    embedding_service.embed_many(["warmup"], use_cache=False)
+
+    if FAST_ROUTER_ENABLED:
+        from app.routing.fast_router import get_fast_router
+        get_fast_router().build()
+
+    if RERANK_ENABLED:
+        from app.retrieval.rerank import reranker
+        reranker.score_pairs("warmup", ["warmup"])
+
+    # Explainer tokenizer (EXPLAINER_TOKENIZER), for context packing
+    from app.generation.context import token_counter
+
+    return {"fast_router": FAST_ROUTER_ENABLED, "reranker": RERANK_ENABLED,
+            "exact_tokens": token_counter.exact}
+
+
+async def check_model() -> Dict:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(EMBED_EXECUTOR, _load_model)
+
+
+async def check_vector_store() -> Dict:
+    store = get_vector_store()
+    detail = await asyncio.wait_for(store.ping(), timeout=WARMUP_TIMEOUT_SECONDS)
+    return {"store": store.name, **detail}
+
+
+async def check_ollama() -> Dict:
+    if not LOCAL_LLM_ENABLED:
+        return {"skipped": "local LLM disabled"}
+
+    async with get_http_session().get(
+        ollama_tags_url(),
+        timeout=aiohttp.ClientTimeout(total=WARMUP_TIMEOUT_SECONDS)
+    ) as r:
+        r.raise_for_status()
+        data = await r.json(content_type=None)
+
+    models = [m.get("name") for m in data.get("models", [])]
+    if OLLAMA_MODEL not in models:
+        raise RuntimeError(f"model {OLLAMA_MODEL!r} not pulled (have {models})")
+
+    # Load the weights now, so no request pays for the cold load
+    if OLLAMA_PRELOAD:
+        return {"model": OLLAMA_MODEL, **await ollama.preload()}
+
+    return {"model": OLLAMA_MODEL}
+
+
+CHECKS = {
+    "embedding_model": check_model,
+    "vector_store": check_vector_store,
+    "ollama": check_ollama,
+}
+
+
+# =================================================
+# READINESS STATE
+# =================================================
+
+class Readiness:
+    """
+    Result of the last run of every check. The app is ready once all of
+    them have passed; failed checks are retried on the next /ready call.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.ready_after_ms: Optional[float] = None
+        self.checks: Dict[str, Dict] = {name: {"ok": False} for name in CHECKS}
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def ready(self) -> bool:
+        return all(c["ok"] for c in self.checks.values())
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> Optional[asyncio.Task]:
+        """
+        Run the pending checks in the background, unless they all passed
+        or a run is already in progress. Callers never wait on the checks
+        (the Ollama preload alone may take minutes).
+        """
+        if self.ready or self.running:
+            return None
+        self._task = asyncio.create_task(self.run())
+        return self._task
+
+    async def _run(self, name: str):
+        t0 = time.perf_counter()
+        try:
+            detail = await CHECKS[name]()
+            self.checks[name] = {"ok": True, "ms": _ms(time.perf_counter() - t0), **detail}
+        except Exception as e:
+            self.checks[name] = {
+                "ok": False,
+                "ms": _ms(time.perf_counter() - t0),
+                "error": f"{type(e).__name__}: {e}",
+            }
+
+    async def run(self):
+        """
+        Run all checks that have not passed yet, concurrently.
+        """
+        async with self._lock:
+            pending = [name for name, c in self.checks.items() if not c["ok"]]
+            await asyncio.gather(*(self._run(name) for name in pending))
+
+            if self.ready and self.ready_after_ms is None:
+                self.ready_after_ms = _ms(time.perf_counter() - self.started)
+                logger.info("ready after %s ms", self.ready_after_ms)
+
+    def report(self) -> Dict:
+        return {
+            "ready": self.ready,
+            "model_loaded": model_loaded(),
+            "ready_after_ms": self.ready_after_ms,
+            "checking": self.running,
+            "checks": self.checks,
+        }
+
+
+readiness = Readiness()
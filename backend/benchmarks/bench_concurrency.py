@@ -0,0 +1,105 @@
+"""
+Concurrency benchmark for /ask against the local Ollama stub.
+
+Starts the stub on a background thread, points OLLAMA_URL at it and fires
+batches of concurrent questions at the FastAPI app in-process. With the
+async pipeline one worker should keep all questions in flight at once, so
+wall time stays close to (router + explainer latency) regardless of the
+concurrency level.
+
+Retrieval is replaced by a fixed passage unless --with-retrieval is given
+(that needs Qdrant and the embedding model).
+
+    python -m benchmarks.bench_concurrency --latency-ms 500 --levels 1 10 100 500
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    k = min(len(values) - 1, max(0, round(pct / 100 * (len(values) - 1))))
+    return values[k]
+
+
+FIXED_PASSAGE = {
+    "chunk_id": "life_eternal_suffering",
+    "passage_id": "life_eternal_suffering::p0000",
+    "passage_index": 0,
+    "book": "Life Eternal",
+    "speaker": "Meher Baba",
+    "text": "Suffering is the price of love.",
+}
+
+
+async def run_level(client, concurrency: int):
+    async def one():
+        t0 = time.perf_counter()
+        r = await client.post("/ask", params={"question": "why do I suffer"})
+        return time.perf_counter() - t0, r.status_code
+
+    t0 = time.perf_counter()
+    results = await asyncio.gather(*(one() for _ in range(concurrency)))
+    wall = time.perf_counter() - t0
+
+    latencies = [lat for lat, _ in results]
+    errors = sum(1 for _, code in results if code != 200)
+
+    return {
+        "concurrency": concurrency,
+        "wall_s": round(wall, 3),
+        "throughput_rps": round(concurrency / wall, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "errors": errors,
+    }
+
+
+async def main(args):
+    os.environ["OLLAMA_URL"] = f"http://127.0.0.1:{args.port}/api/chat"
+
+    import httpx
+    from benchmarks.stub_ollama import StubServer
+    import app.main as api
+
+    if not args.with_retrieval:
+        async def fixed_retrieve(**kwargs):
+            return [FIXED_PASSAGE]
+
+        api.retrieve = fixed_retrieve
+
+    ideal_ms = 2 * args.latency_ms
+
+    with StubServer(args.port, args.latency_ms) as stub:
+        transport = httpx.ASGITransport(app=api.app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://api", timeout=600
+        ) as client:
+            print(f"\n⚙️  stub latency {args.latency_ms} ms per LLM call "
+                  f"(ideal /ask ≈ {ideal_ms:.0f} ms)\n")
+            print(f"{'conc':>6} {'wall s':>8} {'req/s':>8} {'p50 ms':>9} "
+                  f"{'p95 ms':>9} {'stub max in-flight':>19} {'errors':>7}")
+
+            for level in args.levels:
+                stub.state.max_in_flight = 0
+                row = await run_level(client, level)
+                print(f"{row['concurrency']:>6} {row['wall_s']:>8} "
+                      f"{row['throughput_rps']:>8} {row['p50_ms']:>9} "
+                      f"{row['p95_ms']:>9} {stub.state.max_in_flight:>19} "
+                      f"{row['errors']:>7}")
+
+        await api.close_http_session()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=11500)
+    parser.add_argument("--latency-ms", type=float, default=500.0)
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 10, 100, 300])
+    parser.add_argument("--with-retrieval", action="store_true")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,123 @@
+"""
+Explainer prompt size before and after the token-budgeted context
+builder, over the labelled questions in data/eval/retrieval_questions.json.
+
+  legacy : every selected quote's full text, as build_prompt used to
+           concatenate it
+  budget : app.generation.context, the most relevant sentences packed
+           into the EXPLAINER_CONTEXT_TOKENS / EXPLAINER_NUM_CTX budget
+
+Hits come from retrieve() with the labelled router decision. With
+--chunk-level every hit is replaced by its whole parent chunk, the case
+that used to overflow the model context. "kept" is the share of
+questions whose expected chunk is still quoted in the packed context.
+Tokens are counted with EXPLAINER_TOKENIZER (estimated when unset).
+
+    VECTOR_STORE=embedded python -m app.ingestion.ingest_books   # once
+    python -m benchmarks.bench_context --budgets 512 1024 1536
+    python -m benchmarks.bench_context --chunk-level --json
+"""
+import argparse
+import asyncio
+import json
+from pathlib import Path
+
+import numpy as np
+
+QUESTIONS_FILE = Path(__file__).resolve().parent.parent / "data" / "eval" / "retrieval_questions.json"
+
+
+async def load_hits(questions, args):
+    from app.generation.explainer import select_quotes
+    from app.retrieval.docstore import get_docstore
+    from app.retrieval.retriever import BOOK_COLLECTION_MAP, retrieve
+
+    all_hits = []
+    for q in questions:
+        hits = select_quotes(await retrieve(
+            book=q["book"],
+            query=q["question"],
+            router_topics=q.get("topics", []),
+            router_keywords=q.get("keywords", []),
+            top_k=args.top_k,
+            neighbors=args.neighbors
+        ))
+        if args.chunk_level:
+            store = get_docstore(BOOK_COLLECTION_MAP[q["book"]])
+            whole = []
+            for hit in hits:
+                text = store.text(hit["chunk_id"]) if store else None
+                if text and hit["chunk_id"] not in {h["chunk_id"] for h in whole}:
+                    whole.append({**hit, "text": text, "char_start": 0, "char_end": len(text)})
+            hits = whole
+        all_hits.append(hits)
+    return all_hits
+
+
+async def main(args):
+    from app.generation.context import context_builder, quote_source, token_counter
+    from app.retrieval.embedding import embed_np_async
+
+    with open(QUESTIONS_FILE, "r", encoding="utf-8") as f:
+        questions = json.load(f)
+
+    all_hits = await load_hits(questions, args)
+    vectors = [await embed_np_async(q["question"]) for q in questions]
+
+    legacy = [
+        token_counter.count("\n\n".join(
+            f"QUOTE SOURCE: {quote_source(h)}\nSPEAKER: {h.get('speaker')}\nTEXT:\n{h['text']}" for h in hits
+        ))
+        for hits in all_hits
+    ]
+    print(f"📚 {len(questions)} questions, {'chunk' if args.chunk_level else 'passage'}-level hits, "
+          f"{'tokenizer ' + token_counter.name if token_counter.exact else 'estimated tokens'}")
+    print(f"   legacy context: p50 {np.median(legacy):.0f} tokens, p95 {np.percentile(legacy, 95):.0f}, "
+          f"max {max(legacy)}\n")
+
+    print(f"{'budget':>7} {'p50 tok':>8} {'p95 tok':>8} {'max tok':>8} {'reduction':>10} "
+          f"{'kept':>6} {'build p50':>10}")
+    rows = []
+    for budget in args.budgets:
+        tokens, ms, kept, labelled = [], [], 0, 0
+        for q, hits, vector in zip(questions, all_hits, vectors):
+            context = await context_builder.build(hits, q["question"], budget, question_vector=vector)
+            tokens.append(context.tokens)
+            ms.append(context.stats["ms"])
+
+            expected = set(q.get("expected_chunk_ids", []))
+            if expected and expected & {h["chunk_id"] for h in hits}:
+                labelled += 1
+                kept += bool(expected & {quote["chunk_id"] for quote in context.quotes})
+
+        row = {
+            "budget": budget,
+            "tokens_p50": float(np.median(tokens)),
+            "tokens_p95": float(np.percentile(tokens, 95)),
+            "tokens_max": int(max(tokens)),
+            "reduction_p50": round(1 - np.median(tokens) / max(np.median(legacy), 1), 3),
+            "kept": round(kept / labelled, 3) if labelled else None,
+            "build_p50_ms": float(np.median(ms)),
+        }
+        rows.append(row)
+        print(f"{budget:>7} {row['tokens_p50']:>8.0f} {row['tokens_p95']:>8.0f} {row['tokens_max']:>8} "
+              f"{row['reduction_p50']:>9.0%} {row['kept'] if row['kept'] is not None else '-':>6} "
+              f"{row['build_p50_ms']:>9.1f}")
+
+    if args.json:
+        print(json.dumps({
+            "chunk_level": args.chunk_level,
+            "legacy_tokens_p50": float(np.median(legacy)),
+            "rows": rows
+        }, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budgets", type=int, nargs="+", default=[512, 1024, 1536])
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--neighbors", type=int, default=1)
+    parser.add_argument("--chunk-level", action="store_true", help="Quote whole parent chunks (old behaviour)")
+    parser.add_argument("--json", action="store_true")
+    asyncio.run(main(parser.parse_args()))
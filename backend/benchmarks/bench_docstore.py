@@ -0,0 +1,172 @@
+"""
+Bytes moved and latency per query with passage text in the vector
+payloads (before) vs. metadata-only payloads plus the docstore (after).
+
+Both layouts are written to a temporary directory from the vectors of the
+built embedded collection and the normalized chunks, then queried with
+the same vectors (stored passage vectors plus noise):
+
+  before : search(limit=candidates) returns payloads with text
+  after  : search(limit=candidates) returns metadata payloads, then the
+           final top_k passages are hydrated from the docstore
+
+"payload bytes" is the JSON size of the returned payloads, i.e. what
+Qdrant sends over HTTP and the client parses for query_points(...,
+with_payload=True). The embedded store reads the same bytes from disk.
+
+    VECTOR_STORE=embedded python -m app.ingestion.ingest_books   # once
+    python -m benchmarks.bench_docstore --candidates 9 30 --top-k 3
+"""
+import argparse
+import asyncio
+import json
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+BOOK_FILES = {
+    "god_speaks_collection": "god_speaks_normalized_chunks.json",
+    "life_eternal_collection": "life_eternal_normalized_chunks.json",
+}
+
+
+def pct(values, q, scale=1e6):
+    return round(float(np.percentile(values, q)) * scale, 1) if values else None
+
+
+def payload_bytes(hits) -> int:
+    return sum(len(json.dumps(payload, ensure_ascii=False).encode("utf-8")) for _, payload in hits)
+
+
+def build_layouts(root: Path, collection: str):
+    """
+    Write the before/after collections and the docstore under `root`.
+    Returns (docstore path, passage vectors).
+    """
+    from app.config import NORMALIZED_DIR
+    from app.ingestion.passages import build_passages, vector_payload
+    from app.retrieval.docstore import write_docstore
+    from app.retrieval.stores import load_embedded_table, write_embedded_collection
+
+    table = load_embedded_table(collection)
+    if table is None:
+        raise SystemExit(f"❌ {collection} not built; run ingestion with VECTOR_STORE=embedded first")
+    rows, vectors = table
+
+    with open(NORMALIZED_DIR / BOOK_FILES[collection], "r", encoding="utf-8") as f:
+        chunks = json.load(f)
+
+    texts = {}
+    passages = {}
+    for chunk in chunks:
+        if chunk.get("id") and chunk.get("text") and chunk["id"] not in texts:
+            texts[chunk["id"]] = chunk["text"]
+            passages.update((p["passage_id"], p) for p in build_passages(chunk))
+
+    payloads = [passages[row["passage_id"]] for row in rows]
+    hashes = [row.get("text_hash", "") for row in rows]
+    vectors = np.asarray(vectors, dtype=np.float32)
+
+    write_embedded_collection("before", vectors, payloads, hashes, root=root / collection)
+    write_embedded_collection("after", vectors, [vector_payload(p) for p in payloads], hashes,
+                              root=root / collection)
+    docstore = root / collection / "texts.docs"
+    write_docstore(docstore, texts)
+    return docstore, vectors
+
+
+async def run(args, collection: str, root: Path) -> dict:
+    from app.retrieval.docstore import DocStore
+    from app.retrieval.stores import EmbeddedStore
+
+    docstore_file, vectors = build_layouts(root, collection)
+    store = EmbeddedStore(root=root / collection)
+    docstore = DocStore(docstore_file, cache_size=args.cache_size)
+
+    rng = np.random.default_rng(args.seed)
+    rows = rng.integers(0, len(vectors), size=args.queries)
+    queries = vectors[rows] + rng.normal(0, args.noise, size=(args.queries, vectors.shape[1]))
+    queries = (queries / np.linalg.norm(queries, axis=1, keepdims=True)).astype(np.float32)
+
+    # Open both collections and the page cache before timing
+    for name in ("before", "after"):
+        await store.search(name, queries[0], 1, -1.0)
+
+    results = []
+    for candidates in args.candidates:
+        m = {k: [] for k in ("before_s", "after_s", "hydrate_s", "before_bytes", "after_bytes")}
+        for q in queries:
+            t0 = time.perf_counter()
+            hits = await store.search("before", q, candidates, -1.0)
+            m["before_s"].append(time.perf_counter() - t0)
+            m["before_bytes"].append(payload_bytes(hits))
+
+            t0 = time.perf_counter()
+            hits = await store.search("after", q, candidates, -1.0)
+            t1 = time.perf_counter()
+            top = [{**p, "text": docstore.passage_text(p)} for _, p in hits[:args.top_k]]
+            t2 = time.perf_counter()
+            m["after_s"].append(t2 - t0)
+            m["hydrate_s"].append(t2 - t1)
+            m["after_bytes"].append(payload_bytes(hits))
+
+        assert all(p["text"] for p in top)
+        results.append({
+            "collection": collection,
+            "candidates": candidates,
+            "top_k": args.top_k,
+            "before_bytes_p50": int(np.median(m["before_bytes"])),
+            "after_bytes_p50": int(np.median(m["after_bytes"])),
+            "before_p50_us": pct(m["before_s"], 50),
+            "before_p95_us": pct(m["before_s"], 95),
+            "after_p50_us": pct(m["after_s"], 50),
+            "after_p95_us": pct(m["after_s"], 95),
+            "hydrate_p50_us": pct(m["hydrate_s"], 50),
+        })
+
+    await store.close()
+    results[-1]["docstore"] = docstore.stats()
+    docstore.close()
+    return results
+
+
+async def main(args):
+    collections = args.collections or list(BOOK_FILES)
+
+    print(f"{'collection':>24} {'cands':>6} {'bytes before':>13} {'bytes after':>12} "
+          f"{'before p50':>11} {'after p50':>10} {'before p95':>11} {'after p95':>10} {'hydrate':>8}")
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for collection in collections:
+            for r in await run(args, collection, Path(tmp)):
+                rows.append(r)
+                print(f"{r['collection']:>24} {r['candidates']:>6} {r['before_bytes_p50']:>13} "
+                      f"{r['after_bytes_p50']:>12} {r['before_p50_us']:>11} {r['after_p50_us']:>10} "
+                      f"{r['before_p95_us']:>11} {r['after_p95_us']:>10} {r['hydrate_p50_us']:>8}")
+
+    print("\n(latencies in µs; 'after' includes hydrating the top_k texts)")
+    for r in rows:
+        if "docstore" in r:
+            d = r["docstore"]
+            print(f"🗜️ {r['collection']}: {d['raw_bytes'] / 1e6:.2f} MB text → "
+                  f"{d['compressed_bytes'] / 1e6:.2f} MB, {d['hits']} LRU hits / {d['misses']} misses")
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--collections", nargs="+", choices=list(BOOK_FILES))
+    parser.add_argument("--candidates", type=int, nargs="+", default=[9, 30],
+                        help="Vector candidates per query (retrieve() asks for top_k * 3)")
+    parser.add_argument("--top-k", type=int, default=3, help="Passages hydrated per query")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--noise", type=float, default=0.05, help="Gaussian noise added to query vectors")
+    parser.add_argument("--cache-size", type=int, default=256, help="Docstore LRU entries")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true")
+    asyncio.run(main(parser.parse_args()))
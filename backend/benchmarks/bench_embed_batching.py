@@ -0,0 +1,118 @@
+"""
+Per-call vs micro-batched (EMBED_BATCHING) query embeddings under
+concurrent load.
+
+  per-call : every request runs its own encode() on the embedding executor
+  batched  : requests go through EmbeddingBatcher; texts arriving within
+             --window-ms share one forward pass
+
+At each concurrency level, that many clients embed the questions of
+data/eval/retrieval_questions.json in a closed loop (next question as
+soon as the previous vector is back) until --requests have been served.
+The LRU cache is off so every request really reaches the model.
+
+Reported per mode and level: throughput, per-request latency p50/p95,
+forward passes, mean batch size and the queueing delay the window adds.
+
+    python -m benchmarks.bench_embed_batching --levels 1 8 32 128
+    python -m benchmarks.bench_embed_batching --window-ms 5 --max-batch 64 --json
+"""
+import argparse
+import asyncio
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+
+QUESTIONS_FILE = Path(__file__).resolve().parent.parent / "data" / "eval" / "retrieval_questions.json"
+
+
+def pct(values, q):
+    return round(float(np.percentile(values, q)) * 1000, 2) if values else None
+
+
+async def run_level(mode: str, concurrency: int, questions, args) -> dict:
+    from app.retrieval.embedding import EMBED_EXECUTOR, EmbeddingBatcher, EmbeddingService
+
+    service = EmbeddingService(cache_size=0)
+    batcher = EmbeddingBatcher(service=service, window_ms=args.window_ms, max_batch=args.max_batch)
+    loop = asyncio.get_running_loop()
+
+    async def embed(text: str):
+        if mode == "batched":
+            return await batcher.embed(text)
+        return await loop.run_in_executor(EMBED_EXECUTOR, service.embed_np, text)
+
+    latencies = []
+    served = 0
+
+    async def client(offset: int):
+        nonlocal served
+        i = offset
+        while served < args.requests:
+            served += 1
+            t0 = time.perf_counter()
+            await embed(questions[i % len(questions)])
+            latencies.append(time.perf_counter() - t0)
+            i += concurrency
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(client(i) for i in range(concurrency)))
+    wall = time.perf_counter() - t0
+    await batcher.close()
+
+    stats = batcher.stats()
+    return {
+        "mode": mode,
+        "concurrency": concurrency,
+        "req_per_s": round(len(latencies) / wall, 1),
+        "p50_ms": pct(latencies, 50),
+        "p95_ms": pct(latencies, 95),
+        "forward_passes": service.forward_passes,
+        "batch_mean": stats["batch_size_mean"] if mode == "batched" else 1.0,
+        "queue_p95_ms": stats["queue_p95_ms"] if mode == "batched" else 0.0,
+    }
+
+
+async def main(args):
+    from app.retrieval.embedding import embedding_service
+
+    with open(QUESTIONS_FILE, "r", encoding="utf-8") as f:
+        questions = [q["question"] for q in json.load(f)]
+
+    # Load the model and warm up kernels outside the measurement
+    embedding_service.embed_many(questions[:8], use_cache=False)
+
+    rows = []
+    for concurrency in args.levels:
+        for mode in ("per-call", "batched"):
+            rows.append(await run_level(mode, concurrency, questions, args))
+
+    print(f"\n📚 {len(questions)} questions, {args.requests} requests per run, "
+          f"window {args.window_ms} ms, max batch {args.max_batch}\n")
+    header = ["mode", "concurrency", "req_per_s", "p50_ms", "p95_ms",
+              "forward_passes", "batch_mean", "queue_p95_ms"]
+    print("  ".join(f"{h:>14}" for h in header))
+    for row in rows:
+        print("  ".join(f"{str(row[h]):>14}" for h in header))
+
+    print()
+    for per_call, batched in zip(rows[::2], rows[1::2]):
+        gain = batched["req_per_s"] / per_call["req_per_s"] if per_call["req_per_s"] else 0.0
+        print(f"⏱️ concurrency {per_call['concurrency']:>4}: throughput ×{gain:.2f}, "
+              f"p95 {per_call['p95_ms']} → {batched['p95_ms']} ms")
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 8, 32, 128])
+    parser.add_argument("--requests", type=int, default=512)
+    parser.add_argument("--window-ms", type=float, default=2.0)
+    parser.add_argument("--max-batch", type=int, default=32)
+    parser.add_argument("--json", action="store_true")
+    asyncio.run(main(parser.parse_args()))
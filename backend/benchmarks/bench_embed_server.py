@@ -0,0 +1,191 @@
+"""
+In-process vs shared (EMBED_MODE=shared) embeddings across API worker
+processes: memory and query latency at 1, 4 and 8 workers.
+
+  in-process : every worker loads its own model and embedding threads
+  shared     : one embedding server owns the model; workers are clients
+               over its Unix socket
+
+Each worker is a fresh interpreter that imports the app's embedding
+module the way an API worker does, embeds one question to warm up (model
+load or connection), waits until all workers are ready and then runs
+--concurrency concurrent clients through embed_np_async() until it has
+served --requests questions. The LRU cache is off so every question
+reaches the model.
+
+Reported per mode and worker count: total RSS (workers + server), RSS
+per worker, throughput over all workers, and query latency p50/p95.
+
+    python -m benchmarks.bench_embed_server --workers 1 4 8
+    python -m benchmarks.bench_embed_server --workers 4 --requests 400 --concurrency 8 --json
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+QUESTIONS_FILE = BACKEND_DIR / "data" / "eval" / "retrieval_questions.json"
+
+
+def pct(values, q):
+    return round(float(np.percentile(values, q)) * 1000, 2) if values else None
+
+
+# =================================================
+# WORKER (one API worker, fresh process)
+# =================================================
+
+async def run_worker(args):
+    from app.retrieval.embed_server import rss_mb
+    from app.retrieval.embedding import embed_np_async
+
+    with open(QUESTIONS_FILE, "r", encoding="utf-8") as f:
+        questions = [q["question"] for q in json.load(f)]
+
+    t0 = time.perf_counter()
+    await embed_np_async(questions[0])
+    load_seconds = time.perf_counter() - t0
+
+    # Ready; the driver starts every worker at once
+    print("ready", flush=True)
+    sys.stdin.readline()
+
+    latencies = []
+    served = 0
+
+    async def client(offset: int):
+        nonlocal served
+        i = offset
+        while served < args.requests:
+            served += 1
+            t0 = time.perf_counter()
+            await embed_np_async(questions[i % len(questions)])
+            latencies.append(time.perf_counter() - t0)
+            i += args.concurrency
+
+    started = time.time()
+    await asyncio.gather(*(client(i) for i in range(args.concurrency)))
+
+    print(json.dumps({
+        "load_s": round(load_seconds, 3),
+        "started": started,
+        "finished": time.time(),
+        "rss_mb": rss_mb(),
+        "latencies": latencies,
+    }), flush=True)
+
+
+# =================================================
+# DRIVER
+# =================================================
+
+def start_server(socket_path: Path, env: dict) -> subprocess.Popen:
+    server = subprocess.Popen(
+        [sys.executable, "-m", "app.retrieval.embed_server", "--socket", str(socket_path)],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL
+    )
+    deadline = time.time() + 300
+    while not socket_path.exists():
+        if server.poll() is not None or time.time() > deadline:
+            raise RuntimeError("embedding server did not start")
+        time.sleep(0.1)
+    return server
+
+
+def run_mode(mode: str, workers: int, args) -> dict:
+    from app.retrieval.embed_server import rss_mb
+
+    with tempfile.TemporaryDirectory() as tmp:
+        socket_path = Path(tmp) / "embed.sock"
+        env = {**os.environ, "EMBED_MODE": mode, "EMBED_SOCKET": str(socket_path),
+               "EMBED_CACHE_SIZE": "0", "PYTHONPATH": os.environ.get("PYTHONPATH", ".")}
+
+        server = start_server(socket_path, env) if mode == "shared" else None
+        try:
+            procs = [
+                subprocess.Popen(
+                    [sys.executable, "-m", "benchmarks.bench_embed_server", "--worker",
+                     "--requests", str(args.requests), "--concurrency", str(args.concurrency)],
+                    cwd=BACKEND_DIR, env=env, text=True,
+                    stdin=subprocess.PIPE, stdout=subprocess.PIPE
+                )
+                for _ in range(workers)
+            ]
+            for p in procs:
+                if p.stdout.readline().strip() != "ready":
+                    raise RuntimeError(f"{mode} worker failed to start")
+            for p in procs:
+                p.stdin.write("go\n")
+                p.stdin.flush()
+
+            results = [json.loads(p.stdout.readline()) for p in procs]
+            for p in procs:
+                p.wait()
+            server_rss = rss_mb(server.pid) if server is not None else 0.0
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait()
+
+    latencies = [x for r in results for x in r["latencies"]]
+    wall = max(r["finished"] for r in results) - min(r["started"] for r in results)
+    worker_rss = [r["rss_mb"] or 0.0 for r in results]
+    return {
+        "mode": mode,
+        "workers": workers,
+        "total_rss_mb": round(sum(worker_rss) + (server_rss or 0.0), 1),
+        "worker_rss_mb": round(float(np.mean(worker_rss)), 1),
+        "server_rss_mb": server_rss,
+        "load_s": round(float(np.mean([r["load_s"] for r in results])), 2),
+        "req_per_s": round(len(latencies) / wall, 1),
+        "p50_ms": pct(latencies, 50),
+        "p95_ms": pct(latencies, 95),
+    }
+
+
+def main(args):
+    rows = []
+    for workers in args.workers:
+        for mode in ("in-process", "shared"):
+            rows.append(run_mode(mode, workers, args))
+
+    print(f"\n📚 {args.requests} questions per worker, {args.concurrency} concurrent per worker\n")
+    header = ["mode", "workers", "total_rss_mb", "worker_rss_mb", "server_rss_mb",
+              "load_s", "req_per_s", "p50_ms", "p95_ms"]
+    print("  ".join(f"{h:>13}" for h in header))
+    for row in rows:
+        print("  ".join(f"{str(row[h]):>13}" for h in header))
+
+    print()
+    for local, shared in zip(rows[::2], rows[1::2]):
+        print(f"💾 {local['workers']} workers: RSS {local['total_rss_mb']} → {shared['total_rss_mb']} MB, "
+              f"p95 {local['p95_ms']} → {shared['p95_ms']} ms")
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--requests", type=int, default=200,
+                        help="Questions embedded per worker")
+    parser.add_argument("--concurrency", type=int, default=4,
+                        help="Concurrent requests per worker")
+    parser.add_argument("--json", action="store_true")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        asyncio.run(run_worker(args))
+    else:
+        main(args)
@@ -0,0 +1,168 @@
+"""
+Embedding backend comparison: torch vs ONNX vs int8-quantized ONNX.
+
+Each backend runs in its own interpreter so memory numbers are not mixed:
+  - load time and peak RSS after loading + encoding
+  - single-query latency (p50/p95) on the labelled router questions
+  - batch throughput (passages/s) on a sample of the corpus passages
+  - agreement with torch: mean/min cosine between the two vectors of each
+    passage, and overlap of the top-10 passages per question
+
+    python -m benchmarks.bench_embedding_backends --sample 1000
+    python -m benchmarks.bench_embedding_backends --backends torch onnx-int8 --json
+"""
+import argparse
+import json
+import random
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+from app.config import NORMALIZED_DIR
+
+CORPUS_FILES = [
+    NORMALIZED_DIR / "god_speaks_normalized_chunks.json",
+    NORMALIZED_DIR / "life_eternal_normalized_chunks.json",
+]
+TOP_K = 10
+
+
+def load_corpus(sample: int, seed: int = 13):
+    from app.ingestion.engine import load_chunks
+    from app.ingestion.passages import build_passages
+    from app.routing.prototypes import load_router_examples
+
+    passages = []
+    for path in CORPUS_FILES:
+        for chunk in load_chunks(str(path)):
+            if chunk.get("id") and chunk.get("text"):
+                passages.extend(p["text"] for p in build_passages(chunk))
+
+    random.Random(seed).shuffle(passages)
+    questions = [ex["question"] for ex in load_router_examples()]
+    return passages[:sample], questions
+
+
+# =================================================
+# WORKER (one backend, fresh process)
+# =================================================
+
+def run_worker(backend: str, out: str, sample: int, batch_size: int):
+    import resource
+    import time
+
+    from app.retrieval.embedding import load_sentence_transformer
+
+    passages, questions = load_corpus(sample)
+
+    t0 = time.perf_counter()
+    model = load_sentence_transformer(backend)
+    load_seconds = time.perf_counter() - t0
+
+    def encode(texts, **kwargs):
+        return model.encode(texts, normalize_embeddings=True,
+                            convert_to_numpy=True, show_progress_bar=False, **kwargs)
+
+    encode(questions[:4])   # warm up kernels
+
+    latencies = []
+    query_vectors = []
+    for q in questions:
+        t0 = time.perf_counter()
+        query_vectors.append(encode([q])[0])
+        latencies.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    passage_vectors = encode(passages, batch_size=batch_size)
+    batch_seconds = time.perf_counter() - t0
+
+    np.savez(out,
+             queries=np.asarray(query_vectors, dtype=np.float32),
+             passages=passage_vectors.astype(np.float32))
+
+    print(json.dumps({
+        "backend": backend,
+        "load_s": round(load_seconds, 2),
+        "query_p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 2),
+        "query_p95_ms": round(float(np.percentile(latencies, 95)) * 1000, 2),
+        "passages_per_s": round(len(passages) / batch_seconds, 1),
+        # ru_maxrss is in KiB on Linux
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }))
+
+
+# =================================================
+# DRIVER
+# =================================================
+
+def agreement(base: dict, other: dict) -> dict:
+    cos = np.sum(base["passages"] * other["passages"], axis=1)
+
+    base_top = np.argsort(-(base["queries"] @ base["passages"].T), axis=1)[:, :TOP_K]
+    other_top = np.argsort(-(other["queries"] @ other["passages"].T), axis=1)[:, :TOP_K]
+    overlap = [len(set(a) & set(b)) / TOP_K for a, b in zip(base_top, other_top)]
+
+    return {
+        "cosine_mean": round(float(cos.mean()), 5),
+        "cosine_min": round(float(cos.min()), 5),
+        f"top{TOP_K}_overlap": round(float(np.mean(overlap)), 4),
+    }
+
+
+def main(args):
+    results = []
+
+    with tempfile.TemporaryDirectory() as tmp:
+        vectors = {}
+        for backend in args.backends:
+            out = str(Path(tmp) / f"{backend}.npz")
+            proc = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_embedding_backends",
+                 "--worker", backend, "--out", out,
+                 "--sample", str(args.sample), "--batch-size", str(args.batch_size)],
+                capture_output=True, text=True,
+                cwd=Path(__file__).resolve().parent.parent
+            )
+            if proc.returncode != 0:
+                tail = "\n".join(proc.stderr.strip().splitlines()[-3:])
+                print(f"❌ {backend} failed:\n{tail}")
+                continue
+
+            results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+            with np.load(out) as data:
+                vectors[backend] = {k: data[k] for k in data.files}
+
+        if "torch" in vectors:
+            for row in results:
+                row.update(agreement(vectors["torch"], vectors[row["backend"]]))
+
+    header = ["backend", "load_s", "query_p50_ms", "query_p95_ms",
+              "passages_per_s", "peak_rss_mb", "cosine_mean", "cosine_min",
+              f"top{TOP_K}_overlap"]
+    print("  ".join(f"{h:>14}" for h in header))
+    for row in results:
+        print("  ".join(f"{str(row.get(h, '-')):>14}" for h in header))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx", "onnx-int8"])
+    parser.add_argument("--sample", type=int, default=1000,
+                        help="Number of corpus passages to encode")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--json", action="store_true")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--out", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, args.out, args.sample, args.batch_size)
+    else:
+        main(args)
@@ -0,0 +1,108 @@
+"""
+Fast router evaluation on the labelled examples (data/router_examples.json).
+
+Each example is scored leave-one-out (its own prototype row is masked), so
+accuracy is not inflated by the question matching itself. For a range of
+margins it reports book accuracy on non-escalated questions and the
+escalation rate, plus p50/p95 latency of the fast path (embed + score).
+
+With --measure-llm every example is also sent to the LLM router to get its
+p50/p95 latency and the latency saved per non-escalated question.
+
+    python -m benchmarks.bench_fast_router --margins 0 0.04 0.08 0.12
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import numpy as np
+
+
+def pct_ms(values, q):
+    return round(float(np.percentile(values, q)) * 1000, 2) if values else None
+
+
+async def main(args):
+    from app.retrieval.embedding import encode_batch
+    from app.routing.fast_router import FastRouter
+    from app.routing.prototypes import load_router_examples
+
+    examples = load_router_examples()
+    router = FastRouter()
+
+    t0 = time.perf_counter()
+    router.build()
+    print(f"🧱 {len(router.prototypes)} prototypes built in "
+          f"{time.perf_counter() - t0:.2f} s")
+
+    example_rows = {
+        p.text: i for i, p in enumerate(router.prototypes) if p.kind == "example"
+    }
+
+    # Fast path latency: one question at a time, as in a request
+    latencies = []
+    scored = []
+    for ex in examples:
+        t0 = time.perf_counter()
+        vector = encode_batch([ex["question"]])[0]
+        result = router.score(vector, exclude=example_rows.get(ex["question"]))
+        latencies.append(time.perf_counter() - t0)
+        scored.append((ex, result))
+
+    print(f"\n⚡ fast path latency: p50 {pct_ms(latencies, 50)} ms | "
+          f"p95 {pct_ms(latencies, 95)} ms  ({len(examples)} questions)\n")
+
+    print(f"{'margin':>7} {'escalated':>10} {'rate':>7} {'accuracy (fast)':>16}")
+    rows = []
+    for margin in args.margins:
+        fast = [(ex, r) for ex, r in scored if r["margin"] >= margin]
+        escalated = len(scored) - len(fast)
+        correct = sum(1 for ex, r in fast if r["book"] == ex["book"])
+        accuracy = correct / len(fast) if fast else None
+        rows.append({
+            "margin": margin,
+            "escalated": escalated,
+            "escalation_rate": round(escalated / len(scored), 4),
+            "accuracy": round(accuracy, 4) if accuracy is not None else None,
+        })
+        print(f"{margin:>7} {escalated:>10} {escalated / len(scored):>7.1%} "
+              f"{accuracy if accuracy is None else f'{accuracy:.1%}':>16}")
+
+    report = {"fast_p50_ms": pct_ms(latencies, 50),
+              "fast_p95_ms": pct_ms(latencies, 95),
+              "margins": rows}
+
+    if args.measure_llm:
+        from app.llm.http import close_http_session
+        from app.routing.book_router import run_router_llm
+
+        llm = []
+        for ex in examples:
+            t0 = time.perf_counter()
+            await run_router_llm(ex["question"])
+            llm.append(time.perf_counter() - t0)
+        await close_http_session()
+
+        saved = [l - f for l, f in zip(llm, latencies)]
+        report.update({
+            "llm_p50_ms": pct_ms(llm, 50),
+            "llm_p95_ms": pct_ms(llm, 95),
+            "saved_p50_ms": pct_ms(saved, 50),
+            "saved_p95_ms": pct_ms(saved, 95),
+        })
+        print(f"\n🐢 LLM router: p50 {report['llm_p50_ms']} ms | p95 {report['llm_p95_ms']} ms")
+        print(f"💾 saved per fast decision: p50 {report['saved_p50_ms']} ms | "
+              f"p95 {report['saved_p95_ms']} ms")
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--margins", type=float, nargs="+",
+                        default=[0.0, 0.02, 0.04, 0.08, 0.12, 0.16])
+    parser.add_argument("--measure-llm", action="store_true")
+    parser.add_argument("--json", action="store_true")
+    asyncio.run(main(parser.parse_args()))
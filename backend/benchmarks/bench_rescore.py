@@ -0,0 +1,165 @@
+"""
+Micro-benchmark of the rescoring step of retrieve() (metadata boosting of
+the vector candidates), before and after precomputed lexical features.
+
+  legacy  : the old per-candidate loop, lowercasing every candidate's text
+            and substring-searching it once per router keyword
+  rescore : retriever.rescore(), set intersection against the lex_terms /
+            topic_terms stored on the payload at ingestion
+
+Candidates are drawn from the passages of both books (as the vector store
+returns them); --chunk-level uses whole chunks instead, the worst case of
+payloads carrying full chapter text. Router topics/keywords come from the
+labelled questions in data/eval/retrieval_questions.json.
+
+    python -m benchmarks.bench_rescore --candidates 3 9 30 100
+    python -m benchmarks.bench_rescore --chunk-level --json
+"""
+import argparse
+import json
+import random
+import time
+from pathlib import Path
+
+import numpy as np
+
+QUESTIONS_FILE = Path(__file__).resolve().parent.parent / "data" / "eval" / "retrieval_questions.json"
+
+BOOK_FILES = {
+    "God Speaks": "god_speaks_normalized_chunks.json",
+    "Life Eternal": "life_eternal_normalized_chunks.json",
+}
+
+
+def pct_us(values, q):
+    return round(float(np.percentile(values, q)) * 1e6, 1) if values else None
+
+
+def legacy_rescore(payloads, vector_scores, router_topics, router_keywords, config):
+    """
+    The boosting loop retrieve() used before lex_terms / topic_terms.
+    """
+    ranked = []
+    for vector_score, payload in zip(vector_scores, payloads):
+        topic_boost = 0.0
+        keyword_boost = 0.0
+        speaker_boost = 0.0
+
+        payload_topic = (payload.get("topic") or "").lower()
+        text = payload.get("text", "").lower()
+
+        for topic in router_topics:
+            if topic.lower() in payload_topic:
+                topic_boost = config.topic_boost
+
+        for keyword in router_keywords:
+            if keyword.lower() in text:
+                keyword_boost += config.keyword_boost
+
+        keyword_boost = min(keyword_boost, config.keyword_boost_cap)
+
+        if payload.get("speaker") == "Meher Baba":
+            speaker_boost = config.speaker_boost
+
+        final_score = config.vector_weight * vector_score + topic_boost + keyword_boost + speaker_boost
+        ranked.append((final_score, payload))
+
+    ranked.sort(key=lambda x: x[0], reverse=True)
+    return [payload for _, payload in ranked]
+
+
+def new_rescore(payloads, vector_scores, router_topics, router_keywords, config):
+    from app.retrieval.retriever import rescore
+
+    scores = rescore(payloads, vector_scores, router_topics, router_keywords, config)
+    order = np.argsort(-scores["final_score"], kind="stable")
+    return [payloads[i] for i in order]
+
+
+def load_payloads(chunk_level: bool):
+    from app.config import NORMALIZED_DIR
+    from app.ingestion.passages import build_passages, topic_labels
+    from app.retrieval.lexical import term_set
+
+    payloads = []
+    for book, name in BOOK_FILES.items():
+        with open(NORMALIZED_DIR / name, "r", encoding="utf-8") as f:
+            chunks = json.load(f)
+        for chunk in chunks:
+            if not chunk.get("id") or not chunk.get("text"):
+                continue
+            if chunk_level:
+                labels = topic_labels(chunk)
+                payloads.append({
+                    **chunk,
+                    "speaker": "Meher Baba",
+                    "topic_labels": labels,
+                    "topic_terms": term_set(" ".join(labels)),
+                    "lex_terms": term_set(chunk["text"]),
+                })
+            else:
+                payloads.extend(build_passages(chunk))
+    return payloads
+
+
+def time_call(fn, repeat: int):
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return min(samples)
+
+
+def main(args):
+    from app.retrieval.retriever import DEFAULT_CONFIG
+
+    with open(QUESTIONS_FILE, "r", encoding="utf-8") as f:
+        questions = json.load(f)
+
+    payloads = load_payloads(args.chunk_level)
+    chars = np.mean([len(p.get("text", "")) for p in payloads])
+    print(f"📚 {len(payloads)} {'chunks' if args.chunk_level else 'passages'}, "
+          f"mean {chars:.0f} chars | {len(questions)} router decisions\n")
+
+    rng = random.Random(args.seed)
+
+    print(f"{'cands':>6} {'legacy p50':>11} {'legacy p95':>11} {'new p50':>9} {'new p95':>9} {'speedup':>8}")
+    rows = []
+    for n in args.candidates:
+        legacy, new = [], []
+        for _ in range(args.rounds):
+            q = rng.choice(questions)
+            sample = rng.sample(payloads, min(n, len(payloads)))
+            scores = sorted((rng.uniform(0.2, 0.8) for _ in sample), reverse=True)
+            call = (sample, scores, q.get("topics", []), q.get("keywords", []), DEFAULT_CONFIG)
+
+            legacy.append(time_call(lambda: legacy_rescore(*call), args.repeat))
+            new.append(time_call(lambda: new_rescore(*call), args.repeat))
+
+        row = {
+            "candidates": n,
+            "legacy_p50_us": pct_us(legacy, 50),
+            "legacy_p95_us": pct_us(legacy, 95),
+            "new_p50_us": pct_us(new, 50),
+            "new_p95_us": pct_us(new, 95),
+        }
+        row["speedup_p50"] = round(row["legacy_p50_us"] / row["new_p50_us"], 2)
+        rows.append(row)
+        print(f"{n:>6} {row['legacy_p50_us']:>11} {row['legacy_p95_us']:>11} "
+              f"{row['new_p50_us']:>9} {row['new_p95_us']:>9} {row['speedup_p50']:>7}x")
+
+    if args.json:
+        print(json.dumps({"chunk_level": args.chunk_level, "rows": rows}, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--candidates", type=int, nargs="+", default=[3, 9, 30, 100])
+    parser.add_argument("--rounds", type=int, default=200, help="Router decisions per candidate count")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed calls per round (min is kept)")
+    parser.add_argument("--chunk-level", action="store_true", help="Whole chunks instead of passages")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true")
+    main(parser.parse_args())
@@ -0,0 +1,149 @@
+"""
+Sequential vs speculative retrieval (SPECULATIVE_RETRIEVAL) for the
+routing + retrieval stages of /ask, against the local Ollama stub.
+
+  sequential  : router LLM → embed → vector search → rescore
+  speculative : embed + search of both books run while the router LLM is
+                in flight; the routed book's candidates are rescored
+
+Every labelled question in data/eval/retrieval_questions.json goes
+through main.route_and_retrieve() once per mode (alternating), with the router cache
+and the fast router disabled so each question really waits on the
+router LLM (the stub answers with the labelled decision after
+--router-latency). The embedding cache is cleared before every call.
+
+Reported per mode: wall-clock p50/p95 of routing + retrieval, the
+embed + search time hidden behind routing, vector searches per request
+(the extra vector store load), and recall of the expected chunks, plus
+how often both modes return the same hits.
+
+    VECTOR_STORE=embedded python -m app.ingestion.ingest_books   # once
+    python -m benchmarks.bench_speculative --router-latency lognormal:300,0.4
+    VECTOR_STORE=qdrant python -m benchmarks.bench_speculative --json
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+
+QUESTIONS_FILE = Path(__file__).resolve().parent.parent / "data" / "eval" / "retrieval_questions.json"
+
+
+def pct(values, q):
+    return round(float(np.percentile(values, q)), 1) if values else None
+
+
+async def run_one(api, q, speculative: bool, store_calls: list) -> dict:
+    from app.retrieval.embedding import embedding_service
+
+    api.SPECULATIVE_RETRIEVAL = speculative
+    embedding_service.clear()
+    timings: dict = {}
+    calls_before = len(store_calls)
+
+    t0 = time.perf_counter()
+    routed = await api.route_and_retrieve(q["question"], timings)
+    wall_ms = (time.perf_counter() - t0) * 1000
+
+    # Let cancelled speculative searches finish unwinding before counting
+    await asyncio.sleep(0)
+    hits = [f"{h.get('chunk_id')}#{h.get('passage_index')}" for h in routed.get("chunks", [])]
+    return {
+        "wall_ms": wall_ms,
+        "routing_ms": timings.get("routing_ms", 0.0),
+        "saved_ms": timings.get("speculation_saved_ms", 0.0),
+        "searches": len(store_calls) - calls_before,
+        "hits": hits,
+        "found": bool(set(q.get("expected_chunk_ids", [])) & {h.split("#")[0] for h in hits}),
+    }
+
+
+def summarize(mode: str, rows) -> dict:
+    return {
+        "mode": mode,
+        "wall_p50_ms": pct([r["wall_ms"] for r in rows], 50),
+        "wall_p95_ms": pct([r["wall_ms"] for r in rows], 95),
+        "after_routing_p50_ms": pct([r["wall_ms"] - r["routing_ms"] for r in rows], 50),
+        "hidden_p50_ms": pct([r["saved_ms"] for r in rows], 50),
+        "searches_per_request": round(float(np.mean([r["searches"] for r in rows])), 2),
+        "recall": round(float(np.mean([r["found"] for r in rows])), 3),
+    }
+
+
+async def main(args):
+    os.environ["OLLAMA_URL"] = f"http://127.0.0.1:{args.port}/api/chat"
+    os.environ["FAST_ROUTER_ENABLED"] = "false"
+    os.environ["ROUTER_CACHE_ENABLED"] = "false"
+
+    from benchmarks.stub_ollama import StubServer, load_corpus_decisions, stub_options
+    import app.main as api
+    from app.retrieval.stores import get_vector_store
+
+    with open(QUESTIONS_FILE, "r", encoding="utf-8") as f:
+        questions = json.load(f)
+
+    # Count vector store searches (sequential and speculative both go
+    # through the shared store)
+    store = get_vector_store()
+    store_calls = []
+    search = store.search
+
+    async def counted_search(*a, **kw):
+        store_calls.append(a[0] if a else kw.get("collection"))
+        return await search(*a, **kw)
+
+    store.search = counted_search
+
+    options = stub_options(args)
+    options["decisions"] = options["decisions"] or load_corpus_decisions(str(QUESTIONS_FILE))
+
+    with StubServer(args.port, args.latency_ms, **options):
+        # Load the embedding model and open both collections first
+        await api.route_and_retrieve(questions[0]["question"], {})
+
+        # Modes alternate per question, so both see the same router latency
+        # distribution and the same warm caches
+        results = {"sequential": [], "speculative": []}
+        for _ in range(args.repeat):
+            for q in questions:
+                for mode in results:
+                    results[mode].append(await run_one(api, q, mode == "speculative", store_calls))
+
+        await api.close_http_session()
+
+    summaries = [summarize(mode, rows) for mode, rows in results.items()]
+    same = np.mean([a["hits"] == b["hits"] for a, b in zip(results["sequential"], results["speculative"])])
+
+    print(f"\n📚 {len(questions)} questions × {args.repeat}, store {store.name}\n")
+    print(f"{'mode':>12} {'wall p50':>9} {'wall p95':>9} {'after routing':>14} {'hidden p50':>11} "
+          f"{'searches/req':>13} {'recall':>7}")
+    for s in summaries:
+        print(f"{s['mode']:>12} {s['wall_p50_ms']:>9} {s['wall_p95_ms']:>9} {s['after_routing_p50_ms']:>14} "
+              f"{s['hidden_p50_ms']:>11} {s['searches_per_request']:>13} {s['recall']:>7}")
+
+    # Routing time is the same in both modes; the saving is what is left
+    # of retrieval once the router has answered
+    saving = summaries[0]["after_routing_p50_ms"] - summaries[1]["after_routing_p50_ms"]
+    print(f"\n⏱️ saving after routing p50: {saving:.1f} ms | "
+          f"extra vector searches: {summaries[1]['searches_per_request'] - summaries[0]['searches_per_request']:.2f}/request | "
+          f"same hits in both modes: {same:.0%}")
+
+    if args.json:
+        print(json.dumps({"modes": summaries, "same_hits": round(float(same), 3),
+                          "saving_p50_ms": round(saving, 1)}, indent=2))
+
+
+if __name__ == "__main__":
+    from benchmarks.stub_ollama import add_stub_arguments
+
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=11500)
+    add_stub_arguments(parser)
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--json", action="store_true")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,137 @@
+"""
+Import-time and cold-start budget for the API.
+
+Every measurement runs in a fresh interpreter:
+  - import_ms      `import app.main` (median of --runs)
+  - cold_start_ms  import + embedding model load + first encode
+It also checks that importing app.main does not pull in the heavy,
+lazily-initialized dependencies (torch, sentence_transformers,
+qdrant_client, google.genai).
+
+Exits with status 1 when a budget in startup_budget.json is exceeded, so
+it can gate CI.
+
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --skip-cold-start
+    python -m benchmarks.bench_startup --write-budget   # re-baseline
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+BUDGET_FILE = Path(__file__).with_name("startup_budget.json")
+
+# Baseline × headroom when re-baselining with --write-budget
+HEADROOM = 1.5
+
+IMPORT_PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - t0
+print(json.dumps({
+    "import_ms": round(elapsed * 1000, 1),
+    "modules": sorted(sys.modules),
+}))
+"""
+
+COLD_START_PROBE = """
+import json, time
+t0 = time.perf_counter()
+import app.main
+from app.retrieval.embedding import embedding_service
+embedding_service.embed_many(["cold start"], use_cache=False)
+print(json.dumps({"cold_start_ms": round((time.perf_counter() - t0) * 1000, 1)}))
+"""
+
+
+def run_probe(code: str) -> dict:
+    proc = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True, text=True,
+        cwd=Path(__file__).resolve().parent.parent
+    )
+    if proc.returncode != 0:
+        tail = "\n".join(proc.stderr.strip().splitlines()[-5:])
+        raise SystemExit(f"❌ probe failed:\n{tail}")
+
+    # Last line is the JSON; anything before is app output
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def measure(runs: int, cold_start: bool) -> dict:
+    imports = [run_probe(IMPORT_PROBE) for _ in range(runs)]
+    modules = set(imports[-1]["modules"])
+
+    result = {
+        "import_ms": statistics.median(p["import_ms"] for p in imports),
+        "import_runs_ms": [p["import_ms"] for p in imports],
+        "modules": modules,
+    }
+
+    if cold_start:
+        colds = [run_probe(COLD_START_PROBE)["cold_start_ms"] for _ in range(runs)]
+        result["cold_start_ms"] = statistics.median(colds)
+        result["cold_start_runs_ms"] = colds
+
+    return result
+
+
+def check(result: dict, budget: dict) -> list:
+    failures = []
+
+    if result["import_ms"] > budget["import_ms"]:
+        failures.append(f"import_ms {result['import_ms']} > budget {budget['import_ms']}")
+
+    if "cold_start_ms" in result and result["cold_start_ms"] > budget["cold_start_ms"]:
+        failures.append(
+            f"cold_start_ms {result['cold_start_ms']} > budget {budget['cold_start_ms']}"
+        )
+
+    for name in budget["forbidden_modules"]:
+        if name in result["modules"]:
+            failures.append(f"`import app.main` loads {name}")
+
+    return failures
+
+
+def main(args):
+    budget = json.loads(BUDGET_FILE.read_text())
+    result = measure(args.runs, cold_start=not args.skip_cold_start)
+
+    print(f"⏱️  import app.main: {result['import_ms']} ms  (runs: {result['import_runs_ms']})")
+    if "cold_start_ms" in result:
+        print(f"🧊 cold start:      {result['cold_start_ms']} ms  "
+              f"(runs: {result['cold_start_runs_ms']})")
+
+    if args.write_budget:
+        budget["import_ms"] = round(result["import_ms"] * HEADROOM)
+        if "cold_start_ms" in result:
+            budget["cold_start_ms"] = round(result["cold_start_ms"] * HEADROOM)
+        BUDGET_FILE.write_text(json.dumps(budget, indent=2) + "\n")
+        print(f"📝 budget written to {BUDGET_FILE.name}: {budget}")
+        return 0
+
+    failures = check(result, budget)
+    for failure in failures:
+        print(f"❌ {failure}")
+
+    if failures:
+        return 1
+
+    print(f"✅ within budget {budget}")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--skip-cold-start", action="store_true",
+                        help="Only measure imports (no model download/load)")
+    parser.add_argument("--write-budget", action="store_true",
+                        help=f"Re-baseline budgets at {HEADROOM}x the measured values")
+    sys.exit(main(parser.parse_args()))
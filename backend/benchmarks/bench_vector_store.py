@@ -0,0 +1,129 @@
+"""
+Vector store comparison: Qdrant server vs embedded exact search.
+
+For every book, each labelled router question is embedded once and then
+searched against:
+  - embedded float32  (the index built by VECTOR_STORE=embedded ingestion)
+  - embedded float16  (a temporary float16 copy of the same index)
+  - qdrant            (skipped when the server is unreachable)
+Reports p50/p95/p99 search latency including payload loading, matrix size
+on disk, and top-k overlap with exact float32 search (for Qdrant this is
+the HNSW recall).
+
+    python -m benchmarks.bench_vector_store --limit 9 --repeat 20
+"""
+import argparse
+import asyncio
+import json
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+
+def pct_ms(values, q):
+    return round(float(np.percentile(values, q)) * 1000, 3) if values else None
+
+
+def float16_copy(collection: str, root: Path):
+    from app.retrieval.stores import EmbeddedStore, write_embedded_collection
+
+    source = EmbeddedStore().collection(collection)
+    payloads = [source.payload(i) for i in range(len(source.rows))]
+    write_embedded_collection(
+        collection,
+        np.asarray(source.vectors, dtype=np.float32),
+        payloads,
+        [r["text_hash"] for r in source.rows],
+        dtype="float16",
+        root=root
+    )
+
+
+async def measure(store, collection, vectors, limit, repeat):
+    latencies = []
+    results = []
+    for vector in vectors:
+        for i in range(repeat):
+            t0 = time.perf_counter()
+            hits = await store.search(collection, vector, limit, 0.0)
+            latencies.append(time.perf_counter() - t0)
+        results.append([p.get("passage_id") for _, p in hits])
+    return latencies, results
+
+
+async def main(args):
+    from app.config import EMBEDDED_DIR
+    from app.retrieval.embedding import encode_batch
+    from app.retrieval.retriever import BOOK_COLLECTION_MAP
+    from app.retrieval.stores import EmbeddedStore, QdrantStore, current_build_path
+    from app.routing.prototypes import load_router_examples
+
+    examples = load_router_examples()
+    report = []
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        stores = {
+            "embedded-f32": EmbeddedStore(),
+            "embedded-f16": EmbeddedStore(root=tmp),
+            "qdrant": QdrantStore(),
+        }
+
+        for book, collection in BOOK_COLLECTION_MAP.items():
+            questions = [ex["question"] for ex in examples if ex.get("book") == book]
+            if not questions:
+                continue
+            vectors = encode_batch(questions)
+            float16_copy(collection, tmp)
+
+            exact = None
+            for name, store in stores.items():
+                try:
+                    await store.ping() if name == "qdrant" else store.collection(collection)
+                except Exception as e:
+                    print(f"⏭️  {name}: {type(e).__name__}: {e}")
+                    continue
+
+                latencies, results = await measure(store, collection, vectors, args.limit, args.repeat)
+                if exact is None:
+                    exact = results
+
+                overlap = np.mean([
+                    len(set(a) & set(b)) / max(len(a), 1) for a, b in zip(exact, results)
+                ])
+                row = {
+                    "book": book,
+                    "store": name,
+                    "queries": len(latencies),
+                    "p50_ms": pct_ms(latencies, 50),
+                    "p95_ms": pct_ms(latencies, 95),
+                    "p99_ms": pct_ms(latencies, 99),
+                    f"top{args.limit}_overlap": round(float(overlap), 4),
+                }
+                if name.startswith("embedded"):
+                    root = tmp if name == "embedded-f16" else EMBEDDED_DIR
+                    matrix = current_build_path(root / collection) / "vectors.npy"
+                    row["matrix_mb"] = round(matrix.stat().st_size / 1e6, 2)
+                report.append(row)
+
+        await stores["qdrant"].close()
+
+    header = ["book", "store", "queries", "p50_ms", "p95_ms", "p99_ms",
+              f"top{args.limit}_overlap", "matrix_mb"]
+    print("  ".join(f"{h:>14}" for h in header))
+    for row in report:
+        print("  ".join(f"{str(row.get(h, '-')):>14}" for h in header))
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--limit", type=int, default=9, help="Hits per search")
+    parser.add_argument("--repeat", type=int, default=20, help="Searches per question")
+    parser.add_argument("--json", action="store_true")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,253 @@
+"""
+Retrieval quality vs latency over a grid of retriever configurations.
+
+Every labelled question in data/eval/retrieval_questions.json is sent
+through retrieve() with the router topics/keywords stored next to it, once
+per configuration. A question counts as found when one of its
+expected_chunk_ids comes back. Per configuration it reports:
+  - recall@1 and recall@k (k = top_k): share of questions with an expected
+    chunk among the first 1 / k hits
+  - MRR: mean of 1 / rank of the first expected hit (0 when missed)
+  - p50/p95/p99 latency of each retrieve() stage and of the whole call
+The embedding and rerank caches are cleared before every call (unless
+--warm-cache), so embed_ms and rerank_ms are real forward passes.
+
+With --rerank on off and several --rerank-candidates, the table shows
+the latency the cross-encoder adds per candidate count next to the
+recall/MRR it buys. Set --rerank-budget-ms high to measure the model
+itself rather than the budget fallback.
+
+Results go to stdout as a table and, with --out, to a JSON file that also
+records the commit, store and model, so runs can be diffed over time.
+
+    python -m benchmarks.eval_retrieval --top-k 1 3 5 --threshold 0.1 0.2
+    python -m benchmarks.eval_retrieval --vector-weight 0.8 1.0 --boost-scale 0 1 \\
+        --lexical on off --out eval_runs/$(date +%F).json
+    python -m benchmarks.eval_retrieval --top-k 1 3 --rerank off on \\
+        --rerank-candidates 10 20 40 --rerank-budget-ms 10000
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import subprocess
+import time
+from pathlib import Path
+
+import numpy as np
+
+QUESTIONS_FILE = Path(__file__).resolve().parent.parent / "data" / "eval" / "retrieval_questions.json"
+
+STAGES = ["embed_ms", "lexical_ms", "vector_search_ms", "rescore_ms", "rerank_ms", "select_ms", "total_ms"]
+
+
+def pct(values, q):
+    return round(float(np.percentile(values, q)), 3) if values else None
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_questions(path: Path, books):
+    with open(path, "r", encoding="utf-8") as f:
+        questions = json.load(f)
+    if books:
+        questions = [q for q in questions if q["book"] in books]
+    return questions
+
+
+def first_relevant_rank(hits, expected):
+    for rank, hit in enumerate(hits, 1):
+        if hit.get("chunk_id") in expected:
+            return rank
+    return None
+
+
+def build_grid(args):
+    """
+    One entry per combination: retrieve() arguments plus RetrievalConfig
+    overrides. --boost-scale multiplies all three metadata boosts (and the
+    keyword cap), so 0 switches boosting off. Candidate counts only vary
+    for rerank=on.
+    """
+    grid = []
+    for top_k, threshold, neighbors, weight, scale, lexical, rerank in itertools.product(
+        args.top_k, args.threshold, args.neighbors,
+        args.vector_weight, args.boost_scale, args.lexical, args.rerank
+    ):
+        for candidates in (args.rerank_candidates if rerank == "on" else [0]):
+            grid.append({
+                "top_k": top_k,
+                "threshold": threshold,
+                "neighbors": neighbors,
+                "config": {
+                    "vector_weight": weight,
+                    "topic_boost": round(0.10 * scale, 4),
+                    "keyword_boost": round(0.05 * scale, 4),
+                    "keyword_boost_cap": round(0.15 * scale, 4),
+                    "speaker_boost": round(0.05 * scale, 4),
+                    "lexical": lexical == "on",
+                    "rerank": rerank == "on",
+                    "rerank_candidates": candidates,
+                    "rerank_budget_ms": args.rerank_budget_ms,
+                },
+                "boost_scale": scale,
+            })
+    return grid
+
+
+async def evaluate(entry, questions, args):
+    from app.retrieval.embedding import embedding_service
+    from app.retrieval.rerank import reranker
+    from app.retrieval.retriever import DEFAULT_CONFIG, retrieve
+
+    config = DEFAULT_CONFIG.replace(**entry["config"])
+    stages = {stage: [] for stage in STAGES}
+    found_at_1 = found_at_k = 0
+    reciprocal_ranks = []
+    misses = []
+
+    for q in questions:
+        expected = set(q["expected_chunk_ids"])
+        for i in range(args.repeat):
+            if not args.warm_cache:
+                embedding_service.clear()
+                reranker.clear()
+
+            timings = {}
+            t0 = time.perf_counter()
+            hits = await retrieve(
+                book=q["book"],
+                query=q["question"],
+                router_topics=q.get("topics"),
+                router_keywords=q.get("keywords"),
+                top_k=entry["top_k"],
+                threshold=entry["threshold"],
+                neighbors=entry["neighbors"],
+                config=config,
+                timings=timings
+            )
+            timings["total_ms"] = (time.perf_counter() - t0) * 1000
+
+            for stage in STAGES:
+                if stage in timings:
+                    stages[stage].append(timings[stage])
+
+        # Quality from the last run (retrieval is deterministic)
+        rank = first_relevant_rank(hits, expected)
+        found_at_1 += rank == 1
+        found_at_k += rank is not None
+        reciprocal_ranks.append(1.0 / rank if rank else 0.0)
+        if rank is None:
+            misses.append(q["question"])
+
+    n = len(questions)
+    return {
+        "top_k": entry["top_k"],
+        "threshold": entry["threshold"],
+        "neighbors": entry["neighbors"],
+        "boost_scale": entry["boost_scale"],
+        "config": config.as_dict(),
+        "questions": n,
+        "recall_at_1": round(found_at_1 / n, 4),
+        "recall_at_k": round(found_at_k / n, 4),
+        "mrr": round(float(np.mean(reciprocal_ranks)), 4),
+        "latency_ms": {
+            stage: {"p50": pct(v, 50), "p95": pct(v, 95), "p99": pct(v, 99)}
+            for stage, v in stages.items() if v
+        },
+        "misses": misses,
+    }
+
+
+async def main(args):
+    from app.config import EMBED_BACKEND, LOCAL_EMBED_MODEL, VECTOR_STORE
+    from app.retrieval.retriever import retrieve
+    from app.retrieval.stores import close_vector_store
+
+    questions = load_questions(Path(args.questions), args.books)
+    if not questions:
+        raise SystemExit(f"No labelled questions in {args.questions}")
+
+    # Load the model, the vector collections and the BM25 indexes first,
+    # so one-off loading does not land in the percentiles
+    for book in sorted({q["book"] for q in questions}):
+        await retrieve(book=book, query="warmup", top_k=1)
+
+    grid = build_grid(args)
+    print(f"🧪 {len(questions)} questions × {len(grid)} configurations × {args.repeat} runs")
+
+    results = []
+    for entry in grid:
+        results.append(await evaluate(entry, questions, args))
+
+    await close_vector_store()
+
+    header = ["top_k", "threshold", "neighbors", "vec_w", "boost", "lexical", "rerank",
+              "R@1", "R@k", "MRR", "p50_ms", "p95_ms", "p99_ms", "rerank_p50"]
+    print("  ".join(f"{h:>9}" for h in header))
+    for r in results:
+        total = r["latency_ms"]["total_ms"]
+        config = r["config"]
+        row = [r["top_k"], r["threshold"], r["neighbors"], config["vector_weight"],
+               r["boost_scale"], "on" if config["lexical"] else "off",
+               config["rerank_candidates"] if config["rerank"] else "off",
+               r["recall_at_1"], r["recall_at_k"], r["mrr"],
+               total["p50"], total["p95"], total["p99"],
+               r["latency_ms"].get("rerank_ms", {}).get("p50", "-")]
+        print("  ".join(f"{str(v):>9}" for v in row))
+
+    report = {
+        "run": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "commit": git_commit(),
+            "vector_store": VECTOR_STORE,
+            "embed_model": LOCAL_EMBED_MODEL,
+            "embed_backend": EMBED_BACKEND,
+            "questions_file": str(args.questions),
+            "questions": len(questions),
+            "repeat": args.repeat,
+            "warm_cache": args.warm_cache,
+        },
+        "results": results,
+    }
+
+    if args.out:
+        out = Path(args.out)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        out.write_text(json.dumps(report, indent=2) + "\n")
+        print(f"💾 Wrote {out}")
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", default=str(QUESTIONS_FILE))
+    parser.add_argument("--books", nargs="+", help="Only evaluate these books")
+    parser.add_argument("--top-k", type=int, nargs="+", default=[1, 3, 5])
+    parser.add_argument("--threshold", type=float, nargs="+", default=[0.2])
+    parser.add_argument("--neighbors", type=int, nargs="+", default=[0])
+    parser.add_argument("--vector-weight", type=float, nargs="+", default=[0.8])
+    parser.add_argument("--boost-scale", type=float, nargs="+", default=[1.0],
+                        help="Multiplier on the topic/keyword/speaker boosts")
+    parser.add_argument("--lexical", choices=["on", "off"], nargs="+", default=["on"])
+    parser.add_argument("--rerank", choices=["on", "off"], nargs="+", default=["off"])
+    parser.add_argument("--rerank-candidates", type=int, nargs="+", default=[20],
+                        help="Cross-encoder pool sizes (rerank=on only)")
+    parser.add_argument("--rerank-budget-ms", type=float, default=10000.0)
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per question (latency samples)")
+    parser.add_argument("--warm-cache", action="store_true",
+                        help="Keep the embedding cache between runs")
+    parser.add_argument("--out", help="Write the JSON report to this file")
+    parser.add_argument("--json", action="store_true")
+    asyncio.run(main(parser.parse_args()))
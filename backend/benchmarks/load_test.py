@@ -0,0 +1,318 @@
+"""
+End-to-end load test of /ask (or /ask/stream) against the Ollama stub.
+
+Starts benchmarks.stub_ollama on a background thread, points OLLAMA_URL at
+it and replays a question corpus against the FastAPI app, either
+in-process (default) or against a running server (--base-url; start it
+with OLLAMA_URL pointing at the stub port).
+
+Two load shapes, each run for --requests requests per level:
+  --concurrency 1 10 50   closed loop: N clients, each sends its next
+                          question as soon as the previous one returns
+  --rate 5 20 50          open loop: Poisson arrivals at R req/s; latency
+                          is measured from the scheduled arrival, so
+                          queueing inside the app is counted
+
+Per level it reports throughput, error rate (HTTP errors, invalid router
+JSON, exceptions, fallback answers) and p50/p95/p99 of the total and of
+each stage the app reports in "timings": routing, embedding, lexical,
+vector search (Qdrant or the embedded store) and generation.
+
+The router cache, answer cache and fast router are switched off so every
+question reaches the stub (--keep-caches to leave them as configured).
+
+    python -m benchmarks.load_test --concurrency 1 10 50 --requests 200
+    python -m benchmarks.load_test --rate 10 40 --endpoint stream \\
+        --router-latency lognormal:300,0.4 --explainer-latency uniform:800-2000 \\
+        --invalid-json-rate 0.02 --token-ms 10 --out load_runs/latest.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import time
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks.stub_ollama import add_stub_arguments, stub_options
+
+CORPUS_FILE = Path(__file__).resolve().parent.parent / "data" / "eval" / "retrieval_questions.json"
+
+STAGES = ["routing_ms", "embed_ms", "lexical_ms", "vector_search_ms",
+          "retrieval_ms", "generation_ms", "first_token_ms", "total_ms"]
+
+FALLBACK_MARKER = "has not spoken directly on this question"
+
+
+def pct(values, q):
+    return round(float(np.percentile(values, q)), 1) if values else None
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# =================================================
+# ONE REQUEST
+# =================================================
+
+def _parse_sse(body: str):
+    """
+    (event, data) pairs of a complete SSE response body.
+    """
+    events = []
+    for block in body.split("\n\n"):
+        event, data = None, None
+        for line in block.splitlines():
+            if line.startswith("event: "):
+                event = line[7:]
+            elif line.startswith("data: "):
+                data = json.loads(line[6:])
+        if event:
+            events.append((event, data))
+    return events
+
+
+async def ask(client, endpoint: str, question: str) -> dict:
+    """
+    {"ok", "error", "timings"} for one question. Errors are classified so
+    the report can tell the stub's invalid JSON apart from real failures.
+    """
+    path = "/ask/stream" if endpoint == "stream" else "/ask"
+    try:
+        r = await client.post(path, params={"question": question})
+    except Exception as e:
+        return {"ok": False, "error": f"exception:{type(e).__name__}", "timings": {}}
+
+    if r.status_code != 200:
+        return {"ok": False, "error": f"http_{r.status_code}", "timings": {}}
+
+    if endpoint == "stream":
+        events = _parse_sse(r.text)
+        data = dict(events)
+        if "error" in data:
+            body = data["error"]
+        else:
+            answer = "".join(d.get("text", "") for e, d in events if e == "token")
+            body = {"answer": answer, **data.get("done", {})}
+    else:
+        body = r.json()
+
+    timings = body.get("timings", {})
+    if "error" in body:
+        kind = "router_invalid_json" if "JSON" in body["error"] else "app_error"
+        return {"ok": False, "error": kind, "timings": timings}
+    if FALLBACK_MARKER in (body.get("answer") or ""):
+        return {"ok": False, "error": "fallback_answer", "timings": timings}
+
+    return {"ok": True, "error": None, "timings": timings}
+
+
+# =================================================
+# LOAD SHAPES
+# =================================================
+
+async def closed_loop(client, args, questions, concurrency: int):
+    queue = list(questions)
+    results = []
+
+    async def worker():
+        while queue:
+            question = queue.pop()
+            t0 = time.perf_counter()
+            result = await ask(client, args.endpoint, question)
+            result["latency_ms"] = (time.perf_counter() - t0) * 1000
+            results.append(result)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return results
+
+
+async def open_loop(client, args, questions, rate: float):
+    rng = random.Random(args.seed)
+    start = time.perf_counter()
+
+    async def one(question, scheduled):
+        delay = scheduled - (time.perf_counter() - start)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        result = await ask(client, args.endpoint, question)
+        result["latency_ms"] = (time.perf_counter() - start - scheduled) * 1000
+        return result
+
+    tasks = []
+    at = 0.0
+    for question in questions:
+        at += rng.expovariate(rate)
+        tasks.append(one(question, at))
+
+    return await asyncio.gather(*tasks)
+
+
+def summarize(shape: str, level: float, results, wall: float, stub_stats: dict) -> dict:
+    errors = {}
+    for r in results:
+        if not r["ok"]:
+            errors[r["error"]] = errors.get(r["error"], 0) + 1
+
+    ok = [r for r in results if r["ok"]]
+    stages = {"latency_ms": [r["latency_ms"] for r in ok]}
+    for stage in STAGES:
+        values = [r["timings"][stage] for r in ok if stage in r["timings"]]
+        if values:
+            stages[stage] = values
+
+    return {
+        "shape": shape,
+        "level": level,
+        "requests": len(results),
+        "wall_s": round(wall, 3),
+        "throughput_rps": round(len(results) / wall, 2) if wall else None,
+        "ok_rps": round(len(ok) / wall, 2) if wall else None,
+        "error_rate": round(1 - len(ok) / len(results), 4) if results else None,
+        "errors": errors,
+        "stages": {
+            stage: {"p50": pct(v, 50), "p95": pct(v, 95), "p99": pct(v, 99)}
+            for stage, v in stages.items()
+        },
+        "stub": stub_stats,
+    }
+
+
+def print_row(row: dict):
+    s = row["stages"]
+
+    def p(stage, q):
+        return s.get(stage, {}).get(q, "-")
+
+    print(f"{row['shape']:>6} {row['level']:>6} {row['requests']:>6} "
+          f"{row['throughput_rps']:>8} {row['error_rate']:>7} "
+          f"{p('latency_ms', 'p50'):>8} {p('latency_ms', 'p95'):>8} {p('latency_ms', 'p99'):>8} "
+          f"{p('routing_ms', 'p95'):>8} {p('embed_ms', 'p95'):>8} "
+          f"{p('vector_search_ms', 'p95'):>8} {p('generation_ms', 'p95'):>8}")
+
+
+# =================================================
+# MAIN
+# =================================================
+
+async def main(args):
+    os.environ["OLLAMA_URL"] = f"http://127.0.0.1:{args.port}/api/chat"
+    if not args.keep_caches:
+        for flag in ("ROUTER_CACHE_ENABLED", "ANSWER_CACHE_ENABLED", "FAST_ROUTER_ENABLED"):
+            os.environ[flag] = "false"
+
+    import httpx
+    from benchmarks.stub_ollama import StubServer
+
+    with open(args.corpus, "r", encoding="utf-8") as f:
+        corpus = [q["question"] for q in json.load(f)]
+
+    rng = random.Random(args.seed)
+
+    if args.base_url:
+        transport = None
+        base_url = args.base_url
+        api = None
+    else:
+        import app.main as api
+        transport = httpx.ASGITransport(app=api.app)
+        base_url = "http://api"
+
+    levels = [("closed", c) for c in args.concurrency or []] + \
+             [("open", r) for r in args.rate or []]
+    if not levels:
+        levels = [("closed", 10)]
+
+    report = []
+    with StubServer(args.port, args.latency_ms, **stub_options(args)) as stub:
+        async with httpx.AsyncClient(
+            transport=transport, base_url=base_url, timeout=args.timeout
+        ) as client:
+            # Load the model and indexes before measuring
+            await ask(client, args.endpoint, corpus[0])
+
+            print(f"{'shape':>6} {'level':>6} {'reqs':>6} {'req/s':>8} {'err':>7} "
+                  f"{'p50':>8} {'p95':>8} {'p99':>8} {'route95':>8} {'embed95':>8} "
+                  f"{'vec95':>8} {'gen95':>8}")
+
+            for shape, level in levels:
+                questions = [rng.choice(corpus) for _ in range(args.requests)]
+                stub.state.max_in_flight = 0
+                before = stub.state.as_dict()
+
+                t0 = time.perf_counter()
+                if shape == "closed":
+                    results = await closed_loop(client, args, questions, int(level))
+                else:
+                    results = await open_loop(client, args, questions, float(level))
+                wall = time.perf_counter() - t0
+
+                after = stub.state.as_dict()
+                stub_stats = {
+                    k: after[k] - before[k]
+                    for k in after if k not in ("in_flight", "max_in_flight")
+                }
+                stub_stats["max_in_flight"] = after["max_in_flight"]
+
+                row = summarize(shape, level, results, wall, stub_stats)
+                report.append(row)
+                print_row(row)
+
+        if api is not None:
+            await api.close_http_session()
+
+    output = {
+        "run": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "commit": git_commit(),
+            "endpoint": args.endpoint,
+            "target": args.base_url or "in-process",
+            "corpus": str(args.corpus),
+            "stub": {
+                "latency_ms": args.latency_ms,
+                "router_latency": args.router_latency.spec if args.router_latency else None,
+                "explainer_latency": args.explainer_latency.spec if args.explainer_latency else None,
+                "invalid_json_rate": args.invalid_json_rate,
+                "token_ms": args.token_ms,
+            },
+            "caches_enabled": args.keep_caches,
+        },
+        "levels": report,
+    }
+
+    if args.out:
+        out = Path(args.out)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        out.write_text(json.dumps(output, indent=2) + "\n")
+        print(f"💾 Wrote {out}")
+
+    if args.json:
+        print(json.dumps(output, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=11500, help="Stub port")
+    parser.add_argument("--base-url", help="Load a running server instead of the in-process app")
+    parser.add_argument("--endpoint", choices=["ask", "stream"], default="ask")
+    parser.add_argument("--concurrency", type=int, nargs="+", help="Closed-loop client counts")
+    parser.add_argument("--rate", type=float, nargs="+", help="Open-loop arrival rates (req/s)")
+    parser.add_argument("--requests", type=int, default=100, help="Requests per level")
+    parser.add_argument("--timeout", type=float, default=600)
+    parser.add_argument("--keep-caches", action="store_true")
+    parser.add_argument("--out", help="Write the JSON report to this file")
+    parser.add_argument("--json", action="store_true")
+    add_stub_arguments(parser)
+    parser.set_defaults(corpus=str(CORPUS_FILE), latency_ms=200.0)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,320 @@
+"""
+Ollama-compatible stub for benchmarks and load tests.
+
+Implements the subset of POST /api/chat used by the router
+(book_router.call_ollama) and the explainer (explainer.generate /
+generate_stream), plus GET /api/tags for the readiness check.
+
+Latency is drawn per call from a distribution, separately for router and
+explainer calls:
+    fixed:500          always 500 ms
+    uniform:200-800    uniform between 200 and 800 ms
+    lognormal:400,0.5  median 400 ms, sigma 0.5 (long right tail)
+    exp:300            exponential with mean 300 ms
+Router replies can be made invalid JSON at a given rate, and explainer
+calls with "stream": true are answered as NDJSON, one word per line,
+`--token-ms` apart, after the sampled first-token latency.
+
+With --corpus (a JSON list of {question, book, topics, keywords}, e.g.
+data/eval/retrieval_questions.json) the router answers each known
+question with its labelled decision, so retrieval hits both books.
+
+    python -m benchmarks.stub_ollama --port 11500 --latency-ms 500
+    python -m benchmarks.stub_ollama --router-latency lognormal:300,0.4 \\
+        --explainer-latency uniform:800-2000 --invalid-json-rate 0.02 --token-ms 15
+"""
+import argparse
+import asyncio
+import json
+import random
+import threading
+import time
+from typing import Dict, Optional
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+ROUTER_DECISION = {
+    "book": "Life Eternal",
+    "topics": ["Suffering"],
+    "keywords": ["suffering", "pain"]
+}
+
+EXPLAINER_ANSWER = (
+    "1) Baba's Words: \"Suffering is the price of love.\"\n"
+    "2) Simple Meaning: pain can deepen love.\n"
+    "3) How this helps: it gives meaning to what you are going through."
+)
+
+# What a small model emits when it ignores the output format
+INVALID_ROUTER_REPLIES = [
+    'Sure! Here is the routing decision: {"book": "Life Eternal"',
+    '{"book": "Life Eternal", "topics": ["Suffering"], "keywords": [',
+    "The best book for this question is Life Eternal.",
+]
+
+USER_PREFIX = "User question:\n"
+
+
+class Latency:
+    """
+    Per-call latency in ms, parsed from "kind:params" (see module doc).
+    """
+
+    KINDS = ("fixed", "uniform", "lognormal", "exp")
+
+    def __init__(self, spec: str):
+        kind, _, params = spec.partition(":")
+        if kind not in self.KINDS or not params:
+            raise ValueError(f"Bad latency {spec!r}, expected one of {self.KINDS} as kind:params")
+
+        self.spec = spec
+        self.kind = kind
+        if kind == "uniform":
+            low, high = params.split("-")
+            self.params = (float(low), float(high))
+        elif kind == "lognormal":
+            median, sigma = params.split(",")
+            self.params = (float(median), float(sigma))
+        else:
+            self.params = (float(params),)
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "fixed":
+            return self.params[0]
+        if self.kind == "uniform":
+            return rng.uniform(*self.params)
+        if self.kind == "lognormal":
+            median, sigma = self.params
+            return median * rng.lognormvariate(0.0, sigma)
+        return rng.expovariate(1.0 / self.params[0])
+
+
+def load_corpus_decisions(path: str) -> Dict[str, dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        corpus = json.load(f)
+    return {
+        q["question"]: {
+            "book": q["book"],
+            "topics": q.get("topics", []),
+            "keywords": q.get("keywords", []),
+        }
+        for q in corpus
+    }
+
+
+class StubState:
+    def __init__(
+        self,
+        latency_ms: float = 500.0,
+        router_latency: Optional[Latency] = None,
+        explainer_latency: Optional[Latency] = None,
+        invalid_json_rate: float = 0.0,
+        token_ms: float = 0.0,
+        decisions: Optional[Dict[str, dict]] = None,
+        seed: Optional[int] = None,
+    ):
+        self.latency_ms = latency_ms
+        self.router_latency = router_latency
+        self.explainer_latency = explainer_latency
+        self.invalid_json_rate = invalid_json_rate
+        self.token_ms = token_ms
+        self.decisions = decisions or {}
+        self.rng = random.Random(seed)
+
+        self.requests = 0
+        self.router_requests = 0
+        self.explainer_requests = 0
+        self.streams = 0
+        self.invalid_json = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def latency(self, is_router: bool) -> float:
+        model = self.router_latency if is_router else self.explainer_latency
+        return model.sample(self.rng) if model is not None else self.latency_ms
+
+    def router_reply(self, question: str) -> str:
+        if self.invalid_json_rate and self.rng.random() < self.invalid_json_rate:
+            self.invalid_json += 1
+            return self.rng.choice(INVALID_ROUTER_REPLIES)
+        return json.dumps(self.decisions.get(question, ROUTER_DECISION))
+
+    def as_dict(self):
+        return {
+            "requests": self.requests,
+            "router_requests": self.router_requests,
+            "explainer_requests": self.explainer_requests,
+            "streams": self.streams,
+            "invalid_json": self.invalid_json,
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+        }
+
+
+def _prompt_tokens(messages: list) -> int:
+    # Rough stand-in for the model's tokenizer (~4 characters per token)
+    return sum(len(m.get("content", "")) for m in messages) // 4
+
+
+def _message(
+    model: str,
+    content: str,
+    done: bool,
+    tokens: int = 0,
+    seconds: float = 0.0,
+    prompt_tokens: int = 0,
+    prompt_seconds: float = 0.0,
+) -> dict:
+    message = {
+        "model": model,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "message": {"role": "assistant", "content": content},
+        "done": done
+    }
+    if done:
+        # Token accounting of the final message, as Ollama reports it
+        message["prompt_eval_count"] = prompt_tokens
+        message["prompt_eval_duration"] = int(prompt_seconds * 1e9)
+        message["eval_count"] = tokens
+        message["eval_duration"] = int(seconds * 1e9)
+    return message
+
+
+def create_app(latency_ms: float = 500.0, **options) -> FastAPI:
+    app = FastAPI(title="Ollama stub")
+    app.state.stub = StubState(latency_ms, **options)
+
+    async def stream_answer(state: StubState, model: str, first_token_ms: float, prompt_tokens: int):
+        try:
+            await asyncio.sleep(first_token_ms / 1000)
+            t0 = time.perf_counter()
+            words = EXPLAINER_ANSWER.split(" ")
+            for i, word in enumerate(words):
+                if i and state.token_ms:
+                    await asyncio.sleep(state.token_ms / 1000)
+                token = word if i == 0 else " " + word
+                yield json.dumps(_message(model, token, False)) + "\n"
+            # The first-token latency stands in for prompt evaluation
+            done = _message(model, "", True, len(words), time.perf_counter() - t0,
+                            prompt_tokens, first_token_ms / 1000)
+            yield json.dumps(done) + "\n"
+        finally:
+            state.in_flight -= 1
+
+    @app.post("/api/chat")
+    async def chat(request: Request):
+        state: StubState = app.state.stub
+        body = await request.json()
+
+        messages = body.get("messages", [])
+        if not messages:
+            # Model load request (explainer preload at warmup)
+            return {**_message(body.get("model"), "", True), "done_reason": "load"}
+
+        system = next((m["content"] for m in messages if m["role"] == "system"), "")
+        user = next((m["content"] for m in messages if m["role"] == "user"), "")
+        is_router = "OUTPUT FORMAT" in system
+
+        state.requests += 1
+        if is_router:
+            state.router_requests += 1
+        else:
+            state.explainer_requests += 1
+        state.in_flight += 1
+        state.max_in_flight = max(state.max_in_flight, state.in_flight)
+
+        latency = state.latency(is_router)
+
+        if body.get("stream") and not is_router:
+            state.streams += 1
+            # in_flight is released when the stream finishes
+            return StreamingResponse(
+                stream_answer(state, body.get("model"), latency, _prompt_tokens(messages)),
+                media_type="application/x-ndjson"
+            )
+
+        try:
+            await asyncio.sleep(latency / 1000)
+        finally:
+            state.in_flight -= 1
+
+        if is_router:
+            content = state.router_reply(user.removeprefix(USER_PREFIX).strip())
+        else:
+            content = EXPLAINER_ANSWER
+
+        return _message(body.get("model"), content, True, len(content.split()), latency / 1000,
+                        _prompt_tokens(messages), latency / 1000)
+
+    @app.get("/api/tags")
+    async def tags():
+        from app.config import OLLAMA_MODEL
+        return {"models": [{"name": OLLAMA_MODEL}]}
+
+    @app.get("/stats")
+    async def stats():
+        return app.state.stub.as_dict()
+
+    return app
+
+
+class StubServer:
+    """Run the stub on a background thread (for benchmarks in one process)."""
+
+    def __init__(self, port: int, latency_ms: float = 500.0, **options):
+        self.app = create_app(latency_ms, **options)
+        self.server = uvicorn.Server(uvicorn.Config(
+            self.app, host="127.0.0.1", port=port,
+            log_level="warning", backlog=4096
+        ))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    @property
+    def state(self) -> StubState:
+        return self.app.state.stub
+
+    def __enter__(self):
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.thread.join(timeout=5)
+
+
+def add_stub_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--latency-ms", type=float, default=500.0,
+                        help="Fixed latency for calls without a distribution")
+    parser.add_argument("--router-latency", type=Latency, help="e.g. lognormal:300,0.4")
+    parser.add_argument("--explainer-latency", type=Latency, help="e.g. uniform:800-2000")
+    parser.add_argument("--invalid-json-rate", type=float, default=0.0,
+                        help="Share of router replies that are not valid JSON")
+    parser.add_argument("--token-ms", type=float, default=0.0,
+                        help="Delay between streamed tokens")
+    parser.add_argument("--corpus", help="Labelled questions to answer the router from")
+    parser.add_argument("--seed", type=int)
+
+
+def stub_options(args) -> dict:
+    return {
+        "router_latency": args.router_latency,
+        "explainer_latency": args.explainer_latency,
+        "invalid_json_rate": args.invalid_json_rate,
+        "token_ms": args.token_ms,
+        "decisions": load_corpus_decisions(args.corpus) if args.corpus else None,
+        "seed": args.seed,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=11500)
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+
+    uvicorn.run(create_app(args.latency_ms, **stub_options(args)), host="127.0.0.1", port=args.port)
@@ -1,12 +1,14 @@
+import asyncio
+
 from app.retrieval.retriever import retrieve
 
 question = "what is suffering"
 
-results = retrieve(
+results = asyncio.run(retrieve(
     book="Life Eternal",
     query=question,
     top_k=5
-)
+))
 
 print(f"Retrieved {len(results)} chunks\n")
 